@@ -0,0 +1,7 @@
+-- Argentine holidays per year, shared by every API worker and job process.
+CREATE TABLE IF NOT EXISTS holiday_calendars (
+    id SERIAL PRIMARY KEY,
+    year INTEGER NOT NULL UNIQUE,
+    holidays JSON NOT NULL DEFAULT '[]',
+    fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,29 @@
+-- Local store of normalized Interbanking movements, deduplicated by fingerprint.
+CREATE TABLE IF NOT EXISTS ib_movements (
+    id SERIAL PRIMARY KEY,
+    document_fingerprint VARCHAR NOT NULL UNIQUE,
+    bank_number VARCHAR NOT NULL,
+    account_number VARCHAR NOT NULL,
+    movement_date DATE NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    debit_credit_type VARCHAR,
+    correlative_number VARCHAR,
+    payload JSON NOT NULL,
+    fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_ib_movements_account_date
+ON ib_movements (bank_number, account_number, movement_date, amount_cents);
+
+-- Closed date ranges already downloaded per account, so they are not fetched again.
+CREATE TABLE IF NOT EXISTS ib_movement_sync_ranges (
+    id SERIAL PRIMARY KEY,
+    bank_number VARCHAR NOT NULL,
+    account_number VARCHAR NOT NULL,
+    date_since DATE NOT NULL,
+    date_until DATE NOT NULL,
+    synced_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_ib_movement_sync_ranges_account
+ON ib_movement_sync_ranges (bank_number, account_number, date_since);
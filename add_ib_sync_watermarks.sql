@@ -0,0 +1,9 @@
+-- Last Interbanking movement synced per account by app/jobs/sync_ib_movements.py.
+CREATE TABLE IF NOT EXISTS ib_sync_watermarks (
+    id SERIAL PRIMARY KEY,
+    bank_number VARCHAR NOT NULL,
+    account_number VARCHAR NOT NULL,
+    last_movement_date DATE,
+    last_synced_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_ib_sync_watermarks_account UNIQUE (bank_number, account_number)
+);
@@ -0,0 +1,6 @@
+-- Register the Interbanking HTTP connection stats endpoint in PermissionMiddleware.
+-- Replace :permission_id with the permission required for internal users.
+INSERT INTO endpoints (path, perm_id)
+VALUES ('/trx/interbanking-http-stats', :permission_id)
+ON CONFLICT (path) DO UPDATE
+SET perm_id = EXCLUDED.perm_id;
@@ -0,0 +1,9 @@
+-- Partial indexes for the reconciliation job's pending transaction lookup.
+-- The expression must match NORMALIZED_RECEPTOR_SQL in app/jobs/validate_trx.py.
+CREATE INDEX IF NOT EXISTS ix_trx_pending_normalized_receptor
+ON trx ((REPLACE(REPLACE(COALESCE(receptor_cbu, ''), ' ', ''), '-', '')))
+WHERE status = 'pendiente';
+
+CREATE INDEX IF NOT EXISTS ix_trx_pending_date
+ON trx (date)
+WHERE status = 'pendiente';
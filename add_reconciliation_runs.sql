@@ -0,0 +1,30 @@
+-- History of validate_trx runs with phase timings and Interbanking usage.
+CREATE TABLE IF NOT EXISTS reconciliation_runs (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR NOT NULL UNIQUE,
+    trigger VARCHAR NOT NULL,
+    status VARCHAR NOT NULL,
+    shard_index INTEGER NOT NULL DEFAULT 0,
+    shard_count INTEGER NOT NULL DEFAULT 1,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    duration_seconds DOUBLE PRECISION,
+    pending_transactions INTEGER NOT NULL DEFAULT 0,
+    accounts INTEGER NOT NULL DEFAULT 0,
+    checked INTEGER NOT NULL DEFAULT 0,
+    conciliated INTEGER NOT NULL DEFAULT 0,
+    repeated INTEGER NOT NULL DEFAULT 0,
+    expired INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    still_pending INTEGER,
+    ib_calls INTEGER NOT NULL DEFAULT 0,
+    ib_shared_calls INTEGER NOT NULL DEFAULT 0,
+    ib_bytes BIGINT NOT NULL DEFAULT 0,
+    ib_calls_by_service JSON NOT NULL DEFAULT '{}',
+    phase_timings JSON NOT NULL DEFAULT '{}',
+    account_timings JSON NOT NULL DEFAULT '[]',
+    error VARCHAR
+);
+
+CREATE INDEX IF NOT EXISTS ix_reconciliation_runs_started_at
+    ON reconciliation_runs (started_at);
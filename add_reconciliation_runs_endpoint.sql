@@ -0,0 +1,9 @@
+-- Register the reconciliation run endpoints in PermissionMiddleware.
+-- Paths containing {param} are matched as route templates.
+-- Replace :permission_id with the permission required for internal users.
+INSERT INTO endpoints (path, perm_id)
+VALUES
+    ('/trx/reconcile-runs', :permission_id),
+    ('/trx/reconcile-runs/{run_id}', :permission_id)
+ON CONFLICT (path) DO UPDATE
+SET perm_id = EXCLUDED.perm_id;
@@ -0,0 +1,8 @@
+-- Per-trx re-check scheduling for the reconciliation job.
+ALTER TABLE trx
+ADD COLUMN IF NOT EXISTS next_check_at TIMESTAMP,
+ADD COLUMN IF NOT EXISTS check_attempts INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_trx_pending_next_check_at
+ON trx (next_check_at)
+WHERE status = 'pendiente';
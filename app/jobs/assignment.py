@@ -0,0 +1,131 @@
+# app/jobs/assignment.py
+"""Minimum-cost assignment of pending trx to candidate IB movements."""
+
+import os
+
+# Groups above this many trx or movements are assigned greedily by cost.
+DEFAULT_MAX_GROUP_SIZE = 150
+
+
+def get_max_group_size() -> int:
+    try:
+        return max(1, int(os.getenv("VALIDATE_TRX_ASSIGNMENT_MAX_GROUP", DEFAULT_MAX_GROUP_SIZE)))
+    except ValueError:
+        return DEFAULT_MAX_GROUP_SIZE
+
+
+def solve_assignment(costs):
+    """Hungarian algorithm on a rows x columns matrix with rows <= columns.
+
+    Returns the column assigned to each row minimizing the total cost.
+    """
+    rows = len(costs)
+    columns = len(costs[0]) if rows else 0
+    infinity = float("inf")
+    row_potential = [0] * (rows + 1)
+    column_potential = [0] * (columns + 1)
+    column_owner = [0] * (columns + 1)
+    previous_column = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        column_owner[0] = row
+        current_column = 0
+        min_slack = [infinity] * (columns + 1)
+        visited = [False] * (columns + 1)
+
+        while True:
+            visited[current_column] = True
+            current_row = column_owner[current_column]
+            delta = infinity
+            next_column = 0
+            for column in range(1, columns + 1):
+                if visited[column]:
+                    continue
+                slack = (
+                    costs[current_row - 1][column - 1]
+                    - row_potential[current_row]
+                    - column_potential[column]
+                )
+                if slack < min_slack[column]:
+                    min_slack[column] = slack
+                    previous_column[column] = current_column
+                if min_slack[column] < delta:
+                    delta = min_slack[column]
+                    next_column = column
+
+            for column in range(columns + 1):
+                if visited[column]:
+                    row_potential[column_owner[column]] += delta
+                    column_potential[column] -= delta
+                else:
+                    min_slack[column] -= delta
+
+            current_column = next_column
+            if column_owner[current_column] == 0:
+                break
+
+        while current_column:
+            previous = previous_column[current_column]
+            column_owner[current_column] = column_owner[previous]
+            current_column = previous
+
+    assignment = [None] * rows
+    for column in range(1, columns + 1):
+        if column_owner[column]:
+            assignment[column_owner[column] - 1] = column - 1
+    return assignment
+
+
+def assign_pairs(pairs):
+    """Pick at most one candidate per trx and one trx per candidate.
+
+    ``pairs`` maps ``(trx_key, candidate_key)`` to a non-negative integer cost.
+    The result has as many pairs as possible and, among those, the lowest
+    total cost. Returns a dict ``trx_key -> candidate_key``.
+    """
+    if not pairs:
+        return {}
+
+    trx_keys = list(dict.fromkeys(trx_key for trx_key, _ in pairs))
+    candidate_keys = list(dict.fromkeys(candidate_key for _, candidate_key in pairs))
+    if max(len(trx_keys), len(candidate_keys)) > get_max_group_size():
+        return assign_greedily(pairs)
+
+    transposed = len(trx_keys) > len(candidate_keys)
+    row_keys, column_keys = (
+        (candidate_keys, trx_keys) if transposed else (trx_keys, candidate_keys)
+    )
+
+    # Every real pair costs less than leaving a row unmatched (0), so the
+    # solver maximizes the number of pairs before minimizing their cost.
+    bonus = (max(pairs.values()) + 1) * (len(row_keys) + 1)
+    costs = []
+    for row_key in row_keys:
+        row_costs = []
+        for column_key in column_keys:
+            pair = (column_key, row_key) if transposed else (row_key, column_key)
+            cost = pairs.get(pair)
+            row_costs.append(0 if cost is None else cost - bonus)
+        costs.append(row_costs)
+
+    assigned = {}
+    for row, column in enumerate(solve_assignment(costs)):
+        if column is None or costs[row][column] == 0:
+            continue
+        if transposed:
+            assigned[column_keys[column]] = row_keys[row]
+        else:
+            assigned[row_keys[row]] = column_keys[column]
+    return assigned
+
+
+def assign_greedily(pairs):
+    """Fallback for large groups: take pairs by increasing cost."""
+    assigned = {}
+    used_candidates = set()
+    for (trx_key, candidate_key), _ in sorted(pairs.items(), key=lambda item: item[1]):
+        if trx_key in assigned or candidate_key in used_candidates:
+            continue
+        assigned[trx_key] = candidate_key
+        used_candidates.add(candidate_key)
+    return assigned
@@ -0,0 +1,369 @@
+# app/jobs/backfill_ib_movements.py
+"""Backfill the local Interbanking movement store from the historical endpoint.
+
+Splits each account's period into chunks sized from what the previous chunks
+returned, fetches them concurrently through the Interbanking rate limiter and
+streams the movements into ib_movements in bulk inserts:
+
+    python -m app.jobs.backfill_ib_movements --date-from 2025-01-01 --date-to 2026-07-01
+
+Every stored chunk is recorded in ib_movement_sync_ranges, which doubles as the
+checkpoint: an interrupted backfill resumes by fetching only the days that are
+still missing.
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.jobs.reconciliation_lock import backfill_account_lock
+from app.services.InterBankingService import InterBankingService
+from app.services.interbanking.store import (
+    UPSERT_CHUNK_SIZE,
+    MovementStore,
+    get_closed_until,
+)
+from app.services.interbanking.throttle import InterBankingUnavailable
+
+load_dotenv()
+
+logger = logging.getLogger("backfill_ib_movements_job")
+
+# Gateway errors worth retrying with a smaller chunk.
+RETRY_WITH_SMALLER_CHUNK_STATUS = {502, 504}
+
+
+def get_int_env(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Ignoring invalid %s value", name)
+        return default
+
+
+def range_days(date_since, date_until):
+    return (date_until - date_since).days + 1
+
+
+def take_chunk(date_since, date_until, chunk_days):
+    """Split [date_since, date_until] into its first ``chunk_days`` and the rest."""
+    chunk_until = min(date_until, date_since + datetime.timedelta(days=chunk_days - 1))
+    remainder = None
+    if chunk_until < date_until:
+        remainder = (chunk_until + datetime.timedelta(days=1), date_until)
+    return (date_since, chunk_until), remainder
+
+
+def split_in_half(date_since, date_until):
+    middle = date_since + datetime.timedelta(days=range_days(date_since, date_until) // 2 - 1)
+    return (date_since, middle), (middle + datetime.timedelta(days=1), date_until)
+
+
+class ChunkSizer:
+    """Adapts the chunk length to keep responses near a target size and duration.
+
+    Chunks returning more than IB_BACKFILL_TARGET_MOVEMENTS movements or taking
+    longer than IB_BACKFILL_TARGET_SECONDS halve the next chunks; chunks well
+    under both targets double them, up to IB_BACKFILL_MAX_CHUNK_DAYS.
+    """
+
+    def __init__(self):
+        self.max_days = max(1, get_int_env("IB_BACKFILL_MAX_CHUNK_DAYS", 92))
+        self.chunk_days = min(self.max_days, max(1, get_int_env("IB_BACKFILL_CHUNK_DAYS", 31)))
+        self.target_movements = max(1, get_int_env("IB_BACKFILL_TARGET_MOVEMENTS", 5000))
+        self.target_seconds = max(1, get_int_env("IB_BACKFILL_TARGET_SECONDS", 20))
+
+    def record(self, days, movements, seconds):
+        if movements > self.target_movements or seconds > self.target_seconds:
+            self.shrink(days)
+        elif (
+            movements * 4 < self.target_movements
+            and seconds * 4 < self.target_seconds
+            and days >= self.chunk_days
+        ):
+            self.chunk_days = min(self.max_days, days * 2)
+
+    def shrink(self, days):
+        self.chunk_days = max(1, min(self.chunk_days, days // 2))
+
+
+async def store_movement_batches(movement_store, acc, movements, counters):
+    """Insert streamed movements in UPSERT_CHUNK_SIZE batches; returns new rows."""
+    bank_number = acc.get("bank_number")
+    account_number = acc.get("account_number")
+    stored_count = 0
+    batch = []
+    async for movement in movements:
+        batch.append(movement)
+        counters["movements"] += 1
+        if len(batch) >= UPSERT_CHUNK_SIZE:
+            stored_count += await asyncio.to_thread(
+                movement_store.upsert_movements,
+                bank_number,
+                account_number,
+                batch,
+            )
+            batch = []
+    if batch:
+        stored_count += await asyncio.to_thread(
+            movement_store.upsert_movements,
+            bank_number,
+            account_number,
+            batch,
+        )
+    return stored_count
+
+
+async def mark_chunk_synced(movement_store, checkpoint_lock, acc, chunk):
+    # mark_synced merges touching ranges, so concurrent chunks take turns.
+    async with checkpoint_lock:
+        await asyncio.to_thread(
+            movement_store.mark_synced,
+            acc.get("bank_number"),
+            acc.get("account_number"),
+            chunk[0],
+            chunk[1],
+        )
+
+
+async def backfill_account_movements(
+    ib_service,
+    movement_store,
+    acc,
+    date_since,
+    date_until,
+    concurrency,
+    sizer=None,
+):
+    """Fetch and store the account's movements missing in [date_since, date_until]."""
+    account_number = acc.get("account_number")
+    bank_number = acc.get("bank_number")
+    sizer = sizer or ChunkSizer()
+    counters = Counter()
+    max_retries = get_int_env("IB_BACKFILL_MAX_RETRIES", 3)
+
+    missing_ranges = await asyncio.to_thread(
+        movement_store.get_missing_ranges,
+        bank_number,
+        account_number,
+        date_since,
+        date_until,
+    )
+    logger.info(
+        "[BACKFILL ACCOUNT] account_number=%s bank_number=%s missing_ranges=%s missing_days=%s",
+        account_number,
+        bank_number,
+        len(missing_ranges),
+        sum(range_days(*missing_range) for missing_range in missing_ranges),
+    )
+
+    queue = asyncio.Queue()
+    for missing_range in missing_ranges:
+        queue.put_nowait((missing_range, 0))
+    checkpoint_lock = asyncio.Lock()
+
+    async def process(pending_range, attempts):
+        chunk, remainder = take_chunk(*pending_range, sizer.chunk_days)
+        if remainder is not None:
+            # Hand the rest to the other workers before fetching this chunk.
+            queue.put_nowait((remainder, 0))
+
+        started_at = time.monotonic()
+        chunk_counters = Counter()
+        try:
+            # Movements go to the store in batches while the response is read.
+            stored_count = await store_movement_batches(
+                movement_store,
+                acc,
+                ib_service.iter_historical_movements(
+                    account_number=account_number,
+                    bank_number=bank_number,
+                    date_since=chunk[0].isoformat(),
+                    date_until=chunk[1].isoformat(),
+                ),
+                chunk_counters,
+            )
+        except InterBankingUnavailable as exc:
+            if attempts >= max_retries:
+                raise
+            logger.warning(
+                "[BACKFILL PAUSED] account_number=%s range_start=%s retry_after_seconds=%s",
+                account_number,
+                chunk[0],
+                exc.retry_after_seconds,
+            )
+            await asyncio.sleep(exc.retry_after_seconds)
+            queue.put_nowait((chunk, attempts + 1))
+            return
+        except HTTPException as exc:
+            days = range_days(*chunk)
+            if exc.status_code not in RETRY_WITH_SMALLER_CHUNK_STATUS or attempts >= max_retries:
+                raise
+            sizer.shrink(days)
+            counters["retried_chunks"] += 1
+            if days > 1:
+                for half in split_in_half(*chunk):
+                    queue.put_nowait((half, attempts + 1))
+            else:
+                queue.put_nowait((chunk, attempts + 1))
+            return
+
+        movements_count = chunk_counters["movements"]
+        seconds = time.monotonic() - started_at
+        sizer.record(range_days(*chunk), movements_count, seconds)
+        await mark_chunk_synced(movement_store, checkpoint_lock, acc, chunk)
+        counters["chunks"] += 1
+        counters["movements"] += movements_count
+        counters["stored"] += stored_count
+        logger.info(
+            "[BACKFILL CHUNK] account_number=%s range_start=%s range_end=%s movements=%s new=%s duration_seconds=%.2f next_chunk_days=%s",
+            account_number,
+            chunk[0],
+            chunk[1],
+            movements_count,
+            stored_count,
+            seconds,
+            sizer.chunk_days,
+        )
+
+    async def worker():
+        while True:
+            pending_range, attempts = await queue.get()
+            try:
+                await process(pending_range, attempts)
+            except Exception:
+                # The range stays missing and is fetched again by the next run.
+                counters["failed_chunks"] += 1
+                logger.exception(
+                    "[ERROR] backfill_chunk_failed account_number=%s range_start=%s range_end=%s",
+                    account_number,
+                    pending_range[0],
+                    pending_range[1],
+                )
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return counters
+
+
+async def run(date_from, date_to, account_numbers=None, concurrency=None) -> dict:
+    """Backfill the stored movements dated in [date_from, date_to).
+
+    Days after ``get_closed_until()`` can still change and are left to the
+    regular sync.
+    """
+    started_at = datetime.datetime.now()
+    concurrency = concurrency or get_int_env("IB_BACKFILL_CONCURRENCY", 4)
+    ib_service = InterBankingService()
+    movement_store = MovementStore()
+    date_until = min(date_to - datetime.timedelta(days=1), get_closed_until())
+
+    accounts = (await ib_service.get_accounts()).get("accounts", [])
+    if account_numbers is not None:
+        account_numbers = {str(account_number) for account_number in account_numbers}
+        accounts = [
+            acc for acc in accounts if str(acc.get("account_number")) in account_numbers
+        ]
+
+    logger.info(
+        "[BACKFILL START] date_from=%s date_until=%s ib_accounts=%s concurrency=%s",
+        date_from,
+        date_until,
+        len(accounts),
+        concurrency,
+    )
+
+    counters = Counter()
+    if date_from <= date_until:
+        for acc in accounts:
+            lock = backfill_account_lock(acc)
+            if not await asyncio.to_thread(lock.try_acquire):
+                logger.info(
+                    "[ACCOUNT SKIPPED] locked_by_another_backfill account_number=%s",
+                    acc.get("account_number"),
+                )
+                counters["skipped_accounts"] += 1
+                continue
+
+            try:
+                counters.update(
+                    await backfill_account_movements(
+                        ib_service,
+                        movement_store,
+                        acc,
+                        date_from,
+                        date_until,
+                        concurrency,
+                    )
+                )
+            except Exception:
+                logger.exception(
+                    "[ERROR] account_backfill_failed account_number=%s",
+                    acc.get("account_number"),
+                )
+                counters["skipped_accounts"] += 1
+            finally:
+                await asyncio.to_thread(lock.release)
+
+    duration = (datetime.datetime.now() - started_at).total_seconds()
+    logger.info(
+        "[BACKFILL END] chunks=%s movements=%s stored=%s failed_chunks=%s skipped_accounts=%s duration_seconds=%.2f",
+        counters["chunks"],
+        counters["movements"],
+        counters["stored"],
+        counters["failed_chunks"],
+        counters["skipped_accounts"],
+        duration,
+    )
+    return {
+        "chunks": counters["chunks"],
+        "movements": counters["movements"],
+        "stored": counters["stored"],
+        "retried_chunks": counters["retried_chunks"],
+        "failed_chunks": counters["failed_chunks"],
+        "skipped_accounts": counters["skipped_accounts"],
+        "duration_seconds": round(duration, 2),
+    }
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(message)s",
+    )
+    parser = argparse.ArgumentParser(
+        description="Backfill stored Interbanking movements from the historical endpoint."
+    )
+    parser.add_argument("--date-from", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--date-to", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--accounts", help="comma-separated IB account numbers")
+    parser.add_argument("--concurrency", type=int, help="chunks fetched at once per account")
+    args = parser.parse_args()
+
+    asyncio.run(
+        run(
+            args.date_from,
+            args.date_to,
+            args.accounts.split(",") if args.accounts else None,
+            args.concurrency,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
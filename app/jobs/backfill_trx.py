@@ -0,0 +1,345 @@
+# app/jobs/backfill_trx.py
+"""Batch reconciliation of historical pending trx.
+
+Streams each account's movements for the whole period from the historical
+(ZUGHUS) endpoint, keeping only possible matches, and matches them with the
+columnar matcher:
+
+    python -m app.jobs.backfill_trx --date-from 2026-01-01 --date-to 2026-07-01
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.jobs import validate_trx
+from app.jobs.batch_matcher import (
+    NO_MATCH,
+    CandidateKeyFilter,
+    MovementArrays,
+    assign_batch,
+    candidate_mask,
+    key_fits,
+    query_keys_for,
+)
+from app.jobs.reconciliation_lock import account_lock
+from app.services.BusinessCalendarService import BusinessCalendarService
+from app.services.InterBankingService import InterBankingService
+from app.services.interbanking.movements import amount_to_cents
+
+load_dotenv()
+
+logger = logging.getLogger("validate_trx_job")
+
+BACKFILL_SQL = (
+    validate_trx.SQL
+    + """
+  AND trx.date >= :date_from
+  AND trx.date < :date_to
+"""
+    + validate_trx.ORDER_SQL
+)
+
+
+def get_backfill_pending_trx(date_from, date_to):
+    """Load pending trx dated in [date_from, date_to)."""
+    db = SessionLocal()
+    try:
+        return (
+            db.execute(
+                text(BACKFILL_SQL).columns(**validate_trx.PENDING_TRX_COLUMN_TYPES),
+                {"date_from": date_from, "date_to": date_to},
+            )
+            .mappings()
+            .all()
+        )
+    except Exception:
+        logger.exception("[ERROR] failed_to_fetch_backfill_transactions")
+        raise
+    finally:
+        db.close()
+
+
+async def get_settlement_dates(business_calendar, trx_dates):
+    """Resolve each distinct trx date once, in one calendar call."""
+    distinct_dates = sorted(set(trx_dates))
+    return dict(
+        zip(distinct_dates, await business_calendar.settlement_dates(distinct_dates))
+    )
+
+
+def build_batch_outcomes(
+    account_pending_trx,
+    movement_arrays,
+    assigned,
+    taken,
+    fingerprints,
+    owners,
+):
+    """Turn the matcher's assignment into ``build_match_outcome`` updates."""
+    movement_owner = np.full(len(movement_arrays), NO_MATCH, dtype=np.int64)
+    assigned_rows = np.flatnonzero(assigned != NO_MATCH)
+    movement_owner[assigned[assigned_rows]] = assigned_rows
+
+    outcomes = []
+    for row in assigned_rows:
+        position = int(assigned[row])
+        outcomes.append(
+            validate_trx.build_match_outcome(
+                account_pending_trx[row],
+                {
+                    "movement": movement_arrays.movements[position],
+                    "document_fingerprint": fingerprints[position],
+                    "duplicated_trx": None,
+                },
+            )
+        )
+
+    for row in np.flatnonzero((assigned == NO_MATCH) & (taken != NO_MATCH)):
+        position = int(taken[row])
+        document_fingerprint = fingerprints[position]
+        if movement_owner[position] != NO_MATCH:
+            duplicated_trx = {
+                "trx_id": account_pending_trx[movement_owner[position]]["trx_id"],
+                "status": "conciliado",
+            }
+        else:
+            duplicated_trx = owners[document_fingerprint][0]
+
+        outcomes.append(
+            validate_trx.build_match_outcome(
+                account_pending_trx[row],
+                {
+                    "movement": movement_arrays.movements[position],
+                    "document_fingerprint": document_fingerprint,
+                    "duplicated_trx": duplicated_trx,
+                },
+            )
+        )
+
+    return outcomes
+
+
+async def backfill_account(
+    ib_service,
+    business_calendar,
+    acc,
+    account_pending_trx,
+    counters,
+):
+    account_number = acc.get("account_number")
+    bank_number = acc.get("bank_number")
+
+    trx_dates = [trx["trx_date"].date() for trx in account_pending_trx]
+    settlement_dates = await get_settlement_dates(business_calendar, trx_dates)
+    date_since = min(trx_dates) - datetime.timedelta(days=1)
+    date_until = max(settlement_dates.values()) + datetime.timedelta(days=1)
+
+    amounts_in_cents = [
+        abs(amount_to_cents(trx["trx_amount"])) for trx in account_pending_trx
+    ]
+    if not all(
+        key_fits(cents, trx_date.toordinal())
+        and key_fits(cents, settlement_dates[trx_date].toordinal())
+        for cents, trx_date in zip(amounts_in_cents, trx_dates)
+    ):
+        # The packed int64 keys would overflow: match with the scalar matcher.
+        logger.warning(
+            "[BACKFILL SCALAR] trx_out_of_key_range account_number=%s transactions=%s",
+            account_number,
+            len(account_pending_trx),
+        )
+        failed_trx_ids = set()
+        await validate_trx.reconcile_account(
+            ib_service,
+            business_calendar,
+            acc,
+            account_pending_trx,
+            counters,
+            failed_trx_ids,
+            validate_trx.FingerprintRegistry(),
+        )
+        return failed_trx_ids
+
+    counters["checked"] += len(account_pending_trx)
+    trx_cents = np.array(amounts_in_cents, dtype=np.int64)
+    trx_days = np.fromiter(
+        (trx_date.toordinal() for trx_date in trx_dates),
+        dtype=np.int64,
+        count=len(trx_dates),
+    )
+    settlement_days = np.fromiter(
+        (settlement_dates[trx_date].toordinal() for trx_date in trx_dates),
+        dtype=np.int64,
+        count=len(trx_dates),
+    )
+    day_rounds = [trx_days, settlement_days]
+
+    # Movements are parsed as they arrive and only possible matches are kept.
+    key_filter = CandidateKeyFilter(query_keys_for(trx_cents, day_rounds))
+    movement_arrays = MovementArrays(
+        [
+            movement
+            async for movement in ib_service.iter_historical_movements(
+                account_number=account_number,
+                bank_number=bank_number,
+                date_since=date_since.isoformat(),
+                date_until=date_until.isoformat(),
+            )
+            if key_filter.accepts(movement)
+        ]
+    )
+
+    candidates = np.flatnonzero(candidate_mask(movement_arrays, trx_cents, day_rounds))
+    fingerprints = {
+        int(position): validate_trx.build_interbanking_fingerprint(
+            movement_arrays.movements[position],
+            bank_number=bank_number,
+            account_number=account_number,
+        )
+        for position in candidates
+    }
+    owners = await asyncio.to_thread(
+        validate_trx.find_trx_by_fingerprints,
+        fingerprints.values(),
+    )
+    available = np.ones(len(movement_arrays), dtype=bool)
+    for position, document_fingerprint in fingerprints.items():
+        if owners.get(document_fingerprint):
+            available[position] = False
+
+    assigned, taken = assign_batch(movement_arrays, trx_cents, day_rounds, available)
+
+    logger.info(
+        "[BACKFILL MATCH] account_number=%s transactions=%s movements=%s candidates=%s assigned=%s",
+        account_number,
+        len(account_pending_trx),
+        key_filter.seen,
+        len(candidates),
+        int((assigned != NO_MATCH).sum()),
+    )
+
+    outcomes = build_batch_outcomes(
+        account_pending_trx,
+        movement_arrays,
+        assigned,
+        taken,
+        fingerprints,
+        owners,
+    )
+    failed_trx_ids = set()
+    await asyncio.to_thread(
+        validate_trx.commit_match_outcomes,
+        outcomes,
+        counters,
+        failed_trx_ids,
+    )
+    return failed_trx_ids
+
+
+async def run(date_from, date_to, account_numbers=None) -> dict:
+    """Batch-reconcile the pending trx dated in [date_from, date_to)."""
+    started_at = datetime.datetime.now()
+    ib_service = InterBankingService()
+    business_calendar = BusinessCalendarService()
+
+    accounts = (await ib_service.get_accounts()).get("accounts", [])
+    if account_numbers is not None:
+        account_numbers = {str(account_number) for account_number in account_numbers}
+        accounts = [
+            acc for acc in accounts if str(acc.get("account_number")) in account_numbers
+        ]
+
+    pending_transactions = await asyncio.to_thread(
+        get_backfill_pending_trx,
+        date_from,
+        date_to,
+    )
+    pending_by_account = validate_trx.group_pending_trx_by_account(pending_transactions)
+
+    logger.info(
+        "[BACKFILL START] date_from=%s date_to=%s ib_accounts=%s pending_transactions=%s",
+        date_from,
+        date_to,
+        len(accounts),
+        len(pending_transactions),
+    )
+
+    counters = Counter()
+    for acc in accounts:
+        account_pending_trx = validate_trx.get_account_pending_trx(
+            pending_by_account,
+            acc,
+        )
+        if not account_pending_trx:
+            continue
+
+        lock = account_lock(acc)
+        if not await asyncio.to_thread(lock.try_acquire):
+            logger.info(
+                "[ACCOUNT SKIPPED] locked_by_another_worker account_number=%s",
+                acc.get("account_number"),
+            )
+            counters["skipped"] += len(account_pending_trx)
+            continue
+
+        try:
+            await backfill_account(
+                ib_service,
+                business_calendar,
+                acc,
+                account_pending_trx,
+                counters,
+            )
+        except Exception:
+            logger.exception(
+                "[ERROR] account_backfill_failed account_number=%s",
+                acc.get("account_number"),
+            )
+            counters["skipped"] += len(account_pending_trx)
+        finally:
+            await asyncio.to_thread(lock.release)
+
+    duration = (datetime.datetime.now() - started_at).total_seconds()
+    logger.info(
+        "[BACKFILL END] checked=%s conciliated=%s repeated=%s skipped=%s duration_seconds=%.2f",
+        counters["checked"],
+        counters["conciliated"],
+        counters["repeated"],
+        counters["skipped"],
+        duration,
+    )
+    return {
+        "checked": counters["checked"],
+        "conciliated": counters["conciliated"],
+        "repeated": counters["repeated"],
+        "skipped": counters["skipped"],
+        "duration_seconds": round(duration, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-reconcile historical pending trx.")
+    parser.add_argument("--date-from", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--date-to", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument("--accounts", help="comma-separated IB account numbers")
+    args = parser.parse_args()
+
+    asyncio.run(
+        run(
+            args.date_from,
+            args.date_to,
+            args.accounts.split(",") if args.accounts else None,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
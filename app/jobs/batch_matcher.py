@@ -0,0 +1,230 @@
+# app/jobs/batch_matcher.py
+"""Columnar trx/movement matching for historical backfills.
+
+Pending trx and IB movements are loaded into NumPy arrays (absolute cents as
+int64, dates as day ordinals, a credit flag) and matched with one sort plus
+``searchsorted`` per round instead of one dictionary lookup per trx. The
+result follows the same rules as ``validate_trx.match_trx_with_ib``: a credit
+movement with the trx amount on one of its valid dates, each movement used at
+most once, and trx left without a free movement reported against one that is
+already taken.
+"""
+
+import logging
+
+import numpy as np
+
+from app.services.interbanking.movements import amount_to_cents, parse_movement_date
+
+logger = logging.getLogger("validate_trx_job")
+
+# Day ordinals (~740k for current dates) fit in the low 20 bits of the key,
+# which leaves 43 bits (~8.8e12 cents) for the amount.
+DAY_BITS = 20
+MAX_KEY_DAY = (1 << DAY_BITS) - 1
+MAX_KEY_CENTS = np.iinfo(np.int64).max >> DAY_BITS
+NO_MATCH = -1
+
+
+def key_fits(cents, day) -> bool:
+    """Whether (cents, day) packs into an int64 key without overflowing."""
+    return 0 <= cents <= MAX_KEY_CENTS and 0 <= day <= MAX_KEY_DAY
+
+
+def composite_keys(cents, days):
+    cents = np.asarray(cents, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    if cents.size and (
+        cents.min() < 0
+        or cents.max() > MAX_KEY_CENTS
+        or days.min() < 0
+        or days.max() > MAX_KEY_DAY
+    ):
+        raise OverflowError("(cents, day) out of range for int64 matcher keys")
+    return (cents << DAY_BITS) | days
+
+
+class MovementArrays:
+    """Columnar view of IB movements.
+
+    ``valid`` is False for unparseable rows and for amounts or dates too large
+    to pack into a key (see ``key_fits``).
+    """
+
+    def __init__(self, movements):
+        self.movements = movements
+        count = len(movements)
+        self.cents = np.zeros(count, dtype=np.int64)
+        self.days = np.zeros(count, dtype=np.int64)
+        self.credit = np.zeros(count, dtype=bool)
+        self.valid = np.zeros(count, dtype=bool)
+
+        # Amounts and dates repeat a lot in long periods: parse each value once.
+        cents_by_amount = {}
+        days_by_date = {}
+        for position, movement in enumerate(movements):
+            amount = movement.get("amount")
+            movement_date = movement.get("movement_date")
+            try:
+                cents = cents_by_amount.get(amount)
+                if cents is None:
+                    cents = cents_by_amount[amount] = abs(amount_to_cents(amount))
+                day = days_by_date.get(movement_date)
+                if day is None:
+                    day = days_by_date[movement_date] = parse_movement_date(
+                        movement_date
+                    ).toordinal()
+            except (ArithmeticError, TypeError, ValueError):
+                logger.warning(
+                    "[WARNING] ib_movement_not_indexed amount=%s movement_date=%s",
+                    amount,
+                    movement_date,
+                )
+                continue
+            if not key_fits(cents, day):
+                # No in-range trx can share this key; packing it would wrap.
+                logger.warning(
+                    "[WARNING] ib_movement_out_of_key_range amount=%s movement_date=%s",
+                    amount,
+                    movement_date,
+                )
+                continue
+            self.cents[position] = cents
+            self.days[position] = day
+            self.credit[position] = movement.get("debit_credit_type") == "C"
+            self.valid[position] = True
+
+    def __len__(self):
+        return len(self.movements)
+
+    @property
+    def matchable(self):
+        return self.valid & self.credit
+
+    @property
+    def keys(self):
+        return composite_keys(self.cents, self.days)
+
+
+class CandidateKeyFilter:
+    """Keeps only the movements whose (cents, day) key some trx asks for.
+
+    Used while movements are streamed from Interbanking: movements that
+    cannot match any trx are dropped on arrival instead of being kept for
+    ``MovementArrays``.
+    """
+
+    def __init__(self, query_keys):
+        self.query_keys = {int(key) for key in query_keys}
+        self.seen = 0
+        self._cents_by_amount = {}
+        self._days_by_date = {}
+
+    def accepts(self, movement) -> bool:
+        self.seen += 1
+        if movement.get("debit_credit_type") != "C":
+            return False
+        amount = movement.get("amount")
+        movement_date = movement.get("movement_date")
+        try:
+            cents = self._cents_by_amount.get(amount)
+            if cents is None:
+                cents = self._cents_by_amount[amount] = abs(amount_to_cents(amount))
+            day = self._days_by_date.get(movement_date)
+            if day is None:
+                day = self._days_by_date[movement_date] = parse_movement_date(
+                    movement_date
+                ).toordinal()
+        except (ArithmeticError, TypeError, ValueError):
+            return False
+        if not key_fits(cents, day):
+            return False
+        return (cents << DAY_BITS) | day in self.query_keys
+
+
+def query_keys_for(trx_cents, trx_day_rounds):
+    return np.unique(
+        np.concatenate([composite_keys(trx_cents, days) for days in trx_day_rounds])
+    )
+
+
+def sorted_key_index(keys, mask):
+    """Return (sorted keys, movement positions) for the masked movements.
+
+    The sort is stable, so movements sharing a key keep the IB delivery order.
+    """
+    positions = np.flatnonzero(mask)
+    order = np.argsort(keys[positions], kind="stable")
+    positions = positions[order]
+    return keys[positions], positions
+
+
+def rank_within_groups(keys):
+    """Return each element's 0-based rank among equal keys, in input order."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    group_starts = np.searchsorted(sorted_keys, sorted_keys, side="left")
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(len(keys)) - group_starts
+    return ranks
+
+
+def candidate_mask(movement_arrays, trx_cents, trx_day_rounds):
+    """Flag the matchable movements that share a key with any trx."""
+    query_keys = query_keys_for(trx_cents, trx_day_rounds)
+    return movement_arrays.matchable & np.isin(movement_arrays.keys, query_keys)
+
+
+def assign_batch(movement_arrays, trx_cents, trx_day_rounds, available=None):
+    """Assign each trx at most one movement and each movement at most one trx.
+
+    ``trx_day_rounds`` lists the trx date columns in order of preference (e.g.
+    transaction day, then settlement day); every round only sees the trx and
+    movements left by the previous ones. Within a key, trx are served in their
+    input order and movements in IB order, so the result is deterministic.
+    ``available`` excludes movements already owned by other trx.
+
+    Returns ``(assigned, taken)``: the movement position per trx (or NO_MATCH)
+    and, for unassigned trx, the first candidate that was taken or unavailable
+    (or NO_MATCH when the trx has no candidate at all).
+    """
+    trx_cents = np.asarray(trx_cents, dtype=np.int64)
+    assigned = np.full(len(trx_cents), NO_MATCH, dtype=np.int64)
+    free = movement_arrays.matchable.copy()
+    if available is not None:
+        free &= available
+    movement_keys = movement_arrays.keys
+
+    for days in trx_day_rounds:
+        pending = np.flatnonzero(assigned == NO_MATCH)
+        if not len(pending) or not free.any():
+            break
+
+        sorted_keys, positions = sorted_key_index(movement_keys, free)
+        query_keys = composite_keys(trx_cents[pending], np.asarray(days)[pending])
+        lower = np.searchsorted(sorted_keys, query_keys, side="left")
+        upper = np.searchsorted(sorted_keys, query_keys, side="right")
+        slots = lower + rank_within_groups(query_keys)
+        hits = slots < upper
+
+        matched_positions = positions[slots[hits]]
+        assigned[pending[hits]] = matched_positions
+        free[matched_positions] = False
+
+    taken = np.full(len(trx_cents), NO_MATCH, dtype=np.int64)
+    unassigned = np.flatnonzero(assigned == NO_MATCH)
+    if len(unassigned):
+        sorted_keys, positions = sorted_key_index(
+            movement_keys, movement_arrays.matchable
+        )
+        for days in trx_day_rounds:
+            missing = unassigned[taken[unassigned] == NO_MATCH]
+            if not len(missing):
+                break
+            query_keys = composite_keys(trx_cents[missing], np.asarray(days)[missing])
+            lower = np.searchsorted(sorted_keys, query_keys, side="left")
+            upper = np.searchsorted(sorted_keys, query_keys, side="right")
+            has_candidate = lower < upper
+            taken[missing[has_candidate]] = positions[lower[has_candidate]]
+
+    return assigned, taken
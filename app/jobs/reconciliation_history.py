@@ -0,0 +1,158 @@
+# app/jobs/reconciliation_history.py
+
+import datetime
+import logging
+
+from sqlalchemy import select
+
+from app.db.database import SessionLocal
+from app.models import ReconciliationRunHistory
+
+logger = logging.getLogger("validate_trx_job")
+
+COUNTER_COLUMNS = ("checked", "conciliated", "repeated", "expired", "skipped")
+
+
+def run_to_dict(run: ReconciliationRunHistory) -> dict:
+    counters = {name: getattr(run, name) for name in COUNTER_COLUMNS}
+    checked = run.checked or 0
+    return {
+        "run_id": run.run_id,
+        "trigger": run.trigger,
+        "status": run.status,
+        "shard_index": run.shard_index,
+        "shard_count": run.shard_count,
+        "submitted_at": run.started_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "duration_seconds": run.duration_seconds,
+        "phase": None,
+        "pending_transactions": run.pending_transactions,
+        "accounts_total": run.accounts,
+        "accounts_done": len(run.account_timings or []),
+        "counters": counters,
+        "still_pending": run.still_pending,
+        "phase_timings": run.phase_timings or {},
+        "account_timings": run.account_timings or [],
+        "ib_calls": {
+            "calls": run.ib_calls,
+            "shared_calls": run.ib_shared_calls or 0,
+            "bytes": run.ib_bytes,
+            "calls_by_service": run.ib_calls_by_service or {},
+        },
+        "trx_per_second": (
+            round(checked / run.duration_seconds, 2)
+            if run.duration_seconds
+            else None
+        ),
+        "ib_calls_per_trx": round(run.ib_calls / checked, 3) if checked else None,
+        "error": run.error,
+    }
+
+
+class ReconciliationHistory:
+    """Persists every reconciliation run in reconciliation_runs.
+
+    Writes never break the job: failures are logged and the run goes on.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def start_run(self, run_id, trigger, shard_index, shard_count, started_at):
+        db = self.session_factory()
+        try:
+            db.add(
+                ReconciliationRunHistory(
+                    run_id=run_id,
+                    trigger=trigger,
+                    status="running",
+                    shard_index=shard_index,
+                    shard_count=shard_count,
+                    started_at=started_at,
+                    phase_timings={},
+                    account_timings=[],
+                    ib_calls_by_service={},
+                )
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("[ERROR] failed_to_record_run_start run_id=%s", run_id)
+        finally:
+            db.close()
+
+    def finish_run(self, run_id, progress, result=None, error=None):
+        """Store the final counters, timings and Interbanking usage of a run."""
+        finished_at = datetime.datetime.now()
+        snapshot = progress.snapshot()
+        counters = {**snapshot["counters"], **(result or {})}
+
+        db = self.session_factory()
+        try:
+            run = db.execute(
+                select(ReconciliationRunHistory).where(
+                    ReconciliationRunHistory.run_id == run_id
+                )
+            ).scalar_one_or_none()
+            if run is None:
+                logger.warning("[RUN HISTORY] run_not_found run_id=%s", run_id)
+                return
+
+            run.status = "failed" if error else "succeeded"
+            run.finished_at = finished_at
+            run.duration_seconds = round(
+                (finished_at - run.started_at).total_seconds(), 3
+            )
+            run.pending_transactions = progress.pending_total
+            run.accounts = progress.accounts_total
+            for name in COUNTER_COLUMNS:
+                setattr(run, name, counters.get(name, 0))
+            run.still_pending = counters.get("still_pending")
+            run.ib_calls = snapshot["ib_calls"]["calls"]
+            run.ib_shared_calls = snapshot["ib_calls"]["shared_calls"]
+            run.ib_bytes = snapshot["ib_calls"]["bytes"]
+            run.ib_calls_by_service = snapshot["ib_calls"]["calls_by_service"]
+            run.phase_timings = snapshot["phase_timings"]
+            run.account_timings = list(progress.account_timings)
+            run.error = error
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("[ERROR] failed_to_record_run_end run_id=%s", run_id)
+        finally:
+            db.close()
+
+    def get_run(self, run_id):
+        db = self.session_factory()
+        try:
+            run = db.execute(
+                select(ReconciliationRunHistory).where(
+                    ReconciliationRunHistory.run_id == run_id
+                )
+            ).scalar_one_or_none()
+            return run_to_dict(run) if run is not None else None
+        finally:
+            db.close()
+
+    def list_runs(self, date_from=None, date_to=None, status=None, limit=100):
+        """Return the newest runs first, without their per-account timings."""
+        db = self.session_factory()
+        try:
+            query = select(ReconciliationRunHistory)
+            if date_from is not None:
+                query = query.where(ReconciliationRunHistory.started_at >= date_from)
+            if date_to is not None:
+                query = query.where(ReconciliationRunHistory.started_at < date_to)
+            if status is not None:
+                query = query.where(ReconciliationRunHistory.status == status)
+
+            runs = db.execute(
+                query.order_by(ReconciliationRunHistory.started_at.desc()).limit(limit)
+            ).scalars()
+            return [
+                {**run_to_dict(run), "account_timings": []}
+                for run in runs
+            ]
+        finally:
+            db.close()
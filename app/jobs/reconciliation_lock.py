@@ -0,0 +1,133 @@
+# app/jobs/reconciliation_lock.py
+
+import logging
+import os
+import zlib
+
+from sqlalchemy import text
+
+from app.db.database import engine
+
+logger = logging.getLogger("validate_trx_job")
+
+# First key of every pg_advisory_lock(int, int) taken by the reconciliation job.
+RUN_LOCK_NAMESPACE = 7_410_001
+ACCOUNT_LOCK_NAMESPACE = 7_410_002
+# Historical backfills only write ib_movements, so they never block reconciliation.
+BACKFILL_LOCK_NAMESPACE = 7_410_003
+
+
+class ReconciliationAlreadyRunning(RuntimeError):
+    """Raised when another process already holds the reconciliation run lock."""
+
+
+def lock_key(value: str) -> int:
+    return zlib.crc32(value.encode("utf-8")) & 0x7FFFFFFF
+
+
+class AdvisoryLock:
+    """PostgreSQL session advisory lock held on a dedicated connection.
+
+    The lock is visible to every worker and container sharing the database. On
+    other databases (e.g. SQLite replays) it always succeeds.
+    """
+
+    def __init__(self, namespace: int, name: str, bind=None):
+        self.namespace = namespace
+        self.name = name
+        self.key = lock_key(name)
+        self.bind = bind or engine
+        self._connection = None
+        self.acquired = False
+
+    def try_acquire(self) -> bool:
+        if self.bind.dialect.name != "postgresql":
+            self.acquired = True
+            return True
+
+        connection = self.bind.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:namespace, :key)"),
+                {"namespace": self.namespace, "key": self.key},
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return False
+
+        self._connection = connection
+        self.acquired = True
+        return True
+
+    def release(self):
+        if not self.acquired:
+            return
+
+        self.acquired = False
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+
+        try:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:namespace, :key)"),
+                {"namespace": self.namespace, "key": self.key},
+            )
+            connection.commit()
+            connection.close()
+        except Exception:
+            logger.exception("[ERROR] failed_to_release_advisory_lock name=%s", self.name)
+            # Discarding the DBAPI connection ends the session and its locks.
+            connection.invalidate()
+            connection.close()
+
+
+def get_shard():
+    """Return (shard_index, shard_count) from VALIDATE_TRX_SHARD_INDEX/COUNT."""
+    try:
+        shard_count = max(1, int(os.getenv("VALIDATE_TRX_SHARD_COUNT", "1")))
+        shard_index = int(os.getenv("VALIDATE_TRX_SHARD_INDEX", "0"))
+    except ValueError:
+        logger.warning("Ignoring invalid VALIDATE_TRX_SHARD_INDEX/COUNT values")
+        return 0, 1
+
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(
+            f"VALIDATE_TRX_SHARD_INDEX must be between 0 and {shard_count - 1}"
+        )
+    return shard_index, shard_count
+
+
+def account_lock_name(acc) -> str:
+    return f"{acc.get('bank_number')}|{acc.get('account_number')}"
+
+
+def account_in_shard(acc, shard_index: int, shard_count: int) -> bool:
+    return lock_key(account_lock_name(acc)) % shard_count == shard_index
+
+
+def acquire_run_lock(shard_index: int = 0, shard_count: int = 1) -> AdvisoryLock:
+    """Take the cluster-wide lock for one shard of the reconciliation job."""
+    lock = AdvisoryLock(
+        RUN_LOCK_NAMESPACE,
+        f"validate_trx:{shard_index}/{shard_count}",
+    )
+    if not lock.try_acquire():
+        raise ReconciliationAlreadyRunning(
+            "The reconciliation job is already running"
+        )
+    return lock
+
+
+def account_lock(acc) -> AdvisoryLock:
+    return AdvisoryLock(ACCOUNT_LOCK_NAMESPACE, account_lock_name(acc))
+
+
+def backfill_account_lock(acc) -> AdvisoryLock:
+    """Keeps two backfills off the same account."""
+    return AdvisoryLock(BACKFILL_LOCK_NAMESPACE, account_lock_name(acc))
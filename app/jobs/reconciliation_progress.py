@@ -0,0 +1,87 @@
+# app/jobs/reconciliation_progress.py
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from app.services.interbanking.stats import summarize_ib_calls
+
+COUNTER_NAMES = ("checked", "conciliated", "repeated", "expired", "skipped")
+
+# Phases timed inside each account; their timings are summed over accounts,
+# so with concurrent accounts they can add up to more than the run's wall time.
+ACCOUNT_PHASES = ("ib_fetch", "matching", "db_commit")
+
+
+class ReconciliationProgress:
+    """Live counters and phase timings of one reconciliation run.
+
+    Accounts register their own Counter with ``track_counters``; snapshots sum
+    them on demand, so the job never has to report each increment.
+    ``phase_timings`` holds the run's wall-clock phases plus ``ACCOUNT_PHASES``.
+    """
+
+    def __init__(self):
+        self.phase = None
+        self.phase_timings = {}
+        self.accounts_total = 0
+        self.accounts_done = 0
+        self.expired = 0
+        self.pending_total = 0
+        self.account_timings = []
+        self.ib_calls = Counter()
+        self._phase_started_at = None
+        self._account_counters = []
+
+    @contextmanager
+    def track_phase(self, name):
+        self.phase = name
+        self._phase_started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phase_timings[name] = round(
+                time.monotonic() - self._phase_started_at, 3
+            )
+            self.phase = None
+            self._phase_started_at = None
+
+    def track_counters(self, counters):
+        self._account_counters.append(counters)
+
+    def account_finished(self, account_timing=None):
+        self.accounts_done += 1
+        if account_timing is None:
+            return
+
+        self.account_timings.append(account_timing)
+        for name in ACCOUNT_PHASES:
+            self.phase_timings[name] = round(
+                self.phase_timings.get(name, 0) + account_timing.get(name, 0),
+                3,
+            )
+
+    def counters(self) -> dict:
+        # Counters are read key by key: commit threads may still be updating them.
+        totals = {
+            name: sum(counters.get(name, 0) for counters in list(self._account_counters))
+            for name in COUNTER_NAMES
+        }
+        totals["expired"] = self.expired
+        return totals
+
+    def snapshot(self) -> dict:
+        phase_timings = dict(self.phase_timings)
+        if self.phase is not None and self._phase_started_at is not None:
+            phase_timings[self.phase] = round(
+                time.monotonic() - self._phase_started_at, 3
+            )
+
+        return {
+            "phase": self.phase,
+            "accounts_total": self.accounts_total,
+            "accounts_done": self.accounts_done,
+            "counters": self.counters(),
+            "phase_timings": phase_timings,
+            "ib_calls": summarize_ib_calls(self.ib_calls),
+        }
@@ -0,0 +1,127 @@
+# app/jobs/reconciliation_runner.py
+
+import asyncio
+import datetime
+import logging
+import os
+import uuid
+from collections import OrderedDict
+
+from app.jobs.reconciliation_lock import (
+    ReconciliationAlreadyRunning,
+    acquire_run_lock,
+    get_shard,
+)
+from app.jobs.reconciliation_progress import ReconciliationProgress
+from app.jobs.validate_trx import run as run_reconciliation_job
+
+logger = logging.getLogger("validate_trx_job")
+
+
+class ReconciliationRun:
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.status = "queued"
+        self.submitted_at = datetime.datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = ReconciliationProgress()
+        self.result = None
+        self.error = None
+        self.task = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            **self.progress.snapshot(),
+            "account_timings": list(self.progress.account_timings),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ReconciliationRunner:
+    """Runs the reconciliation job as a background task of the API event loop.
+
+    ``submit`` takes the run lock before returning, so a second submission is
+    rejected right away instead of failing later in the background. Finished
+    runs are kept in memory (RECONCILIATION_RUNS_HISTORY, default 50).
+    """
+
+    def __init__(self, job=run_reconciliation_job, history_size=None):
+        self.job = job
+        self.history_size = history_size or int(
+            os.getenv("RECONCILIATION_RUNS_HISTORY", "50")
+        )
+        self.runs = OrderedDict()
+        self._submit_lock = asyncio.Lock()
+
+    def get(self, run_id: str):
+        return self.runs.get(run_id)
+
+    def active_run(self):
+        return next((run for run in self.runs.values() if not run.done), None)
+
+    async def submit(self, **job_kwargs) -> ReconciliationRun:
+        async with self._submit_lock:
+            # The advisory lock is a no-op outside Postgres, so guard this process too.
+            if self.active_run() is not None:
+                raise ReconciliationAlreadyRunning(
+                    "The reconciliation job is already running"
+                )
+
+            run_lock = await asyncio.to_thread(acquire_run_lock, *get_shard())
+            reconciliation_run = ReconciliationRun(uuid.uuid4().hex)
+            self.runs[reconciliation_run.run_id] = reconciliation_run
+            self._prune()
+            reconciliation_run.task = asyncio.create_task(
+                self._execute(reconciliation_run, run_lock, job_kwargs)
+            )
+            return reconciliation_run
+
+    async def _execute(self, reconciliation_run, run_lock, job_kwargs):
+        reconciliation_run.status = "running"
+        reconciliation_run.started_at = datetime.datetime.now()
+        logger.info("[RUN START] run_id=%s", reconciliation_run.run_id)
+        try:
+            reconciliation_run.result = await self.job(
+                run_lock=run_lock,
+                progress=reconciliation_run.progress,
+                run_id=reconciliation_run.run_id,
+                trigger="api",
+                **job_kwargs,
+            )
+            reconciliation_run.status = "succeeded"
+        except Exception as exc:
+            logger.exception("[ERROR] reconciliation_run_failed run_id=%s", reconciliation_run.run_id)
+            reconciliation_run.status = "failed"
+            reconciliation_run.error = str(exc) or exc.__class__.__name__
+        finally:
+            reconciliation_run.finished_at = datetime.datetime.now()
+            await asyncio.to_thread(run_lock.release)
+            logger.info(
+                "[RUN END] run_id=%s status=%s",
+                reconciliation_run.run_id,
+                reconciliation_run.status,
+            )
+
+    def _prune(self):
+        while len(self.runs) > self.history_size:
+            oldest_id = next(
+                (run_id for run_id, run in self.runs.items() if run.done),
+                None,
+            )
+            if oldest_id is None:
+                return
+            del self.runs[oldest_id]
+
+
+reconciliation_runner = ReconciliationRunner()
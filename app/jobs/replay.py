@@ -0,0 +1,435 @@
+# app/jobs/replay.py
+"""Record Interbanking data and replay the reconciliation job offline.
+
+Recording reads the pending trx from DATABASE_URL and the accounts and
+movements they need from Interbanking:
+
+    python -m app.jobs.replay record --output fixtures/2026-08-10
+
+Replaying seeds a test database (DATABASE_URL, SQLite or Postgres) with the
+recorded pending trx and runs validate_trx against a fake Interbanking client
+that serves the recorded responses with the given latency:
+
+    DATABASE_URL=sqlite:////tmp/replay.db \\
+        python -m app.jobs.replay replay --fixture fixtures/2026-08-10 \\
+        --reset-database --latency-ms 150
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import sqlite3
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import func, insert, select
+
+from app.db.database import SessionLocal, engine
+from app.jobs import validate_trx
+from app.jobs.reconciliation_progress import ReconciliationProgress
+from app.models import (
+    Base,
+    Clients,
+    Currency,
+    CustomersBalance,
+    Entity,
+    Permission,
+    Trx,
+)
+from app.services.BusinessCalendarService import BusinessCalendarService
+from app.services.InterBankingService import InterBankingService
+from app.services.interbanking.movements import parse_movement_date
+from app.services.interbanking.stats import record_ib_call, summarize_ib_calls
+
+load_dotenv()
+
+logger = logging.getLogger("validate_trx_job")
+
+# The job binds Decimal amounts; sqlite3 has no adapter for them.
+sqlite3.register_adapter(Decimal, float)
+
+SEED_CHUNK_SIZE = 5000
+
+
+def account_key(bank_number, account_number):
+    return f"{bank_number}_{account_number}"
+
+
+class ReplayFixture:
+    """Recorded accounts, pending trx, movements and holidays of one job run.
+
+    Layout of the fixture directory::
+
+        manifest.json
+        accounts.json          get_accounts() response
+        pending_trx.json       get_pending_trx() rows
+        holidays.json          {"2026": ["2026-01-01", ...]}
+        movements/<bank>_<account>.json
+    """
+
+    def __init__(self, accounts, pending_trx, movements, holidays):
+        self.accounts = accounts
+        self.pending_trx = pending_trx
+        self.movements = movements
+        self.holidays = holidays
+
+    def save(self, path):
+        path = Path(path)
+        (path / "movements").mkdir(parents=True, exist_ok=True)
+
+        def dump(file_path, payload):
+            with open(file_path, "w", encoding="utf-8") as fixture_file:
+                json.dump(payload, fixture_file, default=str)
+
+        dump(path / "accounts.json", self.accounts)
+        dump(path / "pending_trx.json", self.pending_trx)
+        dump(
+            path / "holidays.json",
+            {
+                str(year): sorted(day.isoformat() for day in days)
+                for year, days in self.holidays.items()
+            },
+        )
+        for key, movements in self.movements.items():
+            dump(path / "movements" / f"{key}.json", movements)
+        dump(
+            path / "manifest.json",
+            {
+                "recorded_at": datetime.datetime.now().isoformat(),
+                "accounts": len(self.accounts.get("accounts", [])),
+                "pending_transactions": len(self.pending_trx),
+                "movements": sum(len(movements) for movements in self.movements.values()),
+            },
+        )
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+
+        def read(file_path):
+            with open(file_path, encoding="utf-8") as fixture_file:
+                return json.load(fixture_file)
+
+        pending_trx = read(path / "pending_trx.json")
+        for trx in pending_trx:
+            for name in ("trx_date", "next_check_at"):
+                if trx.get(name):
+                    trx[name] = datetime.datetime.fromisoformat(trx[name])
+
+        return cls(
+            accounts=read(path / "accounts.json"),
+            pending_trx=pending_trx,
+            movements={
+                movements_path.stem: read(movements_path)
+                for movements_path in sorted((path / "movements").glob("*.json"))
+            },
+            holidays={
+                int(year): {datetime.date.fromisoformat(day) for day in days}
+                for year, days in read(path / "holidays.json").items()
+            },
+        )
+
+
+class ReplayInterBankingService(InterBankingService):
+    """InterBankingService serving recorded responses with injected latency.
+
+    Only the network calls are replaced: the movement store and the reads
+    through ``get_stored_movement`` run as in production.
+    """
+
+    def __init__(self, fixture: ReplayFixture, latency_seconds: float = 0.0):
+        super().__init__()
+        self.fixture = fixture
+        self.latency_seconds = latency_seconds
+
+    async def _update_token(self):
+        return None
+
+    async def _respond(self, service_name, payload):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        record_ib_call(service_name, len(json.dumps(payload, default=str)))
+        return payload
+
+    async def get_accounts(self):
+        return await self._respond("Interbanking accounts", self.fixture.accounts)
+
+    def _recorded_movements(self, account_number, bank_number, date_since, date_until):
+        since = datetime.date.fromisoformat(str(date_since)[:10]) if date_since else None
+        until = datetime.date.fromisoformat(str(date_until)[:10]) if date_until else None
+        return [
+            movement
+            for movement in self.fixture.movements.get(
+                account_key(bank_number, account_number), []
+            )
+            if (since is None or parse_movement_date(movement["movement_date"]) >= since)
+            and (until is None or parse_movement_date(movement["movement_date"]) <= until)
+        ]
+
+    async def sync_movement(self, account_number, bank_number, date_since, date_until):
+        movements = self._recorded_movements(
+            account_number, bank_number, date_since, date_until
+        )
+        result = await self._respond(
+            "Interbanking movements",
+            {"movements_detail": movements},
+        )
+        stored_count = await self._store_movements(
+            account_number,
+            bank_number,
+            date_since,
+            date_until,
+            movements,
+        )
+        return result, stored_count
+
+    async def iter_historical_movements(
+        self, account_number, bank_number, date_since, date_until, envelope=None
+    ):
+        result = await self.get_historical_movement(
+            account_number, bank_number, date_since, date_until
+        )
+        for movement in result["movements_detail"]:
+            yield movement
+
+    async def get_historical_movement(
+        self, account_number, bank_number, date_since, date_until
+    ):
+        return await self._respond(
+            "Interbanking historical movements",
+            {
+                "movements_detail": self._recorded_movements(
+                    account_number, bank_number, date_since, date_until
+                )
+            },
+        )
+
+
+async def record_fixture(output_path):
+    """Record the pending trx and the Interbanking data the job would read."""
+    ib_service = InterBankingService()
+    business_calendar = BusinessCalendarService()
+
+    accounts_model = await ib_service.get_accounts()
+    pending_trx = [
+        dict(trx) for trx in await asyncio.to_thread(validate_trx.get_pending_trx)
+    ]
+    pending_by_account = validate_trx.group_pending_trx_by_account(pending_trx)
+
+    movements = {}
+    for acc in accounts_model.get("accounts", []):
+        trx_windows = {}
+        account_pending_trx = validate_trx.get_account_pending_trx(
+            pending_by_account,
+            acc,
+        )
+        settlement_dates = await business_calendar.settlement_dates(
+            trx["trx_date"].date() for trx in account_pending_trx
+        )
+        for trx, settlement_date in zip(account_pending_trx, settlement_dates):
+            trx_date = trx["trx_date"].date()
+            trx_windows[trx["trx_id"]] = validate_trx.get_trx_fetch_window(
+                trx_date,
+                settlement_date,
+            )
+
+        account_movements = {}
+        for fetch_range in validate_trx.plan_movement_fetches(trx_windows):
+            result = await ib_service.get_movement(
+                account_number=acc.get("account_number"),
+                bank_number=acc.get("bank_number"),
+                date_since=fetch_range["date_since"].isoformat(),
+                date_until=fetch_range["date_until"].isoformat(),
+            )
+            for movement in result.get("movements_detail") or []:
+                fingerprint = validate_trx.build_interbanking_fingerprint(
+                    movement,
+                    bank_number=acc.get("bank_number"),
+                    account_number=acc.get("account_number"),
+                )
+                account_movements[fingerprint] = movement
+
+        movements[account_key(acc.get("bank_number"), acc.get("account_number"))] = list(
+            account_movements.values()
+        )
+
+    years = {trx["trx_date"].year for trx in pending_trx}
+    holidays = {year: await business_calendar.get_holidays(year) for year in years}
+    holidays.update(
+        {year + 1: await business_calendar.get_holidays(year + 1) for year in years}
+    )
+
+    fixture = ReplayFixture(accounts_model, pending_trx, movements, holidays)
+    fixture.save(output_path)
+    logger.info(
+        "[REPLAY] fixture_recorded path=%s accounts=%s pending_transactions=%s",
+        output_path,
+        len(accounts_model.get("accounts", [])),
+        len(pending_trx),
+    )
+    return fixture
+
+
+def reset_database():
+    """Drop and recreate every table of DATABASE_URL. Only for test databases."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def seed_database(fixture: ReplayFixture):
+    """Insert the fixture's pending trx with the balances and currencies they use."""
+    Base.metadata.create_all(engine)
+
+    db = SessionLocal()
+    try:
+        if db.execute(select(func.count()).select_from(Trx)).scalar():
+            raise RuntimeError(
+                "The replay database already has trx; use --reset-database"
+            )
+
+        db.execute(
+            insert(Permission),
+            [{"id": 1, "level": "replay", "hierarchy": 0}],
+        )
+        db.execute(
+            insert(Entity),
+            [{"id": 1, "name": "replay", "mail": "replay@example.com"}],
+        )
+
+        currency_ids = {}
+        balances = {}
+        for trx in fixture.pending_trx:
+            currency_name = trx.get("currency_name") or "ARS"
+            currency_ids.setdefault(currency_name, len(currency_ids) + 1)
+            balances.setdefault(
+                trx["customer_balance_id"],
+                {
+                    "id": trx["customer_balance_id"],
+                    "client_id": trx["customer_balance_id"],
+                    "balance_amount": float(trx.get("customer_balance_amount") or 0),
+                    "fee_amount": 0.0,
+                    "fee_percentage": float(trx.get("fee_percentage") or 0),
+                    "balance_currency_id": currency_ids[currency_name],
+                    "enabled": True,
+                },
+            )
+
+        db.execute(
+            insert(Currency),
+            [{"id": currency_id, "name": name} for name, currency_id in currency_ids.items()],
+        )
+        db.execute(
+            insert(Clients),
+            [
+                {
+                    "id": balance_id,
+                    "first_name": "Replay",
+                    "last_name": str(balance_id),
+                    "email": f"replay-{balance_id}@example.com",
+                    "hashed_password": "",
+                    "perm_id": 1,
+                    "entity_id": 1,
+                }
+                for balance_id in balances
+            ],
+        )
+        db.execute(insert(CustomersBalance), list(balances.values()))
+
+        trx_rows = [
+            {
+                "trx_id": trx["trx_id"],
+                "emisor_cbu": trx.get("trx_emisor_cbu"),
+                "emisor_name": "replay",
+                "emisor_cuit": "replay",
+                "receptor_cbu": trx.get("trx_receptor_cbu") or "",
+                "entity_id": 1,
+                "client_id": trx["customer_balance_id"],
+                "amount": float(trx["trx_amount"]),
+                "date": trx["trx_date"],
+                "status": "pendiente",
+                "account_id": trx["customer_balance_id"],
+                "next_check_at": trx.get("next_check_at"),
+                "check_attempts": trx.get("check_attempts") or 0,
+            }
+            for trx in fixture.pending_trx
+        ]
+        for chunk_start in range(0, len(trx_rows), SEED_CHUNK_SIZE):
+            db.execute(insert(Trx), trx_rows[chunk_start : chunk_start + SEED_CHUNK_SIZE])
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def replay_fixture(fixture: ReplayFixture, latency_seconds: float = 0.0) -> dict:
+    """Run validate_trx once against the fixture; the database must be seeded."""
+    # Pre-load the recorded calendar so no holiday API call is made.
+    for year, days in fixture.holidays.items():
+        BusinessCalendarService.cache_holidays(year, days)
+
+    progress = ReconciliationProgress()
+    started_at = time.perf_counter()
+    result = await validate_trx.run(
+        due_only=False,
+        progress=progress,
+        trigger="replay",
+        ib_service=ReplayInterBankingService(fixture, latency_seconds),
+    )
+    duration = time.perf_counter() - started_at
+    ib_calls = summarize_ib_calls(progress.ib_calls)
+
+    return {
+        **result,
+        "pending_transactions": progress.pending_total,
+        "wall_seconds": round(duration, 3),
+        "trx_per_second": round(progress.pending_total / duration, 2) if duration else None,
+        "ib_calls": ib_calls["calls"],
+        "ib_bytes": ib_calls["bytes"],
+        "ib_calls_per_trx": (
+            round(ib_calls["calls"] / progress.pending_total, 4)
+            if progress.pending_total
+            else None
+        ),
+        "phase_timings": progress.phase_timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record")
+    record_parser.add_argument("--output", required=True)
+
+    replay_parser = subparsers.add_parser("replay")
+    replay_parser.add_argument("--fixture", required=True)
+    replay_parser.add_argument("--latency-ms", type=float, default=0.0)
+    replay_parser.add_argument(
+        "--reset-database",
+        action="store_true",
+        help="drop and recreate every table of DATABASE_URL before seeding",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_fixture(args.output))
+        return
+
+    fixture = ReplayFixture.load(args.fixture)
+    if args.reset_database:
+        reset_database()
+    seed_database(fixture)
+    report = asyncio.run(replay_fixture(fixture, args.latency_ms / 1000))
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# app/jobs/sync_ib_movements.py
+
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from app.jobs.validate_trx import run as run_reconciliation
+from app.services.InterBankingService import InterBankingService
+from app.services.interbanking.store import (
+    MovementStore,
+    get_closed_until,
+    get_latest_movement_date,
+)
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s",
+)
+
+logger = logging.getLogger("sync_ib_movements_job")
+
+
+def get_int_env(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        logger.warning("Ignoring invalid %s value", name)
+        return default
+
+
+def get_sync_since(watermark, today):
+    """Start at the watermark day (inclusive) or the initial lookback window.
+
+    Days after ``get_closed_until()`` can still receive movements, so they are
+    fetched again even when the watermark has already passed them.
+    """
+    if watermark and watermark.get("last_movement_date"):
+        return min(
+            watermark["last_movement_date"],
+            get_closed_until(today) + datetime.timedelta(days=1),
+        )
+    return today - datetime.timedelta(days=get_int_env("IB_SYNC_INITIAL_DAYS", 7))
+
+
+async def sync_account(ib_service, movement_store, acc, today):
+    """Fetch the delta since the account watermark and persist it.
+
+    Returns how many movements were new to the local store.
+    """
+    account_number = acc.get("account_number")
+    bank_number = acc.get("bank_number")
+
+    watermark = await asyncio.to_thread(
+        movement_store.get_watermark,
+        bank_number,
+        account_number,
+    )
+    date_since = get_sync_since(watermark, today)
+
+    result, stored_count = await ib_service.sync_movement(
+        account_number,
+        bank_number,
+        date_since=date_since.isoformat(),
+        date_until=today.isoformat(),
+    )
+    movements = result.get("movements_detail") or []
+
+    await asyncio.to_thread(
+        movement_store.save_watermark,
+        bank_number,
+        account_number,
+        get_latest_movement_date(movements),
+    )
+
+    logger.info(
+        "[SYNC] account_number=%s bank_number=%s range_start=%s range_end=%s movements=%s new=%s",
+        account_number,
+        bank_number,
+        date_since,
+        today,
+        len(movements),
+        stored_count,
+    )
+    return stored_count
+
+
+async def sync_once(ib_service=None, movement_store=None, today=None):
+    """Sync every IB account once.
+
+    Returns new movement counts keyed by (bank_number, account_number): the same
+    account number can exist at more than one bank.
+    """
+    ib_service = ib_service or InterBankingService()
+    movement_store = movement_store or MovementStore()
+    today = today or datetime.date.today()
+
+    accounts_model = await ib_service.get_accounts()
+    new_movements = {}
+
+    for acc in accounts_model.get("accounts", []):
+        try:
+            new_movements[(acc.get("bank_number"), acc.get("account_number"))] = await sync_account(
+                ib_service,
+                movement_store,
+                acc,
+                today,
+            )
+        except Exception:
+            logger.exception(
+                "[ERROR] account_sync_failed account_number=%s",
+                acc.get("account_number"),
+            )
+
+    return new_movements
+
+
+async def run_forever(interval_seconds, reconcile_on_new_movements=True):
+    ib_service = InterBankingService()
+    movement_store = MovementStore()
+
+    while True:
+        started_at = time.monotonic()
+
+        try:
+            new_movements = await sync_once(ib_service, movement_store)
+            changed_accounts = {
+                account_number
+                for (_, account_number), stored_count in new_movements.items()
+                if stored_count
+            }
+
+            if changed_accounts and reconcile_on_new_movements:
+                logger.info(
+                    "[SYNC] triggering_reconciliation accounts=%s",
+                    sorted(changed_accounts),
+                )
+                # New movements make every pending trx of the account worth a check.
+                await run_reconciliation(
+                    account_numbers=changed_accounts,
+                    due_only=False,
+                    trigger="movement_sync",
+                )
+        except Exception:
+            logger.exception("[ERROR] movement_sync_iteration_failed")
+
+        elapsed = time.monotonic() - started_at
+        await asyncio.sleep(max(0.0, interval_seconds - elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Poll Interbanking for new movements and store them locally."
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Sync every account once and exit.",
+    )
+    args = parser.parse_args()
+
+    if os.getenv("IB_MOVEMENTS_STORE_ENABLED", "true").lower() != "true":
+        logger.warning(
+            "[SYNC] movement store disabled (IB_MOVEMENTS_STORE_ENABLED=false); nothing to sync, exiting"
+        )
+        return
+
+    if args.once:
+        asyncio.run(sync_once())
+        return
+
+    asyncio.run(
+        run_forever(
+            interval_seconds=get_int_env("IB_SYNC_INTERVAL_SECONDS", 300),
+            reconcile_on_new_movements=(
+                os.getenv("IB_SYNC_RECONCILE_ON_NEW_MOVEMENTS", "true").lower()
+                == "true"
+            ),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
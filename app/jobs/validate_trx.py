@@ -2,17 +2,45 @@
 
 import asyncio
 import datetime
-import hashlib
 import logging
+import os
+import time
+import uuid
+from collections import Counter, defaultdict
 from decimal import Decimal
 
 from dotenv import load_dotenv
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import bindparam, text
+from sqlalchemy import DateTime, bindparam, text
 
 from app.db.database import SessionLocal
+from app.jobs.reconciliation_lock import (
+    ReconciliationAlreadyRunning,
+    account_in_shard,
+    account_lock,
+    acquire_run_lock,
+    get_shard,
+)
+from app.jobs.reconciliation_history import ReconciliationHistory
+from app.jobs.reconciliation_progress import ReconciliationProgress
 from app.services.BusinessCalendarService import BusinessCalendarService
 from app.services.InterBankingService import InterBankingService
+from app.services.interbanking.client import get_connection_stats
+from app.services.interbanking.coalescing import get_coalescing_stats
+from app.services.interbanking.stats import collect_ib_calls
+from app.services.interbanking.throttle import (
+    InterBankingUnavailable,
+    circuit_breaker,
+    get_throttle_state,
+)
+from app.services.interbanking.movements import (
+    amount_to_cents,
+    build_interbanking_fingerprint,
+    normalize_amount,
+    parse_movement_date,
+    parse_movement_datetime,
+)
+from app.jobs.assignment import assign_pairs
 from app.bank_codes import codes
 
 load_dotenv()
@@ -24,14 +52,27 @@ logging.basicConfig(
 
 logger = logging.getLogger("validate_trx_job")
 
-SQL = """
+FINGERPRINT_LOOKUP_CHUNK_SIZE = 1000
+COMMIT_CHUNK_SIZE = 500
+
+# Must stay identical to the ix_trx_pending_normalized_receptor index expression
+# so PostgreSQL can serve the pending lookup from that partial index.
+# Must stay identical to normalize_receptor_account and ix_trx_pending_normalized_receptor.
+NORMALIZED_RECEPTOR_SQL = (
+    "REPLACE(REPLACE(COALESCE(trx.receptor_cbu, ''), ' ', ''), '-', '')"
+)
+
+SQL = f"""
 SELECT
   trx.trx_id AS trx_id,
   trx.emisor_cbu AS trx_emisor_cbu,
   trx.receptor_cbu AS trx_receptor_cbu,
+  {NORMALIZED_RECEPTOR_SQL} AS normalized_receptor_account,
   trx.amount AS trx_amount,
   trx.date AS trx_date,
   trx.status AS trx_status,
+  trx.next_check_at AS next_check_at,
+  trx.check_attempts AS check_attempts,
   customers_balance.id AS customer_balance_id,
   customers_balance.balance_amount AS customer_balance_amount,
   customers_balance.fee_percentage AS fee_percentage,
@@ -39,16 +80,28 @@ SELECT
 FROM trx
 LEFT JOIN customers_balance ON trx.account_id = customers_balance.id
 LEFT JOIN currency ON customers_balance.balance_currency_id = currency.id
-WHERE trx.status = 'pendiente';
+WHERE trx.status = 'pendiente'
 """
 
+# Trx past the expiration cutoff stay due so they get a last check before expiring.
+DUE_SQL = """
+  AND (
+    trx.next_check_at IS NULL
+    OR trx.next_check_at <= :now
+    OR trx.date <= :cutoff
+  )
+"""
 
-def normalize_account(value):
-    return str(value or "").replace(" ", "").replace("-", "").strip()
+ACCOUNT_KEYS_SQL = f"""
+  AND {NORMALIZED_RECEPTOR_SQL} IN :account_keys
+"""
 
+ORDER_SQL = """
+ORDER BY normalized_receptor_account, trx.date, trx.trx_id;
+"""
 
-def normalize_fingerprint_value(value):
-    return str(value or "").strip().upper()
+# Drivers without native datetimes (SQLite replays) return these as strings.
+PENDING_TRX_COLUMN_TYPES = {"trx_date": DateTime, "next_check_at": DateTime}
 
 
 def get_bank_name_from_cbu(cbu: str) -> str:
@@ -56,11 +109,52 @@ def get_bank_name_from_cbu(cbu: str) -> str:
     return codes.get(bank_code, "Banco desconocido")
 
 
-def get_pending_trx():
-    db = SessionLocal()
+def normalize_receptor_account(value):
+    """Python twin of NORMALIZED_RECEPTOR_SQL: drops spaces and hyphens."""
+    return str(value or "").replace(" ", "").replace("-", "")
+
+
+def get_account_keys(acc):
+    """Normalized receptor accounts (CBU and account number) of an IB account."""
+    return {
+        normalize_receptor_account(acc.get("account_cbu")),
+        normalize_receptor_account(acc.get("account_number")),
+    } - {""}
+
+
+def get_pending_trx(reference_time=None, due_only=False, account_keys=None):
+    """Load pending trx; with ``due_only`` skip those scheduled for a later check.
+
+    ``account_keys`` limits the query to those normalized receptor accounts,
+    which the partial index on NORMALIZED_RECEPTOR_SQL serves.
+    """
+    reference_time = reference_time or datetime.datetime.now()
+    if account_keys is not None and not account_keys:
+        return []
+
+    statement = SQL
+    params = {}
+    if due_only:
+        statement += DUE_SQL
+        params.update(
+            now=reference_time,
+            cutoff=get_expiration_cutoff(reference_time),
+        )
+    if account_keys is not None:
+        statement += ACCOUNT_KEYS_SQL
+        params["account_keys"] = sorted(account_keys)
 
+    query = text(statement + ORDER_SQL)
+    if account_keys is not None:
+        query = query.bindparams(bindparam("account_keys", expanding=True))
+
+    db = SessionLocal()
     try:
-        return db.execute(text(SQL)).mappings().all()
+        return (
+            db.execute(query.columns(**PENDING_TRX_COLUMN_TYPES), params)
+            .mappings()
+            .all()
+        )
     except Exception:
         logger.exception("[ERROR] failed_to_fetch_pending_transactions")
         raise
@@ -68,6 +162,23 @@ def get_pending_trx():
         db.close()
 
 
+def group_pending_trx_by_account(pending_transactions):
+    """Index pending rows by the normalized receptor account computed in SQL."""
+    pending_by_account = defaultdict(list)
+    for trx in pending_transactions:
+        pending_by_account[trx.get("normalized_receptor_account")].append(trx)
+    return pending_by_account
+
+
+def get_account_pending_trx(pending_by_account, acc):
+    account_keys = get_account_keys(acc)
+    return [
+        trx
+        for account_key in sorted(account_keys)
+        for trx in pending_by_account.get(account_key, ())
+    ]
+
+
 def get_expiration_cutoff(reference_time=None):
     return (reference_time or datetime.datetime.now()) - relativedelta(months=1)
 
@@ -107,36 +218,6 @@ def expire_old_pending_trx(trx_ids, reference_time=None):
         db.close()
 
 
-def normalize_amount(value):
-    return Decimal(str(value)).quantize(Decimal("0.01"))
-
-
-def normalize_movement_date(value):
-    if not value:
-        return ""
-    return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00")).date().isoformat()
-
-
-def build_interbanking_fingerprint(movement, bank_number, account_number):
-    stable_key = "|".join(
-        [
-            normalize_fingerprint_value(bank_number),
-            normalize_fingerprint_value(account_number),
-            normalize_fingerprint_value(movement.get("voucher_number")),
-            normalize_fingerprint_value(movement.get("correlative_number")),
-            normalize_fingerprint_value(movement.get("operation_code_bank")),
-            normalize_fingerprint_value(movement.get("operation_code_ib")),
-            normalize_fingerprint_value(movement.get("branch_office_activity")),
-            normalize_fingerprint_value(movement.get("debit_credit_type")),
-            normalize_movement_date(movement.get("movement_date")),
-            str(normalize_amount(movement.get("amount"))),
-            normalize_fingerprint_value(movement.get("customer_cuit")),
-            normalize_account(movement.get("account_cbu")),
-        ]
-    )
-    return hashlib.sha256(stable_key.encode("utf-8")).hexdigest()
-
-
 def find_trx_by_fingerprint(document_fingerprint, current_trx_id):
     db = SessionLocal()
     try:
@@ -169,71 +250,227 @@ def find_trx_by_fingerprint(document_fingerprint, current_trx_id):
         db.close()
 
 
+def find_trx_by_fingerprints(document_fingerprints):
+    """Return the trx rows already holding each fingerprint, chunked by IN lists."""
+    document_fingerprints = sorted(set(document_fingerprints))
+    owners = defaultdict(list)
+    if not document_fingerprints:
+        return owners
+
+    db = SessionLocal()
+    try:
+        statement = text(
+            """
+            SELECT document_fingerprint, trx_id, status
+            FROM trx
+            WHERE document_fingerprint IN :document_fingerprints
+            ORDER BY id
+            """
+        ).bindparams(bindparam("document_fingerprints", expanding=True))
+
+        for chunk_start in range(
+            0, len(document_fingerprints), FINGERPRINT_LOOKUP_CHUNK_SIZE
+        ):
+            chunk = document_fingerprints[
+                chunk_start : chunk_start + FINGERPRINT_LOOKUP_CHUNK_SIZE
+            ]
+            rows = db.execute(
+                statement,
+                {"document_fingerprints": chunk},
+            ).mappings()
+            for row in rows:
+                owners[row["document_fingerprint"]].append(
+                    {"trx_id": row["trx_id"], "status": row["status"]}
+                )
+
+        return owners
+    except Exception:
+        logger.exception(
+            "[ERROR] failed_to_find_fingerprints fingerprints=%s",
+            len(document_fingerprints),
+        )
+        raise
+    finally:
+        db.close()
+
+
+class FingerprintRegistry:
+    """Fingerprint owners known to one reconciliation run.
+
+    Stored owners are loaded in bulk with ``load`` and fingerprints assigned
+    during the run are recorded with ``claim``, so a movement consumed by one
+    pending trx is seen as used by every later trx in the same run.
+    """
+
+    def __init__(self):
+        self._owners = defaultdict(list)
+        self._loaded = set()
+
+    def load(self, document_fingerprints):
+        missing = set(document_fingerprints) - self._loaded
+        if not missing:
+            return
+
+        for document_fingerprint, owners in find_trx_by_fingerprints(missing).items():
+            self._owners[document_fingerprint].extend(owners)
+        self._loaded.update(missing)
+
+    def find_duplicate(self, document_fingerprint, current_trx_id):
+        if document_fingerprint not in self._loaded:
+            return find_trx_by_fingerprint(document_fingerprint, current_trx_id)
+
+        for owner in self._owners.get(document_fingerprint, ()):
+            if owner["trx_id"] != current_trx_id:
+                return owner
+        return None
+
+    def claim(self, document_fingerprint, trx_id, status):
+        self._owners[document_fingerprint].append(
+            {"trx_id": trx_id, "status": status}
+        )
+
+
+class MovementIndex:
+    """IB movements of one fetched batch keyed by (cents, movement date, debit/credit type).
+
+    Amounts and dates are parsed once when the batch is indexed, so each
+    transaction lookup is a dictionary access instead of a scan of the batch.
+    Candidates are returned in the order IB delivered them.
+    """
+
+    def __init__(self, movements=()):
+        self.movements = []
+        self._positions_by_key = defaultdict(list)
+        self._fingerprints = {}
+        for movement in movements:
+            self.add(movement)
+
+    def __len__(self):
+        return len(self.movements)
+
+    def add(self, movement):
+        position = len(self.movements)
+        self.movements.append(movement)
+
+        try:
+            key = (
+                abs(amount_to_cents(movement.get("amount"))),
+                parse_movement_date(movement.get("movement_date")),
+                movement.get("debit_credit_type"),
+            )
+        except (ArithmeticError, TypeError, ValueError):
+            logger.warning(
+                "[WARNING] ib_movement_not_indexed amount=%s movement_date=%s",
+                movement.get("amount"),
+                movement.get("movement_date"),
+            )
+            return
+
+        self._positions_by_key[key].append(position)
+
+    def candidate_positions(self, amount, movement_dates, movement_type="C"):
+        cents = abs(amount_to_cents(amount))
+        positions = []
+        for movement_date in movement_dates:
+            positions.extend(
+                self._positions_by_key.get((cents, movement_date, movement_type), ())
+            )
+        return sorted(positions)
+
+    def fingerprint(self, position, bank_number, account_number):
+        document_fingerprint = self._fingerprints.get(position)
+        if document_fingerprint is None:
+            document_fingerprint = build_interbanking_fingerprint(
+                self.movements[position],
+                bank_number=bank_number,
+                account_number=account_number,
+            )
+            self._fingerprints[position] = document_fingerprint
+        return document_fingerprint
+
+    def candidates(self, amount, movement_dates, movement_type="C"):
+        return [
+            self.movements[position]
+            for position in self.candidate_positions(
+                amount,
+                movement_dates,
+                movement_type,
+            )
+        ]
+
+
 def match_trx_with_ib(
     trx,
     ib_movements,
     bank_number,
     account_number,
     valid_movement_dates=None,
+    fingerprint_registry=None,
 ):
+    """Return the first credit movement matching the trx amount on a valid date.
+
+    ``ib_movements`` may be a prebuilt ``MovementIndex`` or a plain movement list.
+    A candidate already used by another trx is only returned when no unused
+    candidate exists. Without a ``fingerprint_registry`` each candidate is
+    looked up in the database individually.
+    """
+    if not isinstance(ib_movements, MovementIndex):
+        ib_movements = MovementIndex(ib_movements)
+
     trx_amount = normalize_amount(trx["trx_amount"])
     trx_date = trx["trx_date"].date()
     valid_movement_dates = set(valid_movement_dates or [trx_date])
     duplicated_match = None
 
-    for mov in ib_movements:
-        mov_amount = normalize_amount(mov.get("amount"))
-        mov_date = datetime.datetime.fromisoformat(
-            mov.get("movement_date")
-        ).date()
-        mov_type = mov.get("debit_credit_type")
-
-        amount_matches = abs(trx_amount) == abs(mov_amount)
-        date_matches = mov_date in valid_movement_dates
-        type_matches = mov_type == "C"
-
-        if amount_matches or date_matches:
-            logger.info(
-                "[IB CANDIDATE] trx_amount=%s mov_amount=%s amount_match=%s valid_dates=%s mov_date=%s date_match=%s type=%s",
-                trx_amount,
-                mov_amount,
-                amount_matches,
-                sorted(valid_movement_dates),
-                mov_date,
-                date_matches,
-                mov_type,
-            )
+    for position in ib_movements.candidate_positions(
+        trx_amount,
+        valid_movement_dates,
+    ):
+        mov = ib_movements.movements[position]
+        logger.info(
+            "[IB CANDIDATE] trx_id=%s trx_amount=%s mov_amount=%s valid_dates=%s mov_date=%s",
+            trx["trx_id"],
+            trx_amount,
+            mov.get("amount"),
+            sorted(valid_movement_dates),
+            mov.get("movement_date"),
+        )
 
-        if amount_matches and date_matches and type_matches:
-            document_fingerprint = build_interbanking_fingerprint(
-                mov,
-                bank_number=bank_number,
-                account_number=account_number,
-            )
+        document_fingerprint = ib_movements.fingerprint(
+            position,
+            bank_number=bank_number,
+            account_number=account_number,
+        )
+        if fingerprint_registry is None:
             duplicated_trx = find_trx_by_fingerprint(
                 document_fingerprint=document_fingerprint,
                 current_trx_id=trx["trx_id"],
             )
-            matched_result = {
-                "movement": mov,
-                "document_fingerprint": document_fingerprint,
-                "duplicated_trx": duplicated_trx,
-            }
+        else:
+            duplicated_trx = fingerprint_registry.find_duplicate(
+                document_fingerprint,
+                trx["trx_id"],
+            )
+        matched_result = {
+            "movement": mov,
+            "document_fingerprint": document_fingerprint,
+            "duplicated_trx": duplicated_trx,
+        }
 
-            if duplicated_trx:
-                logger.info(
-                    "[IB MATCH USED] trx_id=%s duplicate_of=%s fingerprint=%s voucher_number=%s customer_cuit=%s",
-                    trx["trx_id"],
-                    duplicated_trx.get("trx_id"),
-                    document_fingerprint,
-                    mov.get("voucher_number"),
-                    mov.get("customer_cuit"),
-                )
-                if duplicated_match is None:
-                    duplicated_match = matched_result
-                continue
+        if duplicated_trx:
+            logger.info(
+                "[IB MATCH USED] trx_id=%s duplicate_of=%s fingerprint=%s voucher_number=%s customer_cuit=%s",
+                trx["trx_id"],
+                duplicated_trx.get("trx_id"),
+                document_fingerprint,
+                mov.get("voucher_number"),
+                mov.get("customer_cuit"),
+            )
+            if duplicated_match is None:
+                duplicated_match = matched_result
+            continue
 
-            return matched_result
+        return matched_result
 
     if duplicated_match:
         return duplicated_match
@@ -241,6 +478,107 @@ def match_trx_with_ib(
     return None
 
 
+# Added to the cost of a movement dated on another day than the trx, so any
+# same-day movement is preferred whatever its time distance.
+DATE_MISMATCH_PENALTY_SECONDS = 10**7
+
+
+def match_cost(trx_datetime, movement):
+    """Cost of pairing a trx with a movement: other day first, then seconds apart."""
+    try:
+        movement_at = parse_movement_datetime(movement.get("movement_date"))
+    except (TypeError, ValueError):
+        return 2 * DATE_MISMATCH_PENALTY_SECONDS
+
+    cost = abs(int((movement_at - trx_datetime).total_seconds()))
+    if movement_at.date() != trx_datetime.date():
+        cost += DATE_MISMATCH_PENALTY_SECONDS
+    return cost
+
+
+def assign_movements(
+    movement_index,
+    trx_ids,
+    pending_by_id,
+    valid_dates_by_id,
+    fingerprint_registry,
+    bank_number,
+    account_number,
+):
+    """Match the trx of one fetched range against its movements all at once.
+
+    Trx are grouped by amount and each group is solved as an assignment:
+    as many trx as possible get a movement not used by any other trx, same-day
+    movements first and then the closest in time. Returns
+    ``trx_id -> matched_result`` (see ``match_trx_with_ib``) or None for trx
+    without candidates. Trx left without a free movement are reported against
+    the first candidate taken by another trx, like ``match_trx_with_ib`` does.
+    """
+    trx_ids_by_cents = defaultdict(list)
+    for trx_id in trx_ids:
+        cents = abs(amount_to_cents(pending_by_id[trx_id].get("trx_amount")))
+        trx_ids_by_cents[cents].append(trx_id)
+
+    results = {}
+    for group_trx_ids in trx_ids_by_cents.values():
+        candidates_by_trx = {}
+        pairs = {}
+        for trx_id in group_trx_ids:
+            trx = pending_by_id[trx_id]
+            positions = movement_index.candidate_positions(
+                trx.get("trx_amount"),
+                valid_dates_by_id[trx_id],
+            )
+            candidates_by_trx[trx_id] = positions
+            for position in positions:
+                document_fingerprint = movement_index.fingerprint(
+                    position,
+                    bank_number=bank_number,
+                    account_number=account_number,
+                )
+                if fingerprint_registry.find_duplicate(document_fingerprint, trx_id):
+                    continue
+                pairs[(trx_id, position)] = match_cost(
+                    trx["trx_date"],
+                    movement_index.movements[position],
+                )
+
+        assigned = assign_pairs(pairs)
+        owner_by_position = {position: trx_id for trx_id, position in assigned.items()}
+
+        for trx_id in group_trx_ids:
+            positions = candidates_by_trx[trx_id]
+            if not positions:
+                results[trx_id] = None
+                continue
+
+            position = assigned.get(trx_id)
+            duplicated_trx = None
+            if position is None:
+                position = positions[0]
+                document_fingerprint = movement_index.fingerprint(
+                    position,
+                    bank_number=bank_number,
+                    account_number=account_number,
+                )
+                duplicated_trx = fingerprint_registry.find_duplicate(
+                    document_fingerprint,
+                    trx_id,
+                ) or {"trx_id": owner_by_position.get(position), "status": "conciliado"}
+
+            results[trx_id] = {
+                "movement": movement_index.movements[position],
+                "document_fingerprint": movement_index.fingerprint(
+                    position,
+                    bank_number=bank_number,
+                    account_number=account_number,
+                ),
+                "duplicated_trx": duplicated_trx,
+            }
+
+    return results
+
+
 def update_trx_status(
     trx_id: str,
     new_status: str,
@@ -371,213 +709,669 @@ def calculate_fee_amount(amount, fee_percentage):
     return (amount * fee_percentage / Decimal("100")).quantize(Decimal("0.01"))
 
 
-async def run() -> dict:
-    started_at = datetime.datetime.now()
-    current_time = started_at.strftime("%Y-%m-%d %H:%M:%S")
+def get_account_concurrency():
+    try:
+        return max(1, int(os.getenv("VALIDATE_TRX_ACCOUNT_CONCURRENCY", "4")))
+    except ValueError:
+        logger.warning("Ignoring invalid VALIDATE_TRX_ACCOUNT_CONCURRENCY value")
+        return 4
 
-    logger.info("")
-    logger.info("======================================================================")
-    logger.info("VALIDATE TRX JOB | %s", current_time)
-    logger.info("======================================================================")
 
-    ib_service = InterBankingService()
-    business_calendar = BusinessCalendarService()
+def get_recheck_setting(name, default):
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        logger.warning("Ignoring invalid %s value", name)
+        return default
+
+
+def compute_next_check_at(settlement_date, reference_time):
+    """Return when an unmatched trx is worth checking again.
+
+    Until ``VALIDATE_TRX_RECHECK_GRACE_DAYS`` after settlement the trx is
+    checked on every run (``None``), including the days before settlement:
+    movements dated on the trx day itself can already match. After that the
+    interval doubles for each extra day of age, from
+    ``VALIDATE_TRX_RECHECK_BASE_MINUTES`` up to ``VALIDATE_TRX_RECHECK_MAX_HOURS``.
+    """
+    grace_end = settlement_date + datetime.timedelta(
+        days=get_recheck_setting("VALIDATE_TRX_RECHECK_GRACE_DAYS", 3)
+    )
+    days_past_grace = (reference_time.date() - grace_end).days
+    if days_past_grace <= 0:
+        return None
+
+    backoff_minutes = min(
+        get_recheck_setting("VALIDATE_TRX_RECHECK_BASE_MINUTES", 60)
+        * 2 ** min(days_past_grace - 1, 16),
+        get_recheck_setting("VALIDATE_TRX_RECHECK_MAX_HOURS", 24) * 60,
+    )
+    return reference_time + datetime.timedelta(minutes=backoff_minutes)
+
+
+def schedule_next_checks(schedules):
+    """Store next_check_at and bump check_attempts for trx left unmatched."""
+    if not schedules:
+        return 0
 
+    db = SessionLocal()
     try:
-        accounts_model = await ib_service.get_accounts()
+        updated = 0
+        bulk_supported = db.get_bind().dialect.name == "postgresql"
+
+        for chunk_start in range(0, len(schedules), COMMIT_CHUNK_SIZE):
+            chunk = schedules[chunk_start : chunk_start + COMMIT_CHUNK_SIZE]
+
+            if bulk_supported:
+                values, params = build_values_clause(
+                    chunk,
+                    ["trx_id", "next_check_at"],
+                )
+                result = db.execute(
+                    text(
+                        f"""
+                        UPDATE trx
+                        SET
+                            next_check_at = CAST(v.next_check_at AS TIMESTAMP),
+                            check_attempts = COALESCE(trx.check_attempts, 0) + 1
+                        FROM (VALUES {values}) AS v(trx_id, next_check_at)
+                        WHERE trx.trx_id = v.trx_id
+                          AND trx.status = 'pendiente'
+                        """
+                    ),
+                    params,
+                )
+            else:
+                result = db.execute(
+                    text(
+                        """
+                        UPDATE trx
+                        SET
+                            next_check_at = :next_check_at,
+                            check_attempts = COALESCE(check_attempts, 0) + 1
+                        WHERE trx_id = :trx_id
+                          AND status = 'pendiente'
+                        """
+                    ),
+                    chunk,
+                )
+            updated += max(result.rowcount or 0, 0)
+
+        db.commit()
+        return updated
     except Exception:
-        logger.exception("[ERROR] failed_to_fetch_interbanking_accounts")
+        db.rollback()
+        logger.exception(
+            "[ERROR] failed_to_schedule_next_checks transactions=%s",
+            len(schedules),
+        )
         raise
+    finally:
+        db.close()
 
-    accounts = accounts_model.get("accounts", [])
 
-    pending_transactions = get_pending_trx()
+def get_trx_fetch_window(trx_date, settlement_date):
+    """Return the inclusive IB date range needed to validate one transaction."""
+    return (
+        trx_date - datetime.timedelta(days=1),
+        settlement_date + datetime.timedelta(days=1),
+    )
+
+
+def plan_movement_fetches(trx_windows):
+    """Group transaction windows into the fewest disjoint IB date ranges.
+
+    ``trx_windows`` maps each trx_id to its inclusive ``(since, until)`` window.
+    Overlapping or adjacent windows are merged, so each returned range is fetched
+    once and shared by every transaction listed with it.
+    """
+    plan = []
+    ordered_windows = sorted(
+        trx_windows.items(),
+        key=lambda item: (item[1][0], item[1][1]),
+    )
+
+    for trx_id, (date_since, date_until) in ordered_windows:
+        if plan and date_since <= plan[-1]["date_until"] + datetime.timedelta(days=1):
+            plan[-1]["date_until"] = max(plan[-1]["date_until"], date_until)
+            plan[-1]["trx_ids"].append(trx_id)
+            continue
+
+        plan.append(
+            {
+                "date_since": date_since,
+                "date_until": date_until,
+                "trx_ids": [trx_id],
+            }
+        )
+
+    return plan
+
+
+def build_match_outcome(trx, matched_result):
+    """Describe the trx update a match implies, without touching the database."""
+    trx_id = trx.get("trx_id")
+    trx_amount = trx.get("trx_amount")
+    matched_movement = matched_result["movement"]
+    document_fingerprint = matched_result["document_fingerprint"]
+    duplicated_trx = matched_result["duplicated_trx"]
 
     logger.info(
-        "[JOB INFO] ib_accounts=%s pending_transactions=%s",
-        len(accounts),
-        len(pending_transactions),
+        "[MATCH] trx_id=%s trx_amount=%s ib_amount=%s trx_date=%s ib_date=%s fingerprint=%s",
+        trx_id,
+        trx_amount,
+        matched_movement.get("amount"),
+        trx.get("trx_date").date(),
+        matched_movement.get("movement_date"),
+        document_fingerprint,
     )
 
-    if not pending_transactions:
-        logger.info("[JOB END] no_pending_transactions_found")
+    if duplicated_trx:
         return {
-            "checked": 0,
-            "conciliated": 0,
-            "repeated": 0,
-            "expired": 0,
-            "skipped": 0,
-            "still_pending": 0,
-            "duration_seconds": 0,
+            "trx_id": trx_id,
+            "status": "repetido",
+            "document_fingerprint": document_fingerprint,
+            "applied_fee_percentage": 0,
+            "fee_amount": Decimal("0.00"),
+            "customer_amount": Decimal("0.00"),
+            "customer_balance_id": trx.get("customer_balance_id"),
+            "trx_amount": trx_amount,
+            "duplicated_trx": duplicated_trx,
         }
 
-    updated_trx_count = 0
-    repeated_trx_count = 0
-    checked_trx_count = 0
-    skipped_trx_count = 0
-    failed_validation_trx_ids = set()
+    fee_percentage = trx.get("fee_percentage") or 0
+    fee_amount = calculate_fee_amount(trx_amount, fee_percentage)
+    return {
+        "trx_id": trx_id,
+        "status": "conciliado",
+        "document_fingerprint": document_fingerprint,
+        "applied_fee_percentage": fee_percentage,
+        "fee_amount": fee_amount,
+        "customer_amount": normalize_amount(trx_amount) - fee_amount,
+        "customer_balance_id": trx.get("customer_balance_id"),
+        "trx_amount": trx_amount,
+        "duplicated_trx": None,
+    }
 
-    for acc in accounts:
-        account_number = acc.get("account_number")
-        account_cbu = acc.get("account_cbu")
-        bank_number = acc.get("bank_number")
-        bank_name = acc.get("bank_name")
-
-        normalized_account_number = normalize_account(account_number)
-        normalized_account_cbu = normalize_account(account_cbu)
-
-        account_pending_trx = [
-            trx
-            for trx in pending_transactions
-            if normalize_account(trx.get("trx_receptor_cbu"))
-            in [normalized_account_cbu, normalized_account_number]
-        ]
 
-        logger.info(
-            "[ACCOUNT] bank=%s account_number=%s cbu=%s pending_transactions=%s",
-            bank_name,
-            account_number,
-            account_cbu,
-            len(account_pending_trx),
+def build_values_clause(rows, columns):
+    """Render ``rows`` as a bound ``VALUES`` list for set-based statements."""
+    params = {}
+    values = []
+    for row_index, row in enumerate(rows):
+        placeholders = []
+        for column in columns:
+            param_name = f"{column}_{row_index}"
+            params[param_name] = row[column]
+            placeholders.append(f":{param_name}")
+        values.append(f"({', '.join(placeholders)})")
+    return ",\n".join(values), params
+
+
+def aggregate_balance_increments(outcomes):
+    """Sum customer and fee amounts per customers_balance row."""
+    increments = {}
+    for outcome in outcomes:
+        if outcome["status"] != "conciliado":
+            continue
+        balance = increments.setdefault(
+            outcome["customer_balance_id"],
+            {
+                "id": outcome["customer_balance_id"],
+                "customer_amount": Decimal("0.00"),
+                "fee_increment": Decimal("0.00"),
+            },
         )
+        balance["customer_amount"] += outcome["customer_amount"]
+        balance["fee_increment"] += outcome["fee_amount"]
+    return [increments[balance_id] for balance_id in sorted(increments)]
 
-        if not account_pending_trx:
-            continue
 
-        for trx in account_pending_trx:
-            checked_trx_count += 1
+def apply_outcomes_in_bulk(outcomes):
+    """Apply one chunk of outcomes in a single transaction.
 
-            trx_id = trx.get("trx_id")
-            trx_date = trx.get("trx_date").date()
-            trx_amount = trx.get("trx_amount")
-            trx_currency = trx.get("currency_name")
-            trx_receptor_cbu = trx.get("trx_receptor_cbu")
-            customer_balance_id = trx.get("customer_balance_id")
+    Returns the trx_ids that were still pending and got updated. Raises when an
+    affected customer balance is missing or disabled, rolling back the chunk.
+    """
+    db = SessionLocal()
+    try:
+        values, params = build_values_clause(
+            outcomes,
+            [
+                "trx_id",
+                "status",
+                "document_fingerprint",
+                "applied_fee_percentage",
+                "fee_amount",
+            ],
+        )
+        updated_trx_ids = {
+            row[0]
+            for row in db.execute(
+                text(
+                    f"""
+                    UPDATE trx
+                    SET
+                        status = v.status,
+                        document_fingerprint = v.document_fingerprint,
+                        applied_fee_percentage = CAST(v.applied_fee_percentage AS DOUBLE PRECISION),
+                        fee_amount = CAST(v.fee_amount AS DOUBLE PRECISION)
+                    FROM (VALUES {values}) AS v(
+                        trx_id,
+                        status,
+                        document_fingerprint,
+                        applied_fee_percentage,
+                        fee_amount
+                    )
+                    WHERE trx.trx_id = v.trx_id
+                      AND trx.status = 'pendiente'
+                    RETURNING trx.trx_id
+                    """
+                ),
+                params,
+            )
+        }
 
-            logger.info(
-                "[TRX] checking trx_id=%s amount=%s currency=%s date=%s receptor=%s account_number=%s account_cbu=%s",
-                trx_id,
-                trx_amount,
-                trx_currency,
-                trx_date,
-                trx_receptor_cbu,
-                account_number,
-                account_cbu,
+        balance_increments = aggregate_balance_increments(
+            [outcome for outcome in outcomes if outcome["trx_id"] in updated_trx_ids]
+        )
+        if balance_increments:
+            values, params = build_values_clause(
+                balance_increments,
+                ["id", "customer_amount", "fee_increment"],
             )
+            updated_balance_ids = {
+                row[0]
+                for row in db.execute(
+                    text(
+                        f"""
+                        UPDATE customers_balance
+                        SET
+                            balance_amount = customers_balance.balance_amount
+                                + CAST(v.customer_amount AS DOUBLE PRECISION),
+                            fee_amount = customers_balance.fee_amount
+                                + CAST(v.fee_increment AS DOUBLE PRECISION),
+                            last_update = CURRENT_TIMESTAMP
+                        FROM (VALUES {values}) AS v(id, customer_amount, fee_increment)
+                        WHERE customers_balance.id = v.id
+                          AND customers_balance.enabled = TRUE
+                        RETURNING customers_balance.id
+                        """
+                    ),
+                    params,
+                )
+            }
+            missing_balance_ids = {
+                balance["id"] for balance in balance_increments
+            } - updated_balance_ids
+            if missing_balance_ids:
+                raise RuntimeError(
+                    f"Active customer balances {sorted(missing_balance_ids)} were not found"
+                )
+
+            for balance in balance_increments:
+                logger.info(
+                    "[BALANCE UPDATED] balance_id=%s customer_amount=%s fee_amount=%s",
+                    balance["id"],
+                    balance["customer_amount"],
+                    balance["fee_increment"],
+                )
+
+        db.commit()
+        return updated_trx_ids
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def apply_outcomes_individually(outcomes):
+    """Apply outcomes one trx per transaction; returns (updated, failed) trx_ids."""
+    updated_trx_ids = set()
+    failed_trx_ids = set()
+
+    for outcome in outcomes:
+        trx_id = outcome["trx_id"]
+        try:
+            if outcome["status"] == "repetido":
+                updated = mark_trx_as_repeated(
+                    trx_id=trx_id,
+                    document_fingerprint=outcome["document_fingerprint"],
+                )
+            else:
+                updated = update_trx_status(
+                    trx_id=trx_id,
+                    new_status=outcome["status"],
+                    customer_balance_id=outcome["customer_balance_id"],
+                    trx_amount=outcome["trx_amount"],
+                    fee_percentage=outcome["applied_fee_percentage"],
+                    document_fingerprint=outcome["document_fingerprint"],
+                )
+        except Exception:
+            failed_trx_ids.add(trx_id)
+            continue
+
+        if updated:
+            updated_trx_ids.add(trx_id)
+
+    return updated_trx_ids, failed_trx_ids
+
+
+def is_bulk_commit_supported():
+    db = SessionLocal()
+    try:
+        return db.get_bind().dialect.name == "postgresql"
+    finally:
+        db.close()
+
+
+def commit_match_outcomes(outcomes, counters, failed_validation_trx_ids):
+    """Persist match outcomes in chunked transactions and update the counters.
+
+    Each chunk is applied with set-based statements. If a chunk fails, it is
+    retried one trx at a time so a single bad row does not block the rest.
+    """
+    if not outcomes:
+        return
+
+    bulk_supported = is_bulk_commit_supported()
 
+    for chunk_start in range(0, len(outcomes), COMMIT_CHUNK_SIZE):
+        chunk = outcomes[chunk_start : chunk_start + COMMIT_CHUNK_SIZE]
+        failed_trx_ids = set()
+
+        if bulk_supported:
             try:
-                settlement_date = await business_calendar.get_settlement_date(trx_date)
-                valid_movement_dates = {trx_date, settlement_date}
-                trx_date_since = (trx_date - datetime.timedelta(days=1)).isoformat()
-                trx_date_until = (
-                    settlement_date + datetime.timedelta(days=1)
-                ).isoformat()
-
-                # buscar movimientos en interbanking con ese rango de fecha, monto y tipo de movimiento (credito/debito)
-                ib_movements_result = await ib_service.get_movement(
-                    account_number=account_number,
-                    bank_number=bank_number,
-                    date_since=trx_date_since,
-                    date_until=trx_date_until,
+                updated_trx_ids = apply_outcomes_in_bulk(chunk)
+            except Exception:
+                logger.exception(
+                    "[ERROR] bulk_commit_failed outcomes=%s retrying_individually=True",
+                    len(chunk),
                 )
+                updated_trx_ids, failed_trx_ids = apply_outcomes_individually(chunk)
+        else:
+            updated_trx_ids, failed_trx_ids = apply_outcomes_individually(chunk)
+
+        logger.info(
+            "[DB COMMIT] outcomes=%s updated=%s failed=%s",
+            len(chunk),
+            len(updated_trx_ids),
+            len(failed_trx_ids),
+        )
 
-                movements = ib_movements_result.get("movements_detail", [])
+        for outcome in chunk:
+            trx_id = outcome["trx_id"]
 
-                logger.info(
-                    "[IB FETCH] trx_id=%s movements=%s range_start=%s range_end=%s valid_dates=%s",
+            if trx_id in failed_trx_ids:
+                counters["skipped"] += 1
+                failed_validation_trx_ids.add(trx_id)
+                continue
+
+            if trx_id not in updated_trx_ids:
+                counters["skipped"] += 1
+                logger.warning(
+                    "[WARNING] trx_update_skipped trx_id=%s status=%s reason=not_found_or_not_pending",
                     trx_id,
-                    len(movements),
-                    trx_date_since,
-                    trx_date_until,
-                    sorted(valid_movement_dates),
+                    outcome["status"],
                 )
+                continue
 
-                matched_result = match_trx_with_ib(
-                    trx,
-                    movements,
-                    bank_number=bank_number,
-                    account_number=account_number,
-                    valid_movement_dates=valid_movement_dates,
+            if outcome["status"] == "repetido":
+                counters["repeated"] += 1
+                logger.warning(
+                    "[TRX UPDATED] trx_id=%s status=repetida duplicate_of=%s duplicate_status=%s",
+                    trx_id,
+                    outcome["duplicated_trx"].get("trx_id"),
+                    outcome["duplicated_trx"].get("status"),
                 )
+                continue
 
-                if matched_result:
-                    matched_movement = matched_result["movement"]
-                    document_fingerprint = matched_result["document_fingerprint"]
-                    duplicated_trx = matched_result["duplicated_trx"]
+            counters["conciliated"] += 1
+            logger.info(
+                "[TRX UPDATED] trx_id=%s status=conciliado",
+                trx_id,
+            )
+            logger.info(
+                "[FEE APPLIED] trx_id=%s fee_percentage=%s fee_amount=%s",
+                trx_id,
+                outcome["applied_fee_percentage"],
+                outcome["fee_amount"],
+            )
 
-                    logger.info(
-                        "[MATCH] trx_id=%s trx_amount=%s ib_amount=%s trx_date=%s ib_date=%s fingerprint=%s",
-                        trx_id,
-                        trx_amount,
-                        matched_movement.get("amount"),
-                        trx_date,
-                        matched_movement.get("movement_date"),
-                        document_fingerprint,
-                    )
 
-                    if duplicated_trx:
-                        updated = mark_trx_as_repeated(
-                            trx_id=trx_id,
-                            document_fingerprint=document_fingerprint,
-                        )
-
-                        if updated:
-                            repeated_trx_count += 1
-                            logger.warning(
-                                "[TRX UPDATED] trx_id=%s status=repetida duplicate_of=%s duplicate_status=%s",
-                                trx_id,
-                                duplicated_trx.get("trx_id"),
-                                duplicated_trx.get("status"),
-                            )
-                        else:
-                            skipped_trx_count += 1
-                            logger.warning(
-                                "[WARNING] repeated_update_skipped trx_id=%s",
-                                trx_id,
-                            )
-                        continue
-
-                    fee_percentage = trx.get("fee_percentage")
-
-                    updated = update_trx_status(
-                        trx_id=trx_id,
-                        new_status="conciliado",
-                        customer_balance_id=customer_balance_id,
-                        trx_amount=trx_amount,
-                        fee_percentage=fee_percentage,
-                        document_fingerprint=document_fingerprint,
+async def reconcile_account(
+    ib_service,
+    business_calendar,
+    acc,
+    account_pending_trx,
+    counters,
+    failed_validation_trx_ids,
+    fingerprint_registry,
+    timings=None,
+):
+    """Validate one IB account's pending transactions with shared movement fetches.
+
+    Candidate fingerprints for the whole account are resolved with one batched
+    lookup before any transaction is matched, each fetched range is matched
+    as one assignment (see ``assign_movements``), and the resulting status and
+    balance updates are committed together at the end. Seconds spent per phase
+    (ib_fetch, matching, db_commit) are added to ``timings``.
+    """
+    if timings is None:
+        timings = Counter()
+
+    account_number = acc.get("account_number")
+    account_cbu = acc.get("account_cbu")
+    bank_number = acc.get("bank_number")
+
+    pending_by_id = {}
+    settlement_by_id = {}
+    valid_dates_by_id = {}
+    trx_windows = {}
+
+    trx_dates = sorted({trx.get("trx_date").date() for trx in account_pending_trx})
+    try:
+        settlement_by_date = dict(
+            zip(trx_dates, await business_calendar.settlement_dates(trx_dates))
+        )
+    except Exception:
+        settlement_by_date = {}
+        logger.exception(
+            "[ERROR] settlement_dates_failed account_number=%s",
+            account_number,
+        )
+
+    for trx in account_pending_trx:
+        counters["checked"] += 1
+
+        trx_id = trx.get("trx_id")
+        trx_date = trx.get("trx_date").date()
+
+        logger.info(
+            "[TRX] checking trx_id=%s amount=%s currency=%s date=%s receptor=%s account_number=%s account_cbu=%s",
+            trx_id,
+            trx.get("trx_amount"),
+            trx.get("currency_name"),
+            trx_date,
+            trx.get("trx_receptor_cbu"),
+            account_number,
+            account_cbu,
+        )
+
+        settlement_date = settlement_by_date.get(trx_date)
+        if settlement_date is None:
+            counters["skipped"] += 1
+            failed_validation_trx_ids.add(trx_id)
+            logger.error(
+                "[ERROR] trx_validation_failed trx_id=%s account_number=%s",
+                trx_id,
+                account_number,
+            )
+            continue
+
+        pending_by_id[trx_id] = trx
+        settlement_by_id[trx_id] = settlement_date
+        valid_dates_by_id[trx_id] = {trx_date, settlement_date}
+        trx_windows[trx_id] = get_trx_fetch_window(trx_date, settlement_date)
+
+    fetch_plan = plan_movement_fetches(trx_windows)
+
+    logger.info(
+        "[IB PLAN] account_number=%s transactions=%s fetch_ranges=%s",
+        account_number,
+        len(trx_windows),
+        len(fetch_plan),
+    )
+
+    phase_started_at = time.monotonic()
+    fetched_ranges = []
+    for range_position, fetch_range in enumerate(fetch_plan):
+        date_since = fetch_range["date_since"].isoformat()
+        date_until = fetch_range["date_until"].isoformat()
+        range_trx_ids = fetch_range["trx_ids"]
+
+        try:
+            ib_movements_result = await ib_service.get_stored_movement(
+                account_number=account_number,
+                bank_number=bank_number,
+                date_since=date_since,
+                date_until=date_until,
+            )
+        except InterBankingUnavailable as exc:
+            # The circuit is open: pause the account instead of failing every range.
+            paused_trx_ids = [
+                trx_id
+                for remaining_range in fetch_plan[range_position:]
+                for trx_id in remaining_range["trx_ids"]
+            ]
+            counters["skipped"] += len(paused_trx_ids)
+            failed_validation_trx_ids.update(paused_trx_ids)
+            logger.warning(
+                "[ACCOUNT PAUSED] interbanking_unavailable account_number=%s transactions=%s retry_after_seconds=%s",
+                account_number,
+                len(paused_trx_ids),
+                exc.retry_after_seconds,
+            )
+            break
+        except Exception:
+            counters["skipped"] += len(range_trx_ids)
+            failed_validation_trx_ids.update(range_trx_ids)
+            logger.exception(
+                "[ERROR] ib_fetch_failed account_number=%s range_start=%s range_end=%s transactions=%s",
+                account_number,
+                date_since,
+                date_until,
+                len(range_trx_ids),
+            )
+            continue
+
+        movement_index = MovementIndex(
+            ib_movements_result.get("movements_detail", [])
+        )
+
+        logger.info(
+            "[IB FETCH] account_number=%s movements=%s range_start=%s range_end=%s transactions=%s",
+            account_number,
+            len(movement_index),
+            date_since,
+            date_until,
+            len(range_trx_ids),
+        )
+
+        fetched_ranges.append((movement_index, range_trx_ids))
+
+    timings["ib_fetch"] += time.monotonic() - phase_started_at
+    phase_started_at = time.monotonic()
+
+    candidate_fingerprints = set()
+    for movement_index, range_trx_ids in fetched_ranges:
+        for trx_id in range_trx_ids:
+            for position in movement_index.candidate_positions(
+                pending_by_id[trx_id].get("trx_amount"),
+                valid_dates_by_id[trx_id],
+            ):
+                candidate_fingerprints.add(
+                    movement_index.fingerprint(
+                        position,
+                        bank_number=bank_number,
+                        account_number=account_number,
                     )
+                )
+
+    try:
+        await asyncio.to_thread(fingerprint_registry.load, candidate_fingerprints)
+    except Exception:
+        timings["matching"] += time.monotonic() - phase_started_at
+        range_trx_ids = [
+            trx_id for _, trx_ids in fetched_ranges for trx_id in trx_ids
+        ]
+        counters["skipped"] += len(range_trx_ids)
+        failed_validation_trx_ids.update(range_trx_ids)
+        logger.exception(
+            "[ERROR] fingerprint_lookup_failed account_number=%s fingerprints=%s",
+            account_number,
+            len(candidate_fingerprints),
+        )
+        return
+
+    outcomes = []
+    schedules = []
+    checked_at = datetime.datetime.now()
+    for movement_index, range_trx_ids in fetched_ranges:
+        try:
+            matched_results = assign_movements(
+                movement_index,
+                range_trx_ids,
+                pending_by_id,
+                valid_dates_by_id,
+                fingerprint_registry,
+                bank_number,
+                account_number,
+            )
+        except Exception:
+            counters["skipped"] += len(range_trx_ids)
+            failed_validation_trx_ids.update(range_trx_ids)
+            logger.exception(
+                "[ERROR] movement_assignment_failed account_number=%s transactions=%s",
+                account_number,
+                len(range_trx_ids),
+            )
+            continue
 
+        for trx_id in range_trx_ids:
+            trx = pending_by_id[trx_id]
 
-                    if updated:
-                        updated_trx_count += 1
-                        logger.info(
-                            "[TRX UPDATED] trx_id=%s status=conciliado",
-                            trx_id,
-                        )
-                        logger.info(
-                            "[FEE APPLIED] trx_id=%s fee_percentage=%s fee_amount=%s",
-                            trx_id,
-                            fee_percentage or 0,
-                            calculate_fee_amount(trx_amount, fee_percentage),
-                        )
-                    else:
-                        skipped_trx_count += 1
-                        logger.warning(
-                            "[WARNING] trx_update_skipped trx_id=%s",
-                            trx_id,
-                        )
+            try:
+                matched_result = matched_results.get(trx_id)
 
+                if matched_result:
+                    outcome = build_match_outcome(trx, matched_result)
+                    fingerprint_registry.claim(
+                        outcome["document_fingerprint"],
+                        trx_id,
+                        outcome["status"],
+                    )
+                    outcomes.append(outcome)
                 else:
+                    next_check_at = compute_next_check_at(
+                        settlement_by_id[trx_id],
+                        checked_at,
+                    )
+                    schedules.append(
+                        {"trx_id": trx_id, "next_check_at": next_check_at}
+                    )
                     logger.info(
-                        "[NO MATCH] trx_id=%s amount=%s date=%s",
+                        "[NO MATCH] trx_id=%s amount=%s date=%s next_check_at=%s",
                         trx_id,
-                        trx_amount,
-                        trx_date,
+                        trx.get("trx_amount"),
+                        trx.get("trx_date").date(),
+                        next_check_at,
                     )
 
             except Exception:
-                skipped_trx_count += 1
+                counters["skipped"] += 1
                 failed_validation_trx_ids.add(trx_id)
                 logger.exception(
                     "[ERROR] trx_validation_failed trx_id=%s account_number=%s",
@@ -585,47 +1379,421 @@ async def run() -> dict:
                     account_number,
                 )
 
+    timings["matching"] += time.monotonic() - phase_started_at
+    phase_started_at = time.monotonic()
+
+    try:
+        await asyncio.to_thread(
+            commit_match_outcomes,
+            outcomes,
+            counters,
+            failed_validation_trx_ids,
+        )
+
+        try:
+            await asyncio.to_thread(schedule_next_checks, schedules)
+        except Exception:
+            # Unscheduled trx are simply checked again on the next run.
+            pass
+    finally:
+        timings["db_commit"] += time.monotonic() - phase_started_at
+
+
+async def reconcile_account_isolated(
+    semaphore,
+    ib_service,
+    business_calendar,
+    acc,
+    account_pending_trx,
+    progress=None,
+):
+    """Run ``reconcile_account`` under the concurrency cap with its own state.
+
+    Returns the account's counters and failed trx_ids. An unexpected error only
+    affects this account: its unresolved trx are reported as skipped and kept
+    out of expiration.
+    """
+    counters = Counter()
+    failed_validation_trx_ids = set()
+    if progress is not None:
+        progress.track_counters(counters)
+
+    async with semaphore:
+        if circuit_breaker.is_open():
+            logger.info(
+                "[ACCOUNT SKIPPED] interbanking_unavailable account_number=%s pending_transactions=%s",
+                acc.get("account_number"),
+                len(account_pending_trx),
+            )
+            counters["skipped"] += len(account_pending_trx)
+            failed_validation_trx_ids.update(
+                trx.get("trx_id") for trx in account_pending_trx
+            )
+            if progress is not None:
+                progress.account_finished()
+            return counters, failed_validation_trx_ids
+
+        started_at = datetime.datetime.now()
+        lock = account_lock(acc)
+        if not await asyncio.to_thread(lock.try_acquire):
+            logger.info(
+                "[ACCOUNT SKIPPED] locked_by_another_worker account_number=%s pending_transactions=%s",
+                acc.get("account_number"),
+                len(account_pending_trx),
+            )
+            counters["skipped"] += len(account_pending_trx)
+            failed_validation_trx_ids.update(
+                trx.get("trx_id") for trx in account_pending_trx
+            )
+            if progress is not None:
+                progress.account_finished()
+            return counters, failed_validation_trx_ids
+
+        timings = Counter()
+        try:
+            with collect_ib_calls() as ib_calls:
+                await reconcile_account(
+                    ib_service,
+                    business_calendar,
+                    acc,
+                    account_pending_trx,
+                    counters,
+                    failed_validation_trx_ids,
+                    FingerprintRegistry(),
+                    timings,
+                )
+        except Exception:
+            logger.exception(
+                "[ERROR] account_reconciliation_failed account_number=%s",
+                acc.get("account_number"),
+            )
+            counters["skipped"] += max(
+                0,
+                len(account_pending_trx)
+                - counters["conciliated"]
+                - counters["repeated"]
+                - counters["skipped"],
+            )
+            failed_validation_trx_ids.update(
+                trx.get("trx_id") for trx in account_pending_trx
+            )
+        finally:
+            await asyncio.to_thread(lock.release)
+
+        duration = (datetime.datetime.now() - started_at).total_seconds()
+        if progress is not None:
+            progress.account_finished(
+                {
+                    "bank_number": acc.get("bank_number"),
+                    "account_number": acc.get("account_number"),
+                    "pending_transactions": len(account_pending_trx),
+                    "checked": counters["checked"],
+                    "conciliated": counters["conciliated"],
+                    "repeated": counters["repeated"],
+                    "skipped": counters["skipped"],
+                    "duration_seconds": round(duration, 3),
+                    **{name: round(seconds, 3) for name, seconds in timings.items()},
+                    "ib_calls": ib_calls.get("calls", 0),
+                    "ib_shared_calls": ib_calls.get("shared_calls", 0),
+                    "ib_bytes": ib_calls.get("bytes", 0),
+                }
+            )
+
+        logger.info(
+            "[ACCOUNT END] account_number=%s checked=%s conciliated=%s repeated=%s skipped=%s ib_calls=%s duration_seconds=%.2f",
+            acc.get("account_number"),
+            counters["checked"],
+            counters["conciliated"],
+            counters["repeated"],
+            counters["skipped"],
+            ib_calls.get("calls", 0),
+            duration,
+        )
+
+    return counters, failed_validation_trx_ids
+
+
+def scope_pending_trx(pending_transactions, accounts, all_accounts=None):
+    """Keep the pending trx that belong to ``accounts``.
+
+    When ``all_accounts`` is given, trx matching none of them are kept as well,
+    so trx without an IB account are still expired by exactly one shard.
+    """
+    pending_by_account = group_pending_trx_by_account(pending_transactions)
+    scoped = {}
+    for acc in accounts:
+        for trx in get_account_pending_trx(pending_by_account, acc):
+            scoped.setdefault(trx.get("trx_id"), trx)
+
+    if all_accounts is not None:
+        assigned_trx_ids = {
+            trx.get("trx_id")
+            for acc in all_accounts
+            for trx in get_account_pending_trx(pending_by_account, acc)
+        }
+        for trx in pending_transactions:
+            if trx.get("trx_id") not in assigned_trx_ids:
+                scoped.setdefault(trx.get("trx_id"), trx)
+
+    return list(scoped.values())
+
+
+async def run(
+    account_numbers=None,
+    due_only=True,
+    run_lock=None,
+    progress=None,
+    run_id=None,
+    trigger="job",
+    ib_service=None,
+) -> dict:
+    """Reconcile pending transactions against Interbanking movements.
+
+    ``account_numbers`` limits the run (and its expirations) to those IB
+    accounts, e.g. when the movement sync detects new movements. With
+    ``due_only`` trx whose next_check_at is still in the future are skipped.
+
+    Full runs hold the Postgres run lock of their shard (see
+    VALIDATE_TRX_SHARD_INDEX/COUNT) and raise ``ReconciliationAlreadyRunning``
+    if another process holds it; pass ``run_lock`` when it is already taken.
+    Every account is reconciled under its own advisory lock, so targeted and
+    full runs on different nodes never process the same account at once.
+
+    ``progress`` receives live counters and phase timings (see
+    ``ReconciliationRunner``). Every run is recorded in reconciliation_runs
+    under ``run_id`` with its phase timings and Interbanking usage.
+    ``ib_service`` replaces the Interbanking client, e.g. with the replay fake.
+    """
+    shard_index, shard_count = get_shard()
+    if account_numbers is not None:
+        shard_index, shard_count = 0, 1
+
+    owns_run_lock = run_lock is None and account_numbers is None
+    if owns_run_lock:
+        run_lock = await asyncio.to_thread(acquire_run_lock, shard_index, shard_count)
+
+    progress = progress or ReconciliationProgress()
+    run_id = run_id or uuid.uuid4().hex
+    run_history = ReconciliationHistory()
+    result = None
+    error = None
+    try:
+        await asyncio.to_thread(
+            run_history.start_run,
+            run_id,
+            trigger,
+            shard_index,
+            shard_count,
+            datetime.datetime.now(),
+        )
+        with collect_ib_calls() as ib_calls:
+            progress.ib_calls = ib_calls
+            result = await reconcile_pending_trx(
+                account_numbers,
+                due_only,
+                shard_index,
+                shard_count,
+                progress,
+                ib_service or InterBankingService(),
+            )
+        return result
+    except Exception as exc:
+        error = str(exc) or exc.__class__.__name__
+        raise
+    finally:
+        await asyncio.to_thread(run_history.finish_run, run_id, progress, result, error)
+        if owns_run_lock:
+            await asyncio.to_thread(run_lock.release)
+
+
+async def reconcile_pending_trx(
+    account_numbers,
+    due_only,
+    shard_index,
+    shard_count,
+    progress,
+    ib_service,
+) -> dict:
+    started_at = datetime.datetime.now()
+    current_time = started_at.strftime("%Y-%m-%d %H:%M:%S")
+
+    logger.info("")
+    logger.info("======================================================================")
+    logger.info("VALIDATE TRX JOB | %s", current_time)
+    logger.info("======================================================================")
+
+    business_calendar = BusinessCalendarService()
+
+    try:
+        with progress.track_phase("fetch_accounts"):
+            accounts_model = await ib_service.get_accounts()
+    except Exception:
+        logger.exception("[ERROR] failed_to_fetch_interbanking_accounts")
+        raise
+
+    accounts = accounts_model.get("accounts", [])
+    if account_numbers is not None:
+        account_numbers = {str(account_number) for account_number in account_numbers}
+        accounts = [
+            acc
+            for acc in accounts
+            if str(acc.get("account_number")) in account_numbers
+        ]
+
+    all_accounts = accounts
+    if shard_count > 1:
+        accounts = [
+            acc for acc in accounts if account_in_shard(acc, shard_index, shard_count)
+        ]
+
+    with progress.track_phase("load_pending"):
+        pending_transactions = await asyncio.to_thread(
+            get_pending_trx,
+            started_at,
+            due_only,
+            (
+                {key for acc in accounts for key in get_account_keys(acc)}
+                if account_numbers is not None
+                else None
+            ),
+        )
+        if account_numbers is not None or shard_count > 1:
+            pending_transactions = scope_pending_trx(
+                pending_transactions,
+                accounts,
+                all_accounts=(
+                    all_accounts
+                    if account_numbers is None and shard_index == 0
+                    else None
+                ),
+            )
+
+    progress.pending_total = len(pending_transactions)
+
+    logger.info(
+        "[JOB INFO] shard=%s/%s ib_accounts=%s pending_transactions=%s",
+        shard_index,
+        shard_count,
+        len(accounts),
+        len(pending_transactions),
+    )
+
+    if not pending_transactions:
+        logger.info("[JOB END] no_pending_transactions_found")
+        return {
+            "checked": 0,
+            "conciliated": 0,
+            "repeated": 0,
+            "expired": 0,
+            "skipped": 0,
+            "still_pending": 0,
+            "duration_seconds": 0,
+        }
+
+    counters = Counter()
+    failed_validation_trx_ids = set()
+    pending_by_account = group_pending_trx_by_account(pending_transactions)
+    account_semaphore = asyncio.Semaphore(get_account_concurrency())
+    account_tasks = []
+
+    for acc in accounts:
+        account_pending_trx = get_account_pending_trx(pending_by_account, acc)
+
+        logger.info(
+            "[ACCOUNT] bank=%s account_number=%s cbu=%s pending_transactions=%s",
+            acc.get("bank_name"),
+            acc.get("account_number"),
+            acc.get("account_cbu"),
+            len(account_pending_trx),
+        )
+
+        if not account_pending_trx:
+            continue
+
+        account_tasks.append(
+            reconcile_account_isolated(
+                account_semaphore,
+                ib_service,
+                business_calendar,
+                acc,
+                account_pending_trx,
+                progress,
+            )
+        )
+
+    progress.accounts_total = len(account_tasks)
+    with progress.track_phase("reconcile_accounts"):
+        account_results = await asyncio.gather(*account_tasks)
+
+    for account_counters, account_failed_trx_ids in account_results:
+        counters.update(account_counters)
+        failed_validation_trx_ids.update(account_failed_trx_ids)
+
     eligible_for_expiration = {
         trx.get("trx_id")
         for trx in pending_transactions
         if trx.get("trx_id") not in failed_validation_trx_ids
     }
-    expired_trx_count = expire_old_pending_trx(
-        eligible_for_expiration,
-        reference_time=started_at,
-    )
+    with progress.track_phase("expire_pending"):
+        expired_trx_count = await asyncio.to_thread(
+            expire_old_pending_trx,
+            eligible_for_expiration,
+            reference_time=started_at,
+        )
+    progress.expired = expired_trx_count
 
     finished_at = datetime.datetime.now()
     duration = (finished_at - started_at).total_seconds()
     still_pending_count = max(
         0,
         len(pending_transactions)
-        - updated_trx_count
-        - repeated_trx_count
+        - counters["conciliated"]
+        - counters["repeated"]
         - expired_trx_count,
     )
 
     logger.info(
         "[JOB END] validate_trx checked=%s conciliated=%s repeated=%s expired=%s skipped=%s still_pending=%s duration_seconds=%.2f",
-        checked_trx_count,
-        updated_trx_count,
-        repeated_trx_count,
+        counters["checked"],
+        counters["conciliated"],
+        counters["repeated"],
         expired_trx_count,
-        skipped_trx_count,
+        counters["skipped"],
         still_pending_count,
         duration,
     )
+    http_stats = {**get_connection_stats(), **get_coalescing_stats()}
+    logger.info(
+        "[IB HTTP] requests=%s connections_opened=%s connections_reused=%s transport_errors=%s requests_coalesced=%s cache_hits=%s",
+        http_stats["requests"],
+        http_stats["connections_opened"],
+        http_stats["connections_reused"],
+        http_stats["transport_errors"],
+        http_stats["requests_coalesced"],
+        http_stats["cache_hits"],
+    )
+    throttle_state = get_throttle_state()
+    logger.info(
+        "[IB THROTTLE] circuit=%s concurrency_limit=%s throttled_responses=%s rejected_requests=%s",
+        throttle_state["circuit"]["state"],
+        throttle_state["limiter"]["concurrency_limit"],
+        throttle_state["limiter"]["throttled_responses"],
+        throttle_state["circuit"]["rejected_requests"],
+    )
 
     return {
-        "checked": checked_trx_count,
-        "conciliated": updated_trx_count,
-        "repeated": repeated_trx_count,
+        "checked": counters["checked"],
+        "conciliated": counters["conciliated"],
+        "repeated": counters["repeated"],
         "expired": expired_trx_count,
-        "skipped": skipped_trx_count,
+        "skipped": counters["skipped"],
         "still_pending": still_pending_count,
         "duration_seconds": round(duration, 2),
     }
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    try:
+        asyncio.run(run())
+    except ReconciliationAlreadyRunning:
+        logger.info("[JOB SKIPPED] reconciliation_already_running")
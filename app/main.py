@@ -17,7 +17,10 @@ from app.router import (
     dashboard,
 )
 from app.middlewares.PermissionMiddleware import PermissionMiddleware
+from app.services.BusinessCalendarService import BusinessCalendarService
+from app.services.interbanking.client import close_http_client
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv(dotenv_path="dev.env")  # Esto carga las variables al entorno
@@ -51,3 +54,13 @@ app.include_router(extractor.router)
 app.include_router(textract.router)
 app.include_router(logs.router)
 app.include_router(dashboard.router)
+
+
+@app.on_event("startup")
+async def preload_holiday_calendar():
+    await asyncio.to_thread(BusinessCalendarService().preload_holidays)
+
+
+@app.on_event("shutdown")
+async def close_interbanking_client():
+    await close_http_client()
@@ -6,11 +6,15 @@ from starlette.status import (
     HTTP_401_UNAUTHORIZED,
     HTTP_500_INTERNAL_SERVER_ERROR,
 )
+from starlette.routing import compile_path
 from jose import jwt, JWTError
 from app.db.database import SessionLocal
 from app.models import Endpoints, Permission, Logs
 from datetime import datetime
+from functools import lru_cache
 import logging
+import os
+import time
 
 # Setup básico de logging
 logging.basicConfig(level=logging.INFO)
@@ -66,7 +70,7 @@ class PermissionMiddleware(BaseHTTPMiddleware):
                     content={"detail": "Missing permission or hierarchy in token"}
                 )
 
-            # Validar jerarquía
+            # Validar jerarquía (paths exactos o plantillas como /trx/reconcile-runs/{run_id})
             has_access = (
                 db.query(Endpoints)
                 .join(Permission, Endpoints.perm_id == Permission.id)
@@ -75,6 +79,9 @@ class PermissionMiddleware(BaseHTTPMiddleware):
                     Permission.hierarchy <= user_hierarchy
                 )
                 .first()
+            ) or any(
+                hierarchy <= user_hierarchy and path_regex.match(path)
+                for path_regex, hierarchy in _get_endpoint_templates(db)
             )
 
             if not has_access:
@@ -106,6 +113,37 @@ class PermissionMiddleware(BaseHTTPMiddleware):
         finally:
             db.close()
 
+# Endpoints con plantilla (/trx/reconcile-runs/{run_id}) compilados, recargados cada TTL
+ENDPOINT_TEMPLATES_CACHE_TTL_SECONDS = float(
+    os.getenv("ENDPOINT_TEMPLATES_CACHE_TTL_SECONDS", "60")
+)
+_endpoint_templates = {"expires_at": 0.0, "templates": []}
+
+
+@lru_cache(maxsize=None)
+def _compile_endpoint_template(endpoint_path: str):
+    path_regex, _, _ = compile_path(endpoint_path)
+    return path_regex
+
+
+def _get_endpoint_templates(db):
+    """Returns (path regex, required hierarchy) for every templated endpoint."""
+    now = time.monotonic()
+    if now >= _endpoint_templates["expires_at"]:
+        rows = (
+            db.query(Endpoints.path, Permission.hierarchy)
+            .join(Permission, Endpoints.perm_id == Permission.id)
+            .filter(Endpoints.path.contains("{"))
+            .all()
+        )
+        _endpoint_templates["templates"] = [
+            (_compile_endpoint_template(endpoint_path), hierarchy)
+            for endpoint_path, hierarchy in rows
+        ]
+        _endpoint_templates["expires_at"] = now + ENDPOINT_TEMPLATES_CACHE_TTL_SECONDS
+    return _endpoint_templates["templates"]
+
+
 def _save_log(endpoint: str, method: str, user: str):
     db = SessionLocal()
     if not endpoint.startswith("/logs"):  # Evitar loguear las propias llamadas al endpoint de logs
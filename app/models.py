@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, String, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Date, UniqueConstraint, DateTime, Integer, BigInteger, String, Float, ForeignKey, Boolean, Index, JSON, func, text
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -100,11 +100,38 @@ class Trx(Base):
     account_id = Column(Integer, ForeignKey("customers_balance.id"), nullable=False)
     applied_fee_percentage = Column(Float, nullable=True)
     fee_amount = Column(Float, nullable=True)
+    next_check_at = Column(DateTime, nullable=True)
+    check_attempts = Column(Integer, nullable=False, default=0, server_default="0")
 
     entity = relationship("Entity", back_populates="trxs")
     client = relationship("Clients", back_populates="trxs")
     account = relationship("CustomersBalance")
 
+    # Partial indexes used by the reconciliation job (add_pending_trx_indexes.sql).
+    __table_args__ = (
+        Index(
+            "ix_trx_pending_normalized_receptor",
+            func.trim(
+                func.replace(
+                    func.replace(func.coalesce(receptor_cbu, ""), " ", ""),
+                    "-",
+                    "",
+                )
+            ),
+            postgresql_where=text("status = 'pendiente'"),
+        ),
+        Index(
+            "ix_trx_pending_date",
+            date,
+            postgresql_where=text("status = 'pendiente'"),
+        ),
+        Index(
+            "ix_trx_pending_next_check_at",
+            next_check_at,
+            postgresql_where=text("status = 'pendiente'"),
+        ),
+    )
+
 
 # CBU Model
 class CBU(Base):
@@ -221,3 +248,108 @@ class Currency(Base):
 
     balances = relationship("CustomersBalance", back_populates="currency")
     entity_cbus = relationship("EntityCBU", back_populates="currency")
+
+
+class IBMovement(Base):
+    __tablename__ = "ib_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_fingerprint = Column(String, unique=True, nullable=False)
+    bank_number = Column(String, nullable=False)
+    account_number = Column(String, nullable=False)
+    movement_date = Column(Date, nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)
+    debit_credit_type = Column(String, nullable=True)
+    correlative_number = Column(String, nullable=True)
+    payload = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_ib_movements_account_date",
+            bank_number,
+            account_number,
+            movement_date,
+            amount_cents,
+        ),
+    )
+
+
+class IBMovementSyncRange(Base):
+    __tablename__ = "ib_movement_sync_ranges"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bank_number = Column(String, nullable=False)
+    account_number = Column(String, nullable=False)
+    date_since = Column(Date, nullable=False)
+    date_until = Column(Date, nullable=False)
+    synced_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_ib_movement_sync_ranges_account",
+            bank_number,
+            account_number,
+            date_since,
+        ),
+    )
+
+
+class IBSyncWatermark(Base):
+    __tablename__ = "ib_sync_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bank_number = Column(String, nullable=False)
+    account_number = Column(String, nullable=False)
+    last_movement_date = Column(Date, nullable=True)
+    last_synced_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "bank_number",
+            "account_number",
+            name="uq_ib_sync_watermarks_account",
+        ),
+    )
+
+
+class HolidayCalendar(Base):
+    __tablename__ = "holiday_calendars"
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, nullable=False, unique=True)
+    holidays = Column(JSON, nullable=False, default=list)
+    fetched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ReconciliationRunHistory(Base):
+    __tablename__ = "reconciliation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String, nullable=False, unique=True)
+    trigger = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    shard_index = Column(Integer, nullable=False, default=0)
+    shard_count = Column(Integer, nullable=False, default=1)
+    started_at = Column(DateTime, nullable=False, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    pending_transactions = Column(Integer, nullable=False, default=0)
+    accounts = Column(Integer, nullable=False, default=0)
+    checked = Column(Integer, nullable=False, default=0)
+    conciliated = Column(Integer, nullable=False, default=0)
+    repeated = Column(Integer, nullable=False, default=0)
+    expired = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    still_pending = Column(Integer, nullable=True)
+    ib_calls = Column(Integer, nullable=False, default=0)
+    ib_shared_calls = Column(Integer, nullable=False, default=0)
+    ib_bytes = Column(BigInteger, nullable=False, default=0)
+    ib_calls_by_service = Column(JSON, nullable=False, default=dict)
+    phase_timings = Column(JSON, nullable=False, default=dict)
+    account_timings = Column(JSON, nullable=False, default=list)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reconciliation_runs_started_at", "started_at"),
+    )
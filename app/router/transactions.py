@@ -1,5 +1,6 @@
 from typing import Annotated
 from sqlalchemy.orm import Session
+from datetime import date as dt_date, timedelta
 import asyncio
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -12,34 +13,81 @@ from app.schemas.transactions import (
     UploadDocumentRequest,
     MovementsRequest,
     AllMovementsRequest,
-    ReconciliationJobResponse,
+    InterbankingHttpStats,
+    ReconciliationRunResponse,
+    ReconciliationRunSummary,
 )
-from app.jobs.validate_trx import run as run_reconciliation_job
+from app.jobs.reconciliation_history import ReconciliationHistory
+from app.jobs.reconciliation_lock import ReconciliationAlreadyRunning
+from app.jobs.reconciliation_runner import reconciliation_runner
 from app.services.DBService import DBService
 from app.services.InterBankingService import InterBankingService
-from typing import Optional
+from app.services.interbanking.client import get_connection_stats
+from app.services.interbanking.coalescing import get_coalescing_stats
+from app.services.interbanking.throttle import get_throttle_state
+from typing import Literal, Optional
 
 router = APIRouter(prefix="/trx", tags=["Transactions"])
 
 db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-reconciliation_job_lock = asyncio.Lock()
 
 
 @router.post(
     "/reconcile-pending",
-    response_model=ReconciliationJobResponse,
-    status_code=status.HTTP_200_OK,
+    response_model=ReconciliationRunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def reconcile_pending_transactions(user: user_dependency):
-    if reconciliation_job_lock.locked():
+    try:
+        reconciliation_run = await reconciliation_runner.submit()
+    except ReconciliationAlreadyRunning as exc:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="The reconciliation job is already running",
+            detail=str(exc),
         )
+    return reconciliation_run.to_dict()
+
 
-    async with reconciliation_job_lock:
-        return await run_reconciliation_job()
+@router.get(
+    "/reconcile-runs",
+    response_model=list[ReconciliationRunSummary],
+    status_code=status.HTTP_200_OK,
+)
+async def get_reconciliation_runs(
+    user: user_dependency,
+    dateFrom: Optional[dt_date] = Query(None),
+    dateTo: Optional[dt_date] = Query(None),
+    runStatus: Optional[Literal["running", "succeeded", "failed"]] = Query(None),
+    limit: int = Query(100, gt=0, le=1000),
+):
+    return await asyncio.to_thread(
+        ReconciliationHistory().list_runs,
+        date_from=dateFrom,
+        date_to=dateTo + timedelta(days=1) if dateTo else None,
+        status=runStatus,
+        limit=limit,
+    )
+
+
+@router.get(
+    "/reconcile-runs/{run_id}",
+    response_model=ReconciliationRunResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_reconciliation_run(run_id: str, user: user_dependency):
+    reconciliation_run = reconciliation_runner.get(run_id)
+    if reconciliation_run is not None:
+        return reconciliation_run.to_dict()
+
+    # Runs started by other workers, the CLI job or the movement sync.
+    stored_run = await asyncio.to_thread(ReconciliationHistory().get_run, run_id)
+    if stored_run is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reconciliation run not found",
+        )
+    return stored_run
 
 
 @router.get("/all", status_code=status.HTTP_200_OK)
@@ -130,9 +178,15 @@ async def get_movements_from_interbanking(
     bank_number: str = Query(...),
     date_since: Optional[str] = Query(None),
     date_until: Optional[str] = Query(None),
+    source: Literal["ib", "store"] = Query("ib"),
 ):
     ib_service = InterBankingService()
-    movements_model = await ib_service.get_movement(
+    get_movement = (
+        ib_service.get_stored_movement
+        if source == "store"
+        else ib_service.get_movement
+    )
+    movements_model = await get_movement(
         account_number, bank_number, date_since=date_since, date_until=date_until
     )
     # bank_number: 015
@@ -145,7 +199,12 @@ async def get_movements_from_interbanking(
     user: user_dependency, movements_request: MovementsRequest
 ):
     ib_service = InterBankingService()
-    movements_model = await ib_service.get_movement(
+    get_movement = (
+        ib_service.get_stored_movement
+        if movements_request.source == "store"
+        else ib_service.get_movement
+    )
+    movements_model = await get_movement(
         movements_request.account_number,
         movements_request.bank_number,
         date_since=movements_request.date_since,
@@ -179,3 +238,16 @@ async def get_accounts(user: user_dependency):
     ib_service = InterBankingService()
     accounts_model = await ib_service.get_accounts_only()
     return accounts_model
+
+
+@router.get(
+    "/interbanking-http-stats",
+    response_model=InterbankingHttpStats,
+    status_code=status.HTTP_200_OK,
+)
+async def get_interbanking_http_stats(user: user_dependency):
+    return {
+        **get_connection_stats(),
+        **get_coalescing_stats(),
+        **get_throttle_state(),
+    }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
 from datetime import date as dt_date, datetime
-from typing import Optional
+from typing import Literal, Optional
 
 class DocumentRequest(BaseModel):
   amount: float = Field(..., gt=0, description="Transaction amount, must be greater than 0")
@@ -49,6 +49,7 @@ class MovementsRequest(BaseModel):
   bank_number: str
   date_since: Optional[str]
   date_until: Optional[str]
+  source: Literal["ib", "store"] = "ib"
 
 
 class AllMovementsRequest:
@@ -64,3 +65,91 @@ class ReconciliationJobResponse(BaseModel):
   skipped: int
   still_pending: int
   duration_seconds: float
+
+
+class ReconciliationRunCounters(BaseModel):
+  checked: int
+  conciliated: int
+  repeated: int
+  expired: int
+  skipped: int
+
+
+class ReconciliationRunIBCalls(BaseModel):
+  calls: int
+  shared_calls: int = 0
+  bytes: int
+  calls_by_service: dict[str, int]
+
+
+class ReconciliationRunResponse(BaseModel):
+  run_id: str
+  status: Literal["queued", "running", "succeeded", "failed"]
+  submitted_at: datetime
+  started_at: Optional[datetime] = None
+  finished_at: Optional[datetime] = None
+  phase: Optional[str] = None
+  accounts_total: int
+  accounts_done: int
+  counters: ReconciliationRunCounters
+  phase_timings: dict[str, float]
+  account_timings: list[dict] = []
+  ib_calls: ReconciliationRunIBCalls
+  result: Optional[ReconciliationJobResponse] = None
+  error: Optional[str] = None
+
+
+class ReconciliationRunSummary(BaseModel):
+  run_id: str
+  trigger: str
+  status: str
+  shard_index: int
+  shard_count: int
+  started_at: datetime
+  finished_at: Optional[datetime] = None
+  duration_seconds: Optional[float] = None
+  pending_transactions: int
+  accounts_total: int
+  counters: ReconciliationRunCounters
+  still_pending: Optional[int] = None
+  phase_timings: dict[str, float]
+  ib_calls: ReconciliationRunIBCalls
+  trx_per_second: Optional[float] = None
+  ib_calls_per_trx: Optional[float] = None
+  error: Optional[str] = None
+
+
+class InterbankingCircuitState(BaseModel):
+  state: Literal["closed", "open", "half_open"]
+  consecutive_failures: int
+  retry_after_seconds: float
+  rejected_requests: int
+  times_opened: int
+
+
+class InterbankingLimiterState(BaseModel):
+  concurrency_limit: int
+  max_concurrency: int
+  active_requests: int
+  waiting_requests: int
+  rate_per_second: float
+  available_tokens: float
+  paused_seconds: float
+  throttled_responses: int
+  limit_decreases: int
+
+
+class InterbankingHttpStats(BaseModel):
+  requests: int
+  connections_opened: int
+  connections_reused: int
+  reuse_ratio: Optional[float] = None
+  transport_errors: int
+  clients_created: int
+  requests_started: int
+  requests_coalesced: int
+  requests_in_flight: int
+  cache_hits: int
+  cache_misses: int
+  circuit: InterbankingCircuitState
+  limiter: InterbankingLimiterState
@@ -1,20 +1,124 @@
+import asyncio
 import datetime
 import logging
 import os
+from functools import partial
 
 import httpx
+import numpy as np
+
+from app.services.holiday_store import HolidayCalendarStore
 
 
 logger = logging.getLogger(__name__)
 
 
+class BusinessDayCalendar:
+    """Business-day table for a contiguous range of years.
+
+    Day ``i`` of the table is ``first_day + i`` (date ordinals). ``rank[i]`` is
+    the number of business days before it, and ``business_days`` lists the
+    business day positions, so settlement, offsets and counts are array
+    lookups. All methods accept scalars or sequences of dates.
+    """
+
+    def __init__(
+        self,
+        first_year: int,
+        last_year: int,
+        holidays: set[datetime.date],
+    ):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.first_day = datetime.date(first_year, 1, 1).toordinal()
+        last_day = datetime.date(last_year, 12, 31).toordinal()
+
+        ordinals = np.arange(self.first_day, last_day + 1, dtype=np.int64)
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday.
+        is_business = (ordinals - 1) % 7 < 5
+        holiday_positions = np.array(
+            [
+                day.toordinal() - self.first_day
+                for day in holidays
+                if first_year <= day.year <= last_year
+            ],
+            dtype=np.int64,
+        )
+        is_business[holiday_positions] = False
+
+        self.business_days = np.flatnonzero(is_business)
+        self.rank = np.concatenate(([0], np.cumsum(is_business)))
+
+    def _positions(self, dates) -> np.ndarray:
+        positions = np.fromiter(
+            (value.toordinal() for value in dates),
+            dtype=np.int64,
+        ) - self.first_day
+        if positions.size and (
+            positions.min() < 0 or positions.max() >= len(self.rank) - 1
+        ):
+            raise ValueError(
+                f"Dates outside the calendar years {self.first_year}-{self.last_year}"
+            )
+        return positions
+
+    def _business_dates(self, business_ranks) -> list[datetime.date]:
+        if business_ranks.size and business_ranks.max() >= len(self.business_days):
+            raise RuntimeError(
+                f"Could not resolve a business date before the end of {self.last_year}"
+            )
+        if business_ranks.size and business_ranks.min() < 0:
+            raise RuntimeError(
+                f"Could not resolve a business date after the start of {self.first_year}"
+            )
+        return [
+            datetime.date.fromordinal(int(position) + self.first_day)
+            for position in self.business_days[business_ranks]
+        ]
+
+    def settlement_dates(self, dates) -> list[datetime.date]:
+        """Return each date when it is a business day, otherwise the next one."""
+        return self._business_dates(self.rank[self._positions(dates)])
+
+    def add_business_days(self, dates, days) -> list[datetime.date]:
+        """Move each date ``days`` business days forward (or back when negative).
+
+        Like ``numpy.busday_offset(..., roll="forward")``, dates that are not
+        business days are first rolled to the next business day.
+        """
+        return self._business_dates(
+            self.rank[self._positions(dates)] + np.asarray(days, dtype=np.int64)
+        )
+
+    def business_days_between(self, start_dates, end_dates) -> np.ndarray:
+        """Count the business days in ``[start, end)``; negative when end < start."""
+        return self.rank[self._positions(end_dates)] - self.rank[
+            self._positions(start_dates)
+        ]
+
+
 class BusinessCalendarService:
-    """Resolves Argentine banking settlement dates with a cached holiday calendar."""
+    """Resolves Argentine banking settlement dates with a cached holiday calendar.
+
+    Holidays are kept per year in a process-wide cache backed by the
+    ``holiday_calendars`` table, so new workers and job processes start from
+    the stored calendar instead of calling the holiday API. Concurrent misses
+    for a year share one fetch, calendars older than
+    ``ARGENTINA_HOLIDAYS_CACHE_TTL_HOURS`` are refreshed, and a failed refresh
+    keeps serving the stale calendar.
+    """
 
     DEFAULT_API_URL = "https://api.argentinadatos.com/v1/feriados/{year}"
-    _holiday_cache: dict[int, set[datetime.date]] = {}
+    _holiday_cache: dict[int, frozenset[datetime.date]] = {}
+    _holiday_fetched_at: dict[int, datetime.datetime] = {}
+    # Years whose fetch failed without a stored calendar, and when to retry.
+    _holiday_retry_at: dict[int, datetime.datetime] = {}
+    _holiday_fetches: dict[int, asyncio.Task] = {}
+    _store_loaded = False
+    # Settlements near the end of a year resolve into the next one.
+    SPILLOVER_YEARS = 1
 
-    def __init__(self):
+    def __init__(self, store: HolidayCalendarStore | None = None):
         self.api_url = os.getenv(
             "ARGENTINA_HOLIDAYS_API_URL",
             self.DEFAULT_API_URL,
@@ -22,9 +126,24 @@ class BusinessCalendarService:
         self.timeout_seconds = float(
             os.getenv("ARGENTINA_HOLIDAYS_API_TIMEOUT_SECONDS", "5")
         )
+        self.cache_ttl = datetime.timedelta(
+            hours=float(os.getenv("ARGENTINA_HOLIDAYS_CACHE_TTL_HOURS", "24"))
+        )
+        self.retry_delay = datetime.timedelta(
+            seconds=float(os.getenv("ARGENTINA_HOLIDAYS_RETRY_SECONDS", "300"))
+        )
         self.extra_bank_holidays = self._parse_extra_bank_holidays(
             os.getenv("ARGENTINA_BANK_HOLIDAYS", "")
         )
+        self.store = store or HolidayCalendarStore()
+        self._calendars: dict[
+            tuple[int, int], tuple[frozenset[datetime.date], BusinessDayCalendar]
+        ] = {}
+        # Per year: the cached calendar it was built from and the union with
+        # the configured bank holidays.
+        self._merged_holidays: dict[
+            int, tuple[frozenset[datetime.date], frozenset[datetime.date]]
+        ] = {}
 
     @staticmethod
     def _parse_extra_bank_holidays(value: str) -> set[datetime.date]:
@@ -42,57 +161,209 @@ class BusinessCalendarService:
                 )
         return holidays
 
-    async def get_holidays(self, year: int) -> set[datetime.date]:
-        cached = self._holiday_cache.get(year)
-        if cached is not None:
-            return cached | self.extra_bank_holidays
+    @classmethod
+    def cache_holidays(
+        cls,
+        year: int,
+        holidays: set[datetime.date],
+        fetched_at: datetime.datetime | None = None,
+    ) -> None:
+        cls._holiday_cache[year] = frozenset(holidays)
+        cls._holiday_fetched_at[year] = fetched_at or datetime.datetime.utcnow()
+        cls._holiday_retry_at.pop(year, None)
 
-        holidays: set[datetime.date] = set()
+    @classmethod
+    def clear_cache(cls) -> None:
+        cls._holiday_cache.clear()
+        cls._holiday_fetched_at.clear()
+        cls._holiday_retry_at.clear()
+        cls._holiday_fetches.clear()
+        cls._store_loaded = False
+
+    def preload_holidays(self) -> int:
+        """Load every stored year into the process cache; returns the year count."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-                response = await client.get(self.api_url.format(year=year))
-                response.raise_for_status()
-                payload = response.json()
-
-            if not isinstance(payload, list):
-                raise ValueError("Holiday API response must be a list")
-
-            for item in payload:
-                if not isinstance(item, dict):
-                    continue
-                date_value = item.get("fecha") or item.get("date")
-                if date_value:
-                    holidays.add(datetime.date.fromisoformat(str(date_value)[:10]))
-
-            self._holiday_cache[year] = holidays
-            logger.info(
-                "Argentine holiday calendar loaded year=%s holidays=%s",
-                year,
-                len(holidays),
-            )
+            stored = self.store.load_all()
+        except Exception:
+            logger.exception("Could not preload the stored holiday calendar")
+            return 0
+        finally:
+            BusinessCalendarService._store_loaded = True
+
+        for year, (holidays, fetched_at) in stored.items():
+            # Never replace a newer in-process calendar with an older stored one.
+            if self._holiday_fetched_at.get(year, datetime.datetime.min) < fetched_at:
+                self.cache_holidays(year, holidays, fetched_at)
+        return len(stored)
+
+    def _is_fresh(self, year: int, now: datetime.datetime) -> bool:
+        fetched_at = self._holiday_fetched_at.get(year)
+        return fetched_at is not None and now - fetched_at < self.cache_ttl
+
+    def _with_extra_bank_holidays(self, year: int) -> frozenset[datetime.date]:
+        cached = self._holiday_cache.get(year, frozenset())
+        merged = self._merged_holidays.get(year)
+        if merged is None or merged[0] is not cached:
+            merged = (cached, cached | self.extra_bank_holidays)
+            self._merged_holidays[year] = merged
+        return merged[1]
+
+    @classmethod
+    def _forget_fetch(cls, year: int, fetch: asyncio.Task) -> None:
+        if cls._holiday_fetches.get(year) is fetch:
+            del cls._holiday_fetches[year]
+
+    async def get_holidays(self, year: int) -> frozenset[datetime.date]:
+        if not self._store_loaded:
+            await asyncio.to_thread(self.preload_holidays)
+
+        now = datetime.datetime.utcnow()
+        if year in self._holiday_cache and self._is_fresh(year, now):
+            return self._with_extra_bank_holidays(year)
+        if year not in self._holiday_cache and now < self._holiday_retry_at.get(
+            year, datetime.datetime.min
+        ):
+            return self._with_extra_bank_holidays(year)
+
+        loop = asyncio.get_running_loop()
+        fetch = self._holiday_fetches.get(year)
+        # A fetch started by an earlier asyncio.run() cannot be awaited here.
+        if fetch is None or fetch.get_loop() is not loop:
+            fetch = loop.create_task(self._refresh_holidays(year))
+            self._holiday_fetches[year] = fetch
+            fetch.add_done_callback(partial(self._forget_fetch, year))
+        # Shielded so a cancelled caller does not cancel the fetch other callers share.
+        await asyncio.shield(fetch)
+
+        return self._with_extra_bank_holidays(year)
+
+    async def _refresh_holidays(self, year: int) -> None:
+        # Another worker may have refreshed the year since this process loaded it.
+        try:
+            stored = await asyncio.to_thread(self.store.load, year)
+        except Exception:
+            stored = None
+            logger.exception("Could not read the stored holiday calendar year=%s", year)
+        if stored is not None:
+            holidays, fetched_at = stored
+            if datetime.datetime.utcnow() - fetched_at < self.cache_ttl:
+                self.cache_holidays(year, holidays, fetched_at)
+                return
+
+        try:
+            holidays = await self._fetch_holidays(year)
         except (httpx.HTTPError, ValueError, TypeError) as exc:
-            # Cache the degraded result to avoid one external request per transaction.
-            self._holiday_cache[year] = set()
-            logger.warning(
-                "Holiday API unavailable; using weekends and configured bank holidays "
-                "year=%s error=%s",
-                year,
-                exc,
-            )
+            if year in self._holiday_cache or stored is not None:
+                if year not in self._holiday_cache:
+                    self.cache_holidays(year, stored[0], stored[1])
+                # Keep the stale calendar and try again after the retry delay.
+                self._holiday_fetched_at[year] = (
+                    datetime.datetime.utcnow() - self.cache_ttl + self.retry_delay
+                )
+                logger.warning(
+                    "Holiday API unavailable; keeping the stored calendar year=%s error=%s",
+                    year,
+                    exc,
+                )
+            else:
+                self._holiday_retry_at[year] = datetime.datetime.utcnow() + self.retry_delay
+                logger.warning(
+                    "Holiday API unavailable; using weekends and configured bank holidays "
+                    "year=%s error=%s",
+                    year,
+                    exc,
+                )
+            return
 
-        return self._holiday_cache[year] | self.extra_bank_holidays
+        fetched_at = datetime.datetime.utcnow()
+        self.cache_holidays(year, holidays, fetched_at)
+        logger.info(
+            "Argentine holiday calendar loaded year=%s holidays=%s",
+            year,
+            len(holidays),
+        )
+        try:
+            await asyncio.to_thread(self.store.save, year, holidays, fetched_at)
+        except Exception:
+            logger.exception("Could not store the holiday calendar year=%s", year)
 
-    async def get_settlement_date(self, transaction_date: datetime.date) -> datetime.date:
-        """Return the same date when enabled, otherwise the next business date."""
-        candidate = transaction_date
+    async def _fetch_holidays(self, year: int) -> set[datetime.date]:
+        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
+            response = await client.get(self.api_url.format(year=year))
+            response.raise_for_status()
+            payload = response.json()
 
-        # The limit protects the job from bad calendar data without hiding the failure.
-        for _ in range(15):
-            holidays = await self.get_holidays(candidate.year)
-            if candidate.weekday() < 5 and candidate not in holidays:
-                return candidate
-            candidate += datetime.timedelta(days=1)
+        if not isinstance(payload, list):
+            raise ValueError("Holiday API response must be a list")
 
-        raise RuntimeError(
-            f"Could not resolve a business date after {transaction_date.isoformat()}"
+        holidays: set[datetime.date] = set()
+        for item in payload:
+            if not isinstance(item, dict):
+                continue
+            date_value = item.get("fecha") or item.get("date")
+            if date_value:
+                holidays.add(datetime.date.fromisoformat(str(date_value)[:10]))
+        return holidays
+
+    async def get_business_day_calendar(
+        self,
+        first_year: int,
+        last_year: int,
+    ) -> BusinessDayCalendar:
+        """Return the business-day table for the years, rebuilt when holidays change."""
+        holidays = set()
+        for year in range(first_year, last_year + 1):
+            holidays |= await self.get_holidays(year)
+        holidays = frozenset(holidays)
+
+        cached = self._calendars.get((first_year, last_year))
+        if cached is not None and cached[0] == holidays:
+            return cached[1]
+
+        calendar = BusinessDayCalendar(first_year, last_year, holidays)
+        self._calendars[(first_year, last_year)] = (holidays, calendar)
+        return calendar
+
+    async def get_calendar_for_dates(self, dates) -> BusinessDayCalendar:
+        years = {value.year for value in dates}
+        if not years:
+            years = {datetime.date.today().year}
+        return await self.get_business_day_calendar(
+            min(years),
+            max(years) + self.SPILLOVER_YEARS,
         )
+
+    async def settlement_dates(self, dates) -> list[datetime.date]:
+        """Vectorized ``get_settlement_date`` for many dates in one call."""
+        dates = list(dates)
+        calendar = await self.get_calendar_for_dates(dates)
+        return calendar.settlement_dates(dates)
+
+    async def add_business_days(
+        self,
+        dates,
+        days,
+    ) -> list[datetime.date]:
+        dates = list(dates)
+        calendar = await self.get_calendar_for_dates(dates)
+        try:
+            return calendar.add_business_days(dates, days)
+        except RuntimeError:
+            # Large offsets can leave the default window: widen it and retry.
+            max_years = int(np.max(np.abs(days))) // 200 + 1
+            years = [value.year for value in dates]
+            calendar = await self.get_business_day_calendar(
+                min(years) - max_years,
+                max(years) + max_years,
+            )
+            return calendar.add_business_days(dates, days)
+
+    async def business_days_between(self, start_dates, end_dates) -> np.ndarray:
+        start_dates = list(start_dates)
+        end_dates = list(end_dates)
+        calendar = await self.get_calendar_for_dates(start_dates + end_dates)
+        return calendar.business_days_between(start_dates, end_dates)
+
+    async def get_settlement_date(self, transaction_date: datetime.date) -> datetime.date:
+        """Return the same date when enabled, otherwise the next business date."""
+        return (await self.settlement_dates([transaction_date]))[0]
@@ -1,17 +1,36 @@
 from .ErrorService import ErrorService
 from .SuccessService import SuccessService
 from fastapi import HTTPException
+import asyncio
+import logging
 import os
-import requests
+import time
 import datetime
-import jwt
+import httpx
 from app.bank_codes import codes
+from app.services.interbanking.client import connection_stats, get_http_client
+from app.services.interbanking.coalescing import cached_request, in_flight_requests
+from app.services.interbanking.json_stream import StreamingArrayParser, iter_json_array
+from app.services.interbanking.movements import build_interbanking_fingerprint
+from app.services.interbanking.stats import record_ib_call
+from app.services.interbanking.throttle import (
+    circuit_breaker,
+    is_throttling_status,
+    parse_retry_after,
+    rate_limiter,
+)
+from app.services.interbanking.token import get_token_exp, token_manager
+from app.services.interbanking.store import MovementStore
 from typing import Optional
 
 
+logger = logging.getLogger(__name__)
+
+
 class InterBankingService:
-    def __init__(self):
-        self.client = requests
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        # None uses the pooled client shared by every instance on this event loop.
+        self._http_client = http_client
         self.error = ErrorService()
         self.success = SuccessService()
         self.ib_auth_url = os.getenv("MS_INTER_BANKING_AUTH_URL")
@@ -21,15 +40,124 @@ class InterBankingService:
         self.client_id = os.getenv("MS_INTER_BANKING_CLIENT_ID")
         self.client_secret = os.getenv("MS_INTER_BANKING_CLIENT_SECRET")
         self.customer_id = os.getenv("MS_INTER_BANKING_CUSTOMER_ID")
-        self.token = os.getenv("MS_INTER_BANKING_AT")
+        self.token = None
+        self.movement_store = MovementStore()
+        self.store_movements = (
+            os.getenv("IB_MOVEMENTS_STORE_ENABLED", "true").lower() == "true"
+        )
+        self.all_movements_concurrency = max(
+            1, int(os.getenv("IB_ALL_MOVEMENTS_CONCURRENCY", "5"))
+        )
+        self.all_movements_account_timeout = float(
+            os.getenv("IB_ALL_MOVEMENTS_ACCOUNT_TIMEOUT_SECONDS", "20")
+        )
+        self.accounts_cache_ttl = float(os.getenv("IB_ACCOUNTS_CACHE_TTL_SECONDS", "60"))
+        self.balances_cache_ttl = float(os.getenv("IB_BALANCES_CACHE_TTL_SECONDS", "30"))
         self.auth_headers = {
             "Content-Type": "application/x-www-form-urlencoded",
             "Accept": "application/json",
             "service": "http://localhost:8000/dummy-callback",
         }
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
+    async def _send(
+        self, method: str, url: str, service_name: str, stream: bool = False, **kwargs
+    ):
+        """
+        Sends a request, retrying once with a new token when Interbanking answers 401.
+
+        A 401 to a token that has not expired means it was revoked: it is dropped
+        from the process, the token cache file and the env seed before retrying.
+        """
+        response = await self._send_once(method, url, service_name, stream, **kwargs)
+        headers = kwargs.get("headers") or {}
+        rejected_token = (headers.get("Authorization") or "").removeprefix("Bearer ").strip()
+        if response.status_code != 401 or not rejected_token:
+            return response
+
+        if stream:
+            # A complete answer from Interbanking, whatever the token problem.
+            self._record_stream_outcome(response, body_read=True, stream_failed=False)
+            await response.aclose()
+        logger.warning("%s rejected the Interbanking token; renewing it", service_name)
+        await token_manager.reject(rejected_token)
+        await self._update_token()
+        kwargs["headers"] = {
+            **headers,
+            "Authorization": f"Bearer {self._get_bearer_token(self.token)}",
+        }
+        return await self._send_once(method, url, service_name, stream, **kwargs)
+
+    async def _send_once(
+        self, method: str, url: str, service_name: str, stream: bool = False, **kwargs
+    ):
+        """
+        Sends a request on the pooled client, mapping transport failures to 502/504.
+
+        With ``stream=True`` the body is not read; the caller must close the response
+        and, unless it was a 429/5xx, report its outcome with _record_stream_outcome
+        once the body has been read.
+
+        Requests go through the process-wide rate limiter and circuit breaker:
+        while the circuit is open they fail fast with InterBankingUnavailable (503).
+        """
+        # Like requests, leave out headers and form fields that are not configured.
+        for name in ("headers", "data"):
+            if kwargs.get(name):
+                kwargs[name] = {
+                    key: value for key, value in kwargs[name].items() if value is not None
+                }
+
+        circuit_breaker.before_request()
+        try:
+            await rate_limiter.acquire()
+        except BaseException:
+            circuit_breaker.release_probe()
+            raise
+
+        started_at = time.monotonic()
+        try:
+            response = await self.client.send(
+                self.client.build_request(method, url, **kwargs),
+                stream=stream,
+            )
+        except httpx.TimeoutException as exc:
+            connection_stats.record_transport_error()
+            rate_limiter.record_throttled()
+            circuit_breaker.record_failure()
+            raise HTTPException(
+                status_code=504,
+                detail=f"{service_name} timed out. error={exc!r}",
+            ) from exc
+        except httpx.TransportError as exc:
+            connection_stats.record_transport_error()
+            circuit_breaker.record_failure()
+            raise HTTPException(
+                status_code=502,
+                detail=f"{service_name} is unreachable. error={exc!r}",
+            ) from exc
+        except BaseException:
+            circuit_breaker.release_probe()
+            raise
+        finally:
+            rate_limiter.release()
+
+        if is_throttling_status(response.status_code):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            rate_limiter.record_throttled(retry_after)
+            circuit_breaker.record_failure(retry_after)
+        else:
+            rate_limiter.record_success(time.monotonic() - started_at)
+            if not stream:
+                circuit_breaker.record_success()
+        return response
+
     @staticmethod
     def _parse_json_response(response, service_name: str):
+        record_ib_call(service_name, len(response.content or b""))
         if not response.content:
             raise HTTPException(
                 status_code=502,
@@ -66,21 +194,16 @@ class InterBankingService:
         token = InterBankingService._get_bearer_token(token)
         if not token:
             return True
-        try:
-            decoded = jwt.decode(token, options={"verify_signature": False})
-            exp = decoded.get("exp")
-            now = int(datetime.datetime.now().timestamp())
-            return exp is None or exp <= now
-        except Exception:
-            return True
+        exp = get_token_exp(token)
+        now = int(datetime.datetime.now().timestamp())
+        return exp is None or exp <= now
 
 
     async def _update_token(self):
         """
-        Obtains account balances
+        Takes the process-wide token, authenticating only when it must be renewed
         """
-        if not self.token or self._is_token_expired(self.token):
-            self.token = await self._authenticate()
+        self.token = await token_manager.get_token(self._authenticate)
 
 
     async def _authenticate(self):
@@ -99,7 +222,9 @@ class InterBankingService:
             "service": "http://localhost:8000/dummy-callback",
             "Cookie": "JSESSIONID=588CA22D9BBCA573D8434D2AD597A7E0; incap_ses_7224_2935514=YgIqC6S/NkblSJPYMs5AZO04lmgAAAAAy1GPB8rcP6uHJzmXuw6M7w==; visid_incap_2935514=YMhpCTdhT3+dABCItC/te+w4lmgAAAAAQUIPAAAAAACSdf1G2IB40aoC6mXv7MpU; a911021363f92e0661f0698f562fc1d7=abdb1d2067e3edc11e05c707d6cd0e2e",
         }
-        response = requests.request("POST", url, headers=headers, data=payload)
+        response = await self._send(
+            "POST", url, "Interbanking auth", headers=headers, data=payload
+        )
         result = self._parse_json_response(response, "Interbanking auth")
         bearer_token = self._get_bearer_token(result)
         if not bearer_token:
@@ -108,111 +233,393 @@ class InterBankingService:
                 detail=f"Interbanking auth response did not include access_token or id_token. body={result}",
             )
 
-        os.environ["MS_INTER_BANKING_AT"] = bearer_token
-        self.token = result
-        return result
+        return bearer_token
 
 
     async def get_movement(self, account_number, bank_number, date_since, date_until):
         """
         Obtains movements
         """
+        result, _ = await self.sync_movement(
+            account_number, bank_number, date_since, date_until
+        )
+        return result
+
+
+    def _request_key(self, endpoint, *values):
+        return (endpoint, self.customer_id, *(str(value) if value else None for value in values))
+
+    async def sync_movement(self, account_number, bank_number, date_since, date_until):
+        """
+        Obtains movements and stores them; returns the result and how many were new
+
+        Concurrent calls for the same account and dates share one request.
+        """
+        return await in_flight_requests.run(
+            self._request_key(
+                "movements",
+                account_number,
+                bank_number,
+                date_since,
+                date_until,
+                self.store_movements,
+            ),
+            lambda: self._sync_movement(
+                account_number, bank_number, date_since, date_until
+            ),
+            "Interbanking movements",
+        )
+
+
+    async def _sync_movement(self, account_number, bank_number, date_since, date_until):
         await self._update_token()
         url = f"{self.ib_api_url}{account_number}/movements/anteriores?bank-number={bank_number}&customer-id={self.customer_id}"
         if date_since:
             url += f"&date-since={date_since}"
         if date_until:
             url += f"&date-until={date_until}"
-        payload = {}
         headers = {
             "Accept": "application/json",
             "Authorization": f"Bearer {self._get_bearer_token(self.token)}",
             "client_id": self.client_id,
         }
-        response = requests.get(url, headers=headers)
+        response = await self._send(
+            "GET", url, "Interbanking movements", headers=headers
+        )
 
         result = self._parse_json_response(response, "Interbanking movements")
-        return result
+        stored_count = await self._store_movements(
+            account_number,
+            bank_number,
+            date_since,
+            date_until,
+            result.get("movements_detail") or [],
+        )
+        return result, stored_count
+
+
+    async def _store_movements(
+        self, account_number, bank_number, date_since, date_until, movements
+    ):
+        """
+        Persists fetched movements in ib_movements; failures never break the caller.
+        """
+        if not self.store_movements:
+            return 0
+
+        try:
+            stored_count = await asyncio.to_thread(
+                self.movement_store.upsert_movements,
+                bank_number,
+                account_number,
+                movements,
+            )
+            if date_since and date_until:
+                await asyncio.to_thread(
+                    self.movement_store.mark_synced,
+                    bank_number,
+                    account_number,
+                    datetime.date.fromisoformat(str(date_since)[:10]),
+                    datetime.date.fromisoformat(str(date_until)[:10]),
+                )
+            return stored_count
+        except Exception:
+            logger.exception(
+                "Failed to store Interbanking movements account_number=%s bank_number=%s",
+                account_number,
+                bank_number,
+            )
+            return 0
+
+
+    async def get_stored_movement(
+        self, account_number, bank_number, date_since, date_until
+    ):
+        """
+        Obtains movements from the local store, fetching only unsynced ranges from Interbanking
+        """
+        if not self.store_movements:
+            return await self.get_movement(
+                account_number, bank_number, date_since, date_until
+            )
+
+        if not date_since or not date_until:
+            self.error.raise_bad_request(
+                "date_since and date_until are required to read stored movements"
+            )
+
+        since = datetime.date.fromisoformat(str(date_since)[:10])
+        until = datetime.date.fromisoformat(str(date_until)[:10])
+        missing_ranges = await asyncio.to_thread(
+            self.movement_store.get_missing_ranges,
+            bank_number,
+            account_number,
+            since,
+            until,
+        )
+
+        fetched_movements = []
+        for range_since, range_until in missing_ranges:
+            result = await self.get_movement(
+                account_number,
+                bank_number,
+                date_since=range_since.isoformat(),
+                date_until=range_until.isoformat(),
+            )
+            fetched_movements.extend(result.get("movements_detail") or [])
+
+        movements = await asyncio.to_thread(
+            self.movement_store.get_movements,
+            bank_number,
+            account_number,
+            since,
+            until,
+        )
+
+        if fetched_movements:
+            # Covers fetched movements the store could not persist.
+            stored_fingerprints = {
+                build_interbanking_fingerprint(movement, bank_number, account_number)
+                for movement in movements
+            }
+            movements.extend(
+                movement
+                for movement in fetched_movements
+                if build_interbanking_fingerprint(movement, bank_number, account_number)
+                not in stored_fingerprints
+            )
+
+        return {
+            "movements_detail": movements,
+            "source": "store",
+            "ib_fetched_ranges": len(missing_ranges),
+        }
 
 
     async def get_historical_movement(
         self, account_number, bank_number, date_since, date_until
     ):
         """
-        Obtains movements
+        Obtains movements; concurrent calls for the same range share one request
         """
-        await self._update_token()
+        return await in_flight_requests.run(
+            self._request_key(
+                "historical_movements",
+                account_number,
+                bank_number,
+                date_since,
+                date_until,
+            ),
+            lambda: self._get_historical_movement(
+                account_number, bank_number, date_since, date_until
+            ),
+            "Interbanking historical movements",
+        )
+
+
+    def _historical_movement_url(self, account_number, bank_number, date_since, date_until):
         url = f"{self.ib_api_url}{account_number}/movements/ZUGHUS?bank-number={bank_number}&customer-id={self.customer_id}"
         if date_since:
             url += f"&date-since={date_since}"
         if date_until:
             url += f"&date-until={date_until}"
-        payload = {}
+        return url
+
+
+    async def _get_historical_movement(
+        self, account_number, bank_number, date_since, date_until
+    ):
+        await self._update_token()
+        url = self._historical_movement_url(
+            account_number, bank_number, date_since, date_until
+        )
         headers = {
             "Accept": "application/json",
             "Authorization": f"Bearer {self._get_bearer_token(self.token)}",
             "client_id": self.client_id,
         }
-        response = requests.request("GET", url, headers=headers, data=payload)
+        response = await self._send(
+            "GET", url, "Interbanking historical movements", headers=headers
+        )
         result = self._parse_json_response(response, "Interbanking historical movements")
         return result
-    
+
+
+    async def iter_historical_movements(
+        self, account_number, bank_number, date_since, date_until, envelope=None
+    ):
+        """
+        Yields historical movements one at a time while the response is downloaded
+
+        Only the movement being parsed is held in memory. The other members of
+        the response are copied into ``envelope`` once the body has been read.
+        """
+        service_name = "Interbanking historical movements"
+        await self._update_token()
+        url = self._historical_movement_url(
+            account_number, bank_number, date_since, date_until
+        )
+        headers = {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self._get_bearer_token(self.token)}",
+            "client_id": self.client_id,
+        }
+        response = await self._send(
+            "GET", url, service_name, stream=True, headers=headers
+        )
+        body_read = False
+        stream_failed = False
+        received_bytes = 0
+
+        async def body_chunks():
+            nonlocal received_bytes
+            async for chunk in response.aiter_bytes():
+                received_bytes += len(chunk)
+                yield chunk
+
+        try:
+            try:
+                if response.status_code >= 400:
+                    await response.aread()
+                    body_read = True
+                    self._parse_json_response(response, service_name)
+
+                parser = StreamingArrayParser("movements_detail")
+                try:
+                    async for movement in iter_json_array(body_chunks(), parser):
+                        yield movement
+                finally:
+                    record_ib_call(service_name, received_bytes)
+                body_read = True
+            except ValueError as exc:
+                stream_failed = True
+                raise HTTPException(
+                    status_code=502,
+                    detail=(
+                        f"{service_name} returned an invalid JSON response. "
+                        f"status_code={response.status_code} error={exc}"
+                    ),
+                ) from exc
+            except httpx.TimeoutException as exc:
+                stream_failed = True
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"{service_name} timed out. error={exc!r}",
+                ) from exc
+            except httpx.TransportError as exc:
+                stream_failed = True
+                connection_stats.record_transport_error()
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"{service_name} is unreachable. error={exc!r}",
+                ) from exc
+
+            if envelope is not None:
+                envelope.update(parser.envelope)
+        finally:
+            await response.aclose()
+            self._record_stream_outcome(response, body_read, stream_failed)
+
+
+    @staticmethod
+    def _record_stream_outcome(response, body_read: bool, stream_failed: bool):
+        """
+        Reports a streamed response to the circuit breaker once its body is done
+        """
+        if is_throttling_status(response.status_code):
+            # Already counted as a failure by _send.
+            return
+        if stream_failed:
+            circuit_breaker.record_failure()
+        elif body_read:
+            circuit_breaker.record_success()
+        else:
+            # The caller stopped reading early; the call proved nothing either way.
+            circuit_breaker.release_probe()
+
 
     async def get_movements_for_all_accounts(
         self, date_since: Optional[str], date_until: Optional[str]
     ):
         """
         Obtains all movements for all Interbanking client accounts.
+
+        Accounts are fetched concurrently, at most IB_ALL_MOVEMENTS_CONCURRENCY at
+        a time, and an account slower than IB_ALL_MOVEMENTS_ACCOUNT_TIMEOUT_SECONDS
+        is reported with an error instead of delaying the others.
         """
 
         accounts_model = await self.get_accounts()
 
         accounts = accounts_model.get("accounts", [])
 
-        accounts_with_movements = []
-
-        for account in accounts:
-            account_number = account.get("account_number")
-            bank_number = account.get("bank_number")
-
-            try:
-                account_movements = await self.get_movement(
-                    account_number=account_number,
-                    bank_number=bank_number,
-                    date_since=date_since,
-                    date_until=date_until,
-                )
-
-                movements = account_movements.get("movements_detail", [])
-
-                accounts_with_movements.append(
-                    {
+        semaphore = asyncio.Semaphore(self.all_movements_concurrency)
+
+        async def fetch_account(account):
+            async with semaphore:
+                try:
+                    account_movements = await asyncio.wait_for(
+                        self.get_movement(
+                            account_number=account.get("account_number"),
+                            bank_number=account.get("bank_number"),
+                            date_since=date_since,
+                            date_until=date_until,
+                        ),
+                        timeout=self.all_movements_account_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        "Interbanking movements timed out account_number=%s bank_number=%s",
+                        account.get("account_number"),
+                        account.get("bank_number"),
+                    )
+                    return {
                         **account,
-                        "movements": movements,
-                        "movements_count": len(movements),
-                        "error": None,
+                        "movements": [],
+                        "movements_count": 0,
+                        "error": (
+                            "Interbanking movements timed out after "
+                            f"{self.all_movements_account_timeout:g} seconds"
+                        ),
                     }
-                )
-
-            except Exception as e:
-                accounts_with_movements.append(
-                    {**account, "movements": [], "movements_count": 0, "error": str(e)}
-                )
+                except Exception as e:
+                    return {**account, "movements": [], "movements_count": 0, "error": str(e)}
+
+            movements = account_movements.get("movements_detail", [])
+            return {
+                **account,
+                "movements": movements,
+                "movements_count": len(movements),
+                "error": None,
+            }
 
-        return accounts_with_movements
+        return list(await asyncio.gather(*(fetch_account(account) for account in accounts)))
 
 
     async def get_accounts_balances(self):
+        """
+        Obtains account balances, cached for IB_BALANCES_CACHE_TTL_SECONDS
+        """
+        return await cached_request(
+            self._request_key("balances"),
+            self.balances_cache_ttl,
+            self._get_accounts_balances,
+            "Interbanking balances",
+        )
+
+
+    async def _get_accounts_balances(self):
         await self._update_token()
         url = f"{self.ib_balances_api_url}?customer-id={self.customer_id}"
-        payload = {}
         headers = {
             "Accept": "application/json",
             "Authorization": f"Bearer {self._get_bearer_token(self.token)}",
             "client_id": self.client_id,
         }
-        repsonse = requests.request("GET", url=url, headers=headers, data=payload)
-        result = self._parse_json_response(repsonse, "Interbanking balances")
+        response = await self._send(
+            "GET", url, "Interbanking balances", headers=headers
+        )
+        result = self._parse_json_response(response, "Interbanking balances")
         accounts_list = result.get("accounts")
         if accounts_list is None:
             self.error.raise_not_found(accounts_list)
@@ -233,16 +640,29 @@ class InterBankingService:
 
 
     async def get_accounts(self):
+        """
+        Obtains the client accounts, cached for IB_ACCOUNTS_CACHE_TTL_SECONDS
+        """
+        return await cached_request(
+            self._request_key("accounts"),
+            self.accounts_cache_ttl,
+            self._get_accounts,
+            "Interbanking accounts",
+        )
+
+
+    async def _get_accounts(self):
         await self._update_token()
         url = f"{self.ib_accounts_api_url}?customer-id={self.customer_id}"
-        payload = {}
         headers = {
             "Accept": "application/json",
             "Authorization": f"Bearer {self._get_bearer_token(self.token)}",
             "client_id": self.client_id,
         }
-        repsonse = requests.request("GET", url=url, headers=headers, data=payload)
-        result = self._parse_json_response(repsonse, "Interbanking accounts")
+        response = await self._send(
+            "GET", url, "Interbanking accounts", headers=headers
+        )
+        result = self._parse_json_response(response, "Interbanking accounts")
         return result
 
 
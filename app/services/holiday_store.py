@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import datetime
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.db.database import SessionLocal
+from app.models import HolidayCalendar
+
+
+logger = logging.getLogger(__name__)
+
+
+class HolidayCalendarStore:
+    """Persists the holiday calendar fetched per year and when it was fetched."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _to_entry(calendar: HolidayCalendar):
+        return (
+            {datetime.date.fromisoformat(value) for value in calendar.holidays or []},
+            calendar.fetched_at,
+        )
+
+    def load_all(self) -> dict[int, tuple[set[datetime.date], datetime.datetime]]:
+        """Return ``year -> (holidays, fetched_at)`` for every stored year."""
+        db = self.session_factory()
+        try:
+            return {
+                calendar.year: self._to_entry(calendar)
+                for calendar in db.execute(select(HolidayCalendar)).scalars()
+            }
+        finally:
+            db.close()
+
+    def load(self, year: int):
+        db = self.session_factory()
+        try:
+            calendar = db.execute(
+                select(HolidayCalendar).where(HolidayCalendar.year == year)
+            ).scalar_one_or_none()
+            return None if calendar is None else self._to_entry(calendar)
+        finally:
+            db.close()
+
+    def save(
+        self,
+        year: int,
+        holidays: set[datetime.date],
+        fetched_at: datetime.datetime,
+    ) -> None:
+        values = sorted(value.isoformat() for value in holidays)
+        db = self.session_factory()
+        try:
+            for _ in range(2):
+                calendar = db.execute(
+                    select(HolidayCalendar).where(HolidayCalendar.year == year)
+                ).scalar_one_or_none()
+                if calendar is None:
+                    calendar = HolidayCalendar(year=year)
+                    db.add(calendar)
+                calendar.holidays = values
+                calendar.fetched_at = fetched_at
+                try:
+                    db.commit()
+                    return
+                except IntegrityError:
+                    # Another worker stored the year first: update its row.
+                    db.rollback()
+            raise RuntimeError(f"Could not store the holiday calendar year={year}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events emitted when a request has to open a new connection.
+CONNECTION_OPENED_EVENTS = {
+    "connection.connect_tcp.complete",
+    "connection.connect_unix_socket.complete",
+}
+
+
+def get_float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class ConnectionStats:
+    """Counts Interbanking requests and the connections opened to serve them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.connections_opened = 0
+            self.transport_errors = 0
+            self.clients_created = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection_opened(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def record_transport_error(self) -> None:
+        with self._lock:
+            self.transport_errors += 1
+
+    def record_client_created(self) -> None:
+        with self._lock:
+            self.clients_created += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_ratio": (
+                    round(reused / self.requests, 4) if self.requests else None
+                ),
+                "transport_errors": self.transport_errors,
+                "clients_created": self.clients_created,
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+async def _trace(event_name, info):
+    if event_name in CONNECTION_OPENED_EVENTS:
+        connection_stats.record_connection_opened()
+
+
+async def _on_request(request: httpx.Request):
+    connection_stats.record_request()
+    request.extensions["trace"] = _trace
+
+
+def build_http_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Create the pooled Interbanking client from the IB_HTTP_* settings."""
+    timeout = httpx.Timeout(
+        connect=get_float_env("IB_HTTP_CONNECT_TIMEOUT_SECONDS", 5),
+        read=get_float_env("IB_HTTP_READ_TIMEOUT_SECONDS", 60),
+        write=get_float_env("IB_HTTP_WRITE_TIMEOUT_SECONDS", 30),
+        pool=get_float_env("IB_HTTP_POOL_TIMEOUT_SECONDS", 30),
+    )
+    limits = httpx.Limits(
+        max_connections=get_int_env("IB_HTTP_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=get_int_env("IB_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20),
+        keepalive_expiry=get_float_env("IB_HTTP_KEEPALIVE_EXPIRY_SECONDS", 30),
+    )
+    connection_stats.record_client_created()
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        transport=transport,
+        event_hooks={"request": [_on_request]},
+    )
+
+
+# Connections belong to the event loop that opened them, so the API worker and
+# each asyncio.run() of a job get their own long-lived client.
+_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, httpx.AsyncClient
+] = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = build_http_client()
+    return client
+
+
+async def close_http_client() -> None:
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_connection_stats() -> dict:
+    return connection_stats.snapshot()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import threading
+import time
+from functools import partial
+
+from app.services.interbanking.stats import record_ib_call
+
+
+class InFlightRequests:
+    """Lets concurrent callers with the same key share one in-flight request."""
+
+    def __init__(self):
+        self._tasks: dict[tuple, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key: tuple, request_factory, service_name: str | None = None):
+        """Await ``request_factory()``, or the identical request already running.
+
+        A caller joining a running request is counted as a shared call of
+        ``service_name`` in its own IB call stats.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(request_factory())
+            self._tasks[key] = task
+            task.add_done_callback(partial(self._forget, key))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            if service_name:
+                record_ib_call(service_name, 0, shared=True)
+        # Shielded so one caller giving up does not cancel the request for the rest.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: tuple, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Retrieved here so a failure nobody awaited anymore is not logged as lost.
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+
+class ResponseCache:
+    """Small TTL cache for responses that rarely change; values are copied."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, object]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: tuple, value, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, copy.deepcopy(value))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+in_flight_requests = InFlightRequests()
+response_cache = ResponseCache()
+
+
+async def cached_request(
+    key: tuple, ttl_seconds: float, request_factory, service_name: str | None = None
+):
+    """Serve ``key`` from the TTL cache, coalescing concurrent misses."""
+    cached = response_cache.get(key)
+    if cached is not None:
+        if service_name:
+            record_ib_call(service_name, 0, shared=True)
+        return cached
+
+    async def fetch_and_cache():
+        result = await request_factory()
+        response_cache.set(key, result, ttl_seconds)
+        return result
+
+    return copy.deepcopy(
+        await in_flight_requests.run(key, fetch_and_cache, service_name)
+    )
+
+
+def get_coalescing_stats() -> dict:
+    return {
+        "requests_started": in_flight_requests.started,
+        "requests_coalesced": in_flight_requests.coalesced,
+        "requests_in_flight": in_flight_requests.in_flight(),
+        "cache_hits": response_cache.hits,
+        "cache_misses": response_cache.misses,
+    }
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import codecs
+import json
+
+
+WHITESPACE = " \t\n\r"
+NUMBER_CHARS = "0123456789.eE+-"
+
+
+class StreamingArrayParser:
+    """Incremental parser for a JSON object with one large array member.
+
+    Text is fed in chunks and the items of the ``key`` array are returned as
+    soon as each one is complete, so only one item (plus the unread part of
+    the current chunk) is held in memory at a time. Every other member of the
+    top-level object is collected in ``envelope``. Items are decoded with
+    ``json.JSONDecoder.raw_decode``.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.envelope: dict = {}
+        self.items_count = 0
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._state = "object_start"
+        self._current_key = None
+
+    @property
+    def finished(self) -> bool:
+        return self._state == "end"
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """Add text and return the array items completed by it.
+
+        ``final`` marks the end of the document; a truncated or malformed
+        document then raises ValueError.
+        """
+        self._buffer += text
+        items = []
+        while self._step(items, final):
+            pass
+        self._buffer = self._buffer[self._position :]
+        self._position = 0
+
+        if final:
+            if self._state != "end":
+                raise ValueError(f"Truncated JSON document: expected more after {self._state}")
+            if self._buffer.strip(WHITESPACE):
+                raise ValueError("Unexpected data after the JSON document")
+        return items
+
+    def _next_char(self):
+        while self._position < len(self._buffer) and self._buffer[self._position] in WHITESPACE:
+            self._position += 1
+        if self._position < len(self._buffer):
+            return self._buffer[self._position]
+        return None
+
+    def _decode(self, final):
+        """Decode the value at the current position, or None when more text is needed."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._position)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # A number at (or just before) the end of the chunk may continue in the
+        # next one: "1234." decodes as 1234 and leaves the "." behind.
+        if not final and (end == len(self._buffer) or self._buffer[end] in NUMBER_CHARS):
+            return None
+        self._position = end
+        return (value,)
+
+    def _expect(self, char, expected):
+        if char != expected:
+            raise ValueError(
+                f"Invalid JSON document: expected {expected!r} at {self._state}, got {char!r}"
+            )
+        self._position += 1
+
+    def _step(self, items, final) -> bool:
+        char = self._next_char()
+        if char is None or self._state == "end":
+            return False
+
+        if self._state == "object_start":
+            self._expect(char, "{")
+            self._state = "member"
+            return True
+
+        if self._state == "member":
+            if char == "}":
+                self._position += 1
+                self._state = "end"
+                return True
+            if char == ",":
+                self._position += 1
+                return True
+            decoded = self._decode(final)
+            if decoded is None:
+                return False
+            if not isinstance(decoded[0], str):
+                raise ValueError("Invalid JSON document: object keys must be strings")
+            self._current_key = decoded[0]
+            self._state = "colon"
+            return True
+
+        if self._state == "colon":
+            self._expect(char, ":")
+            self._state = "array_start" if self._current_key == self.key else "value"
+            return True
+
+        if self._state == "value":
+            decoded = self._decode(final)
+            if decoded is None:
+                return False
+            self.envelope[self._current_key] = decoded[0]
+            self._state = "member"
+            return True
+
+        if self._state == "array_start":
+            if char != "[":
+                # Not an array (e.g. null): keep it like any other member.
+                self._state = "value"
+                return True
+            self._position += 1
+            self._state = "item"
+            return True
+
+        if self._state == "item":
+            if char == "]":
+                self._position += 1
+                self._state = "member"
+                return True
+            if char == ",":
+                self._position += 1
+                return True
+            decoded = self._decode(final)
+            if decoded is None:
+                return False
+            items.append(decoded[0])
+            self.items_count += 1
+            return True
+
+        raise ValueError(f"Invalid parser state {self._state}")
+
+
+async def iter_json_array(byte_chunks, parser: StreamingArrayParser):
+    """Yield the parser's array items from an async iterator of UTF-8 bytes."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in byte_chunks:
+        for item in parser.feed(decoder.decode(chunk)):
+            yield item
+    for item in parser.feed(decoder.decode(b"", final=True), final=True):
+        yield item
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+from decimal import Decimal
+
+
+def normalize_account(value):
+    return str(value or "").replace(" ", "").replace("-", "").strip()
+
+
+def normalize_fingerprint_value(value):
+    return str(value or "").strip().upper()
+
+
+def normalize_amount(value):
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def parse_movement_datetime(value):
+    """Return the movement timestamp as IB reports it, without its UTC offset."""
+    return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(
+        tzinfo=None
+    )
+
+
+def parse_movement_date(value):
+    return parse_movement_datetime(value).date()
+
+
+def normalize_movement_date(value):
+    if not value:
+        return ""
+    return parse_movement_date(value).isoformat()
+
+
+def amount_to_cents(value):
+    return int(normalize_amount(value) * 100)
+
+
+def build_interbanking_fingerprint(movement, bank_number, account_number):
+    stable_key = "|".join(
+        [
+            normalize_fingerprint_value(bank_number),
+            normalize_fingerprint_value(account_number),
+            normalize_fingerprint_value(movement.get("voucher_number")),
+            normalize_fingerprint_value(movement.get("correlative_number")),
+            normalize_fingerprint_value(movement.get("operation_code_bank")),
+            normalize_fingerprint_value(movement.get("operation_code_ib")),
+            normalize_fingerprint_value(movement.get("branch_office_activity")),
+            normalize_fingerprint_value(movement.get("debit_credit_type")),
+            normalize_movement_date(movement.get("movement_date")),
+            str(normalize_amount(movement.get("amount"))),
+            normalize_fingerprint_value(movement.get("customer_cuit")),
+            normalize_account(movement.get("account_cbu")),
+        ]
+    )
+    return hashlib.sha256(stable_key.encode("utf-8")).hexdigest()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Counters collecting Interbanking calls for the current task. asyncio tasks
+# and asyncio.to_thread copy the context, so a collector opened for a run or
+# an account also sees the calls made by everything it awaits.
+_active_collectors: ContextVar[tuple[Counter, ...]] = ContextVar(
+    "interbanking_call_collectors",
+    default=(),
+)
+
+
+def record_ib_call(service_name: str, response_bytes: int, shared: bool = False):
+    """Count one Interbanking response used by the current task.
+
+    ``shared`` marks a response taken from another caller's in-flight request
+    or from the response cache: it counts as a call for every caller that used
+    it, but its bytes were only transferred once. ``calls - shared_calls`` is
+    the number of requests actually sent to Interbanking.
+    """
+    for collector in _active_collectors.get():
+        collector["calls"] += 1
+        collector["bytes"] += response_bytes
+        collector[f"calls:{service_name}"] += 1
+        if shared:
+            collector["shared_calls"] += 1
+
+
+@contextmanager
+def collect_ib_calls():
+    """Collect the Interbanking calls made inside the block into a Counter."""
+    collector = Counter()
+    token = _active_collectors.set(_active_collectors.get() + (collector,))
+    try:
+        yield collector
+    finally:
+        _active_collectors.reset(token)
+
+
+def summarize_ib_calls(collector: Counter) -> dict:
+    return {
+        "calls": collector.get("calls", 0),
+        "shared_calls": collector.get("shared_calls", 0),
+        "bytes": collector.get("bytes", 0),
+        "calls_by_service": {
+            name.split(":", 1)[1]: count
+            for name, count in collector.items()
+            if name.startswith("calls:")
+        },
+    }
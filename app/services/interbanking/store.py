@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.database import SessionLocal
+from app.models import IBMovement, IBMovementSyncRange, IBSyncWatermark
+from app.services.interbanking.movements import (
+    amount_to_cents,
+    build_interbanking_fingerprint,
+    parse_movement_date,
+)
+
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHUNK_SIZE = 1000
+
+
+def get_closed_until(today: datetime.date | None = None) -> datetime.date:
+    """Return the last movement date treated as final by the bank.
+
+    Days after it can still receive movements, so they are never recorded as
+    synced and are always fetched again from Interbanking.
+    """
+    lag_days = int(os.getenv("IB_MOVEMENTS_SYNC_LAG_DAYS", "2"))
+    return (today or datetime.date.today()) - datetime.timedelta(days=lag_days)
+
+
+def get_latest_movement_date(movements):
+    """Return the date of the newest movement, or None."""
+    latest = None
+    for movement in movements:
+        try:
+            movement_date = parse_movement_date(movement.get("movement_date"))
+        except (TypeError, ValueError):
+            continue
+        if latest is None or movement_date > latest:
+            latest = movement_date
+    return latest
+
+
+def subtract_ranges(date_since, date_until, covered_ranges):
+    """Return the parts of [date_since, date_until] outside the covered ranges."""
+    missing = []
+    cursor = date_since
+    for covered_since, covered_until in sorted(covered_ranges):
+        if covered_until < cursor:
+            continue
+        if covered_since > date_until:
+            break
+        if covered_since > cursor:
+            missing.append((cursor, covered_since - datetime.timedelta(days=1)))
+        cursor = max(cursor, covered_until + datetime.timedelta(days=1))
+        if cursor > date_until:
+            return missing
+
+    if cursor <= date_until:
+        missing.append((cursor, date_until))
+    return missing
+
+
+class MovementStore:
+    """Persists normalized Interbanking movements and the date ranges already synced."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def build_rows(bank_number, account_number, movements):
+        rows = {}
+        for movement in movements:
+            try:
+                document_fingerprint = build_interbanking_fingerprint(
+                    movement,
+                    bank_number=bank_number,
+                    account_number=account_number,
+                )
+                rows[document_fingerprint] = {
+                    "document_fingerprint": document_fingerprint,
+                    "bank_number": str(bank_number),
+                    "account_number": str(account_number),
+                    "movement_date": parse_movement_date(movement.get("movement_date")),
+                    "amount_cents": amount_to_cents(movement.get("amount")),
+                    "debit_credit_type": movement.get("debit_credit_type"),
+                    "correlative_number": movement.get("correlative_number"),
+                    "payload": movement,
+                    "fetched_at": datetime.datetime.utcnow(),
+                }
+            except (ArithmeticError, TypeError, ValueError):
+                logger.warning(
+                    "Skipping unparseable Interbanking movement account_number=%s "
+                    "amount=%s movement_date=%s",
+                    account_number,
+                    movement.get("amount"),
+                    movement.get("movement_date"),
+                )
+        return list(rows.values())
+
+    @staticmethod
+    def _insert_ignoring_duplicates(db):
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return (
+                postgresql.insert(IBMovement)
+                .on_conflict_do_nothing(index_elements=["document_fingerprint"])
+                .returning(IBMovement.id)
+            )
+        if dialect == "sqlite":
+            return (
+                sqlite.insert(IBMovement)
+                .on_conflict_do_nothing(index_elements=["document_fingerprint"])
+                .returning(IBMovement.id)
+            )
+        raise RuntimeError(f"Unsupported database dialect for ib_movements: {dialect}")
+
+    def upsert_movements(self, bank_number, account_number, movements) -> int:
+        """Insert movements not stored yet; returns how many rows were new."""
+        rows = self.build_rows(bank_number, account_number, movements)
+        if not rows:
+            return 0
+
+        db = self.session_factory()
+        try:
+            statement = self._insert_ignoring_duplicates(db)
+            inserted = 0
+            for chunk_start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                inserted += len(
+                    db.execute(
+                        statement,
+                        rows[chunk_start : chunk_start + UPSERT_CHUNK_SIZE],
+                    ).all()
+                )
+            db.commit()
+            return inserted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get_movements(self, bank_number, account_number, date_since, date_until):
+        db = self.session_factory()
+        try:
+            return list(
+                db.execute(
+                    select(IBMovement.payload)
+                    .where(
+                        IBMovement.bank_number == str(bank_number),
+                        IBMovement.account_number == str(account_number),
+                        IBMovement.movement_date >= date_since,
+                        IBMovement.movement_date <= date_until,
+                    )
+                    .order_by(IBMovement.movement_date, IBMovement.id)
+                ).scalars()
+            )
+        finally:
+            db.close()
+
+    def _get_synced_ranges(self, db, bank_number, account_number, date_since, date_until):
+        return db.execute(
+            select(IBMovementSyncRange).where(
+                IBMovementSyncRange.bank_number == str(bank_number),
+                IBMovementSyncRange.account_number == str(account_number),
+                IBMovementSyncRange.date_since <= date_until,
+                IBMovementSyncRange.date_until >= date_since,
+            )
+        ).scalars().all()
+
+    def get_missing_ranges(self, bank_number, account_number, date_since, date_until):
+        """Return the date ranges in [date_since, date_until] not synced yet."""
+        db = self.session_factory()
+        try:
+            synced_ranges = self._get_synced_ranges(
+                db, bank_number, account_number, date_since, date_until
+            )
+            return subtract_ranges(
+                date_since,
+                date_until,
+                [(synced.date_since, synced.date_until) for synced in synced_ranges],
+            )
+        finally:
+            db.close()
+
+    def mark_synced(self, bank_number, account_number, date_since, date_until):
+        """Record a fetched range, merged with the ranges it overlaps or touches.
+
+        Only the part up to ``get_closed_until()`` is recorded.
+        """
+        date_until = min(date_until, get_closed_until())
+        if date_since > date_until:
+            return
+
+        db = self.session_factory()
+        try:
+            touching_ranges = self._get_synced_ranges(
+                db,
+                bank_number,
+                account_number,
+                date_since - datetime.timedelta(days=1),
+                date_until + datetime.timedelta(days=1),
+            )
+            for synced in touching_ranges:
+                date_since = min(date_since, synced.date_since)
+                date_until = max(date_until, synced.date_until)
+
+            if touching_ranges:
+                db.execute(
+                    delete(IBMovementSyncRange).where(
+                        IBMovementSyncRange.id.in_(
+                            [synced.id for synced in touching_ranges]
+                        )
+                    )
+                )
+
+            db.add(
+                IBMovementSyncRange(
+                    bank_number=str(bank_number),
+                    account_number=str(account_number),
+                    date_since=date_since,
+                    date_until=date_until,
+                )
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get_watermark(self, bank_number, account_number):
+        db = self.session_factory()
+        try:
+            watermark = db.execute(
+                select(IBSyncWatermark).where(
+                    IBSyncWatermark.bank_number == str(bank_number),
+                    IBSyncWatermark.account_number == str(account_number),
+                )
+            ).scalar_one_or_none()
+            if watermark is None:
+                return None
+            return {
+                "last_movement_date": watermark.last_movement_date,
+                "last_synced_at": watermark.last_synced_at,
+            }
+        finally:
+            db.close()
+
+    def save_watermark(self, bank_number, account_number, latest_movement_date=None):
+        """Advance the account watermark; it never moves back to an older day.
+
+        The sync always fetches the watermark day again, so movements arriving
+        later that day are picked up and deduplicated by fingerprint.
+        """
+        db = self.session_factory()
+        try:
+            watermark = db.execute(
+                select(IBSyncWatermark).where(
+                    IBSyncWatermark.bank_number == str(bank_number),
+                    IBSyncWatermark.account_number == str(account_number),
+                )
+            ).scalar_one_or_none()
+            if watermark is None:
+                watermark = IBSyncWatermark(
+                    bank_number=str(bank_number),
+                    account_number=str(account_number),
+                )
+                db.add(watermark)
+
+            if latest_movement_date is not None and (
+                watermark.last_movement_date is None
+                or latest_movement_date > watermark.last_movement_date
+            ):
+                watermark.last_movement_date = latest_movement_date
+
+            watermark.last_synced_at = datetime.datetime.utcnow()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from fastapi import HTTPException
+
+from app.services.interbanking.client import get_float_env, get_int_env
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class InterBankingUnavailable(HTTPException):
+    """Raised without calling Interbanking while its circuit breaker is open."""
+
+    def __init__(self, retry_after_seconds: float):
+        retry_after = max(1, math.ceil(retry_after_seconds))
+        super().__init__(
+            status_code=503,
+            detail=f"Interbanking is unavailable; retry in {retry_after} seconds",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.retry_after_seconds = retry_after
+
+
+def is_throttling_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def parse_retry_after(value) -> float | None:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Token bucket plus an AIMD concurrency limit for Interbanking requests.
+
+    Requests take a token (IB_RATE_LIMIT_PER_SECOND, bursts of
+    IB_RATE_LIMIT_BURST) and a concurrency slot. Fast successful responses
+    grow the concurrency limit by about one per window of requests up to
+    IB_MAX_CONCURRENCY; 429s, 5xx, timeouts and responses slower than
+    IB_LATENCY_TARGET_SECONDS halve it. A 429 with Retry-After also stops
+    handing out tokens until then.
+    """
+
+    def __init__(self):
+        self.rate = get_float_env("IB_RATE_LIMIT_PER_SECOND", 10)
+        self.burst = max(1.0, get_float_env("IB_RATE_LIMIT_BURST", 10))
+        self.max_concurrency = max(1, get_int_env("IB_MAX_CONCURRENCY", 8))
+        self.min_concurrency = 1
+        self.latency_target = get_float_env("IB_LATENCY_TARGET_SECONDS", 5)
+        self.reset()
+
+    def reset(self) -> None:
+        self.tokens = self.burst
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.concurrency_limit = float(self.max_concurrency)
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.throttled = 0
+        self.decreases = 0
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    async def _take_token(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.paused_until and self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            await asyncio.sleep(max(wait, 0.001))
+
+    def _free_slots(self) -> int:
+        return max(self.min_concurrency, int(self.concurrency_limit)) - self.active
+
+    async def acquire(self) -> None:
+        while self._free_slots() <= 0:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.active += 1
+        try:
+            await self._take_token()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        free = self._free_slots()
+        for waiter in list(self._waiters):
+            if free <= 0:
+                break
+            if waiter.done() or waiter.get_loop().is_closed():
+                continue
+            waiter.set_result(None)
+            free -= 1
+
+    def record_success(self, latency_seconds: float) -> None:
+        if latency_seconds > self.latency_target:
+            self._decrease("slow_response")
+            return
+        self.concurrency_limit = min(
+            float(self.max_concurrency),
+            self.concurrency_limit + 1 / self.concurrency_limit,
+        )
+        self._wake_waiters()
+
+    def record_throttled(self, retry_after_seconds: float | None = None) -> None:
+        self.throttled += 1
+        if retry_after_seconds:
+            self.paused_until = max(
+                self.paused_until,
+                time.monotonic() + retry_after_seconds,
+            )
+        self._decrease("throttled")
+
+    def _decrease(self, reason: str) -> None:
+        previous = self.concurrency_limit
+        self.concurrency_limit = max(float(self.min_concurrency), previous / 2)
+        self.decreases += 1
+        if int(previous) != int(self.concurrency_limit):
+            logger.warning(
+                "Interbanking concurrency limit reduced reason=%s limit=%s",
+                reason,
+                int(self.concurrency_limit),
+            )
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "concurrency_limit": max(self.min_concurrency, int(self.concurrency_limit)),
+            "max_concurrency": self.max_concurrency,
+            "active_requests": self.active,
+            "waiting_requests": sum(1 for waiter in self._waiters if not waiter.done()),
+            "rate_per_second": self.rate,
+            "available_tokens": round(self.tokens, 2),
+            "paused_seconds": round(max(0.0, self.paused_until - now), 2),
+            "throttled_responses": self.throttled,
+            "limit_decreases": self.decreases,
+        }
+
+
+class CircuitBreaker:
+    """Stops calling Interbanking after repeated failures.
+
+    After IB_CIRCUIT_FAILURE_THRESHOLD consecutive failures the circuit opens
+    and requests fail fast with InterBankingUnavailable for
+    IB_CIRCUIT_RESET_SECONDS. Then a single probe request is let through: its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self):
+        self.failure_threshold = max(1, get_int_env("IB_CIRCUIT_FAILURE_THRESHOLD", 5))
+        self.reset_seconds = get_float_env("IB_CIRCUIT_RESET_SECONDS", 30)
+        self.reset()
+
+    def reset(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    def retry_after_seconds(self) -> float:
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def is_open(self) -> bool:
+        """True while requests would be rejected without calling Interbanking."""
+        if self.state == OPEN:
+            return time.monotonic() < self.opened_until
+        return self.state == HALF_OPEN and self.probe_in_flight
+
+    def before_request(self) -> None:
+        if self.state == OPEN and time.monotonic() >= self.opened_until:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == OPEN or (self.state == HALF_OPEN and self.probe_in_flight):
+            self.rejected += 1
+            raise InterBankingUnavailable(max(self.retry_after_seconds(), 1))
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("Interbanking circuit closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self, retry_after_seconds: float | None = None) -> None:
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened += 1
+            self.opened_until = time.monotonic() + max(
+                self.reset_seconds,
+                retry_after_seconds or 0,
+            )
+            logger.warning(
+                "Interbanking circuit opened consecutive_failures=%s retry_in_seconds=%.0f",
+                self.consecutive_failures,
+                self.opened_until - time.monotonic(),
+            )
+
+    def release_probe(self) -> None:
+        """Forget a probe that ended without an outcome (e.g. it was cancelled)."""
+        self.probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": OPEN if self.is_open() else self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after_seconds(), 2),
+            "rejected_requests": self.rejected,
+            "times_opened": self.opened,
+        }
+
+
+rate_limiter = AdaptiveRateLimiter()
+circuit_breaker = CircuitBreaker()
+
+
+def get_throttle_state() -> dict:
+    return {
+        "circuit": circuit_breaker.snapshot(),
+        "limiter": rate_limiter.snapshot(),
+    }
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_token_exp(token: str | None) -> int | None:
+    """Return the ``exp`` claim of a JWT without verifying its signature.
+
+    The pinned ``jwt`` package has no ``decode`` helper, so the payload segment
+    is base64url-decoded directly. Returns None for anything that is not a JWT
+    with a numeric ``exp``.
+    """
+    if not token or not isinstance(token, str):
+        return None
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload_segment = parts[1] + "=" * (-len(parts[1]) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(payload_segment))
+        exp = payload.get("exp")
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if isinstance(exp, bool) or not isinstance(exp, (int, float)):
+        return None
+    return int(exp)
+
+
+class TokenManager:
+    """Process-wide Interbanking access token with single-flight renewal.
+
+    Every InterBankingService instance reads the token from here, so one
+    authentication serves all requests and job runs in the process. Tokens
+    are renewed in the background once they are within
+    ``IB_TOKEN_RENEW_BEFORE_SECONDS`` of expiring; callers only wait when the
+    token is missing or already expired. When ``IB_TOKEN_CACHE_FILE`` is set
+    the token is also shared through that file with other workers and the job
+    container.
+    """
+
+    def __init__(self):
+        self.token: str | None = None
+        self.expires_at: int | None = None
+        self.authentications = 0
+        self._refresh: asyncio.Task | None = None
+        # Tokens Interbanking refused before their exp; never adopted again.
+        self._rejected_tokens: set[str] = set()
+
+    @property
+    def renew_before_seconds(self) -> float:
+        try:
+            return float(os.getenv("IB_TOKEN_RENEW_BEFORE_SECONDS", "120"))
+        except ValueError:
+            return 120.0
+
+    @property
+    def cache_file(self) -> Path | None:
+        value = os.getenv("IB_TOKEN_CACHE_FILE")
+        return Path(value) if value else None
+
+    def _remaining_seconds(self, expires_at: int | None, now: float) -> float:
+        return -1 if expires_at is None else expires_at - now
+
+    def _adopt(self, token: str | None) -> bool:
+        if token in self._rejected_tokens:
+            return False
+        expires_at = get_token_exp(token)
+        if self._remaining_seconds(expires_at, time.time()) <= 0:
+            return False
+        self.token = token
+        self.expires_at = expires_at
+        return True
+
+    def _load_shared_token(self) -> bool:
+        """Adopt a valid token from the cache file or MS_INTER_BANKING_AT."""
+        cache_file = self.cache_file
+        if cache_file is not None:
+            try:
+                token = json.loads(cache_file.read_text()).get("access_token")
+            except FileNotFoundError:
+                token = None
+            except (OSError, ValueError, AttributeError):
+                logger.warning("Ignoring unreadable Interbanking token cache path=%s", cache_file)
+                token = None
+            if token and self._adopt(token) and not self._needs_renewal():
+                return True
+        return self._adopt(os.getenv("MS_INTER_BANKING_AT")) and not self._needs_renewal()
+
+    def _save_shared_token(self) -> None:
+        cache_file = self.cache_file
+        if cache_file is None:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # Written to a private temp file and renamed so readers never see half a token.
+            file_descriptor, temp_path = tempfile.mkstemp(
+                dir=cache_file.parent,
+                prefix=f".{cache_file.name}.",
+            )
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                json.dump(
+                    {"access_token": self.token, "expires_at": self.expires_at},
+                    temp_file,
+                )
+            os.replace(temp_path, cache_file)
+        except OSError:
+            logger.exception("Could not store the Interbanking token path=%s", cache_file)
+
+    def _discard_shared_token(self, token: str) -> None:
+        cache_file = self.cache_file
+        if cache_file is None:
+            return
+        try:
+            if json.loads(cache_file.read_text()).get("access_token") == token:
+                cache_file.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError):
+            logger.warning("Could not clear the Interbanking token cache path=%s", cache_file)
+
+    def _needs_renewal(self) -> bool:
+        return (
+            self._remaining_seconds(self.expires_at, time.time())
+            <= self.renew_before_seconds
+        )
+
+    def is_valid(self) -> bool:
+        return self.token is not None and (
+            self._remaining_seconds(self.expires_at, time.time()) > 0
+        )
+
+    def invalidate(self) -> None:
+        self.token = None
+        self.expires_at = None
+
+    async def reject(self, token: str) -> None:
+        """Drop a token Interbanking answered with 401, e.g. revoked before its exp.
+
+        Only that token is forgotten, so one renewed meanwhile by another caller
+        is kept. It is also removed from the cache file and never adopted again
+        from the file or MS_INTER_BANKING_AT.
+        """
+        self._rejected_tokens.add(token)
+        if self.token == token:
+            self.invalidate()
+        await asyncio.to_thread(self._discard_shared_token, token)
+
+    async def get_token(self, authenticate) -> str:
+        """Return a valid bearer token, calling ``authenticate()`` at most once at a time.
+
+        ``authenticate`` is an async callable returning the bearer token.
+        """
+        if self.is_valid() and not self._needs_renewal():
+            return self.token
+
+        refresh = self._refresh
+        if refresh is None or refresh.get_loop() is not asyncio.get_running_loop():
+            refresh = self._refresh = asyncio.create_task(self._renew(authenticate))
+            refresh.add_done_callback(self._clear_refresh)
+
+        if self.is_valid():
+            # Still usable: renew in the background without making this caller wait.
+            return self.token
+
+        await asyncio.shield(refresh)
+        return self.token
+
+    def _clear_refresh(self, refresh: asyncio.Task) -> None:
+        if self._refresh is refresh:
+            self._refresh = None
+        if not refresh.cancelled() and refresh.exception() is not None and self.is_valid():
+            logger.warning(
+                "Interbanking token renewal failed; keeping the current token error=%s",
+                refresh.exception(),
+            )
+
+    async def _renew(self, authenticate) -> None:
+        if await asyncio.to_thread(self._load_shared_token):
+            return
+
+        token = await authenticate()
+        self.authentications += 1
+        self.token = token
+        self.expires_at = get_token_exp(token)
+        if self.expires_at is None:
+            logger.warning("Interbanking token has no exp claim; it is renewed on every call")
+        await asyncio.to_thread(self._save_shared_token)
+
+
+token_manager = TokenManager()
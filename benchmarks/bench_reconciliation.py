@@ -0,0 +1,143 @@
+"""Benchmark: validate_trx throughput on replayed Interbanking data.
+
+For every ``--sizes`` entry a synthetic fixture with that many pending trx is
+generated (or ``--fixture`` is replayed), a fresh test database is seeded and
+the job runs against the replay Interbanking client. Reports trx/s and IB
+calls per trx.
+
+    python -m benchmarks.bench_reconciliation --sizes 1000,10000,100000 --latency-ms 100
+
+DATABASE_URL selects the database (default: a temporary SQLite file). Every
+table of that database is dropped before each size.
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import random
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_reconciliation_'), 'bench.db')}",
+)
+
+from app.jobs import replay
+
+
+def build_fixture(rng, transactions_count, accounts_count, match_ratio, start_date):
+    accounts = [
+        {
+            "bank_number": "015",
+            "bank_name": "Bench",
+            "account_number": f"{index:010d}",
+            "account_cbu": f"0150{index:018d}",
+        }
+        for index in range(accounts_count)
+    ]
+    movements = {replay.account_key("015", acc["account_number"]): [] for acc in accounts}
+    pending_trx = []
+
+    for index in range(transactions_count):
+        acc = accounts[index % accounts_count]
+        trx_date = start_date + datetime.timedelta(days=rng.randrange(20))
+        amount = rng.randrange(100, 5_000_000) / 100
+        pending_trx.append(
+            {
+                "trx_id": f"BENCH-{index}",
+                "trx_emisor_cbu": None,
+                "trx_receptor_cbu": acc["account_cbu"],
+                "trx_amount": amount,
+                "trx_date": datetime.datetime.combine(trx_date, datetime.time(11)),
+                "next_check_at": None,
+                "check_attempts": 0,
+                "customer_balance_id": 1 + index % 50,
+                "customer_balance_amount": 0,
+                "fee_percentage": 1.5,
+                "currency_name": "ARS",
+            }
+        )
+
+        account_movements = movements[replay.account_key("015", acc["account_number"])]
+        if rng.random() < match_ratio:
+            account_movements.append(
+                {
+                    "amount": f"{amount:.2f}",
+                    "movement_date": f"{trx_date.isoformat()}T10:00:00",
+                    "debit_credit_type": "C",
+                    "correlative_number": str(len(account_movements)),
+                    "voucher_number": f"V{index}",
+                }
+            )
+        # Unrelated movements on the same account.
+        noise_date = start_date + datetime.timedelta(days=rng.randrange(22))
+        account_movements.append(
+            {
+                "amount": f"{rng.randrange(100, 5_000_000) / 100:.2f}",
+                "movement_date": f"{noise_date.isoformat()}T15:00:00",
+                "debit_credit_type": rng.choice("CD"),
+                "correlative_number": str(len(account_movements)),
+                "voucher_number": f"N{index}",
+            }
+        )
+
+    return replay.ReplayFixture(
+        accounts={"accounts": accounts},
+        pending_trx=pending_trx,
+        movements=movements,
+        holidays={start_date.year: set(), start_date.year + 1: set()},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--match-ratio", type=float, default=0.7)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fixture", help="replay a recorded fixture instead")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logging.getLogger("validate_trx_job").setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    # Recent enough to stay clear of the one-month expiration.
+    start_date = datetime.date.today() - datetime.timedelta(days=25)
+    if args.fixture:
+        fixtures = [("fixture", replay.ReplayFixture.load(args.fixture))]
+    else:
+        fixtures = [
+            (
+                size,
+                build_fixture(
+                    random.Random(args.seed),
+                    int(size),
+                    args.accounts,
+                    args.match_ratio,
+                    start_date,
+                ),
+            )
+            for size in args.sizes.split(",")
+        ]
+
+    print(f"database={os.environ['DATABASE_URL']} latency_ms={args.latency_ms}")
+    print(
+        f"{'size':>10} {'seconds':>9} {'trx/s':>10} {'ib_calls':>9} "
+        f"{'calls/trx':>10} {'conciliated':>12} {'repeated':>9}"
+    )
+    for label, fixture in fixtures:
+        replay.reset_database()
+        replay.seed_database(fixture)
+        report = asyncio.run(replay.replay_fixture(fixture, args.latency_ms / 1000))
+        print(
+            f"{label:>10} {report['wall_seconds']:>9.2f} {report['trx_per_second']:>10.1f} "
+            f"{report['ib_calls']:>9} {report['ib_calls_per_trx']:>10.4f} "
+            f"{report['conciliated']:>12} {report['repeated']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
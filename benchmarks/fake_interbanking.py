@@ -0,0 +1,475 @@
+"""Local stand-in for the Interbanking API, for load and integration tests.
+
+Serves the auth, accounts, balances, movements and historical movements
+endpoints with synthetic, deterministic data, and can add latency, throttling
+and injected errors:
+
+    python -m benchmarks.fake_interbanking --port 8090 --accounts 20 \\
+        --movements-per-day 500 --latency-ms 80 --rate-limit 10 --error-rate 0.02
+
+Point the app and the jobs at it with:
+
+    MS_INTER_BANKING_AUTH_URL=http://localhost:8090/oauth/token
+    MS_INTER_BANKING_API_URL=http://localhost:8090/accounts/
+    MS_INTER_BANKING_API_ACCOUNTS=http://localhost:8090/accounts
+    MS_INTER_BANKING_API_BALANCES=http://localhost:8090/balances
+
+The same account, bank and day always produce the same movements, so repeated
+and overlapping range requests agree with each other. GET /_fake/stats
+reports what the server has served and injected.
+"""
+
+import argparse
+import asyncio
+import base64
+import datetime
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.interbanking.token import get_token_exp
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+BANK_NUMBERS = ("015", "007", "011", "017", "072")
+CREDIT_OPERATIONS = ("TRANSFERENCIA RECIBIDA", "DEPOSITO", "ACREDITACION DEBIN")
+DEBIT_OPERATIONS = ("TRANSFERENCIA ENVIADA", "PAGO PROVEEDORES", "COMISION")
+
+
+class FakeInterbankingSettings:
+    """Data volume, latency, throttling and error injection of the fake server.
+
+    Latency is sampled per request around ``latency_ms``: ``fixed`` always
+    uses it, ``uniform`` varies it by +/- ``latency_jitter`` (a fraction),
+    ``exponential`` uses it as the mean and ``lognormal`` as the median with
+    ``latency_jitter`` as sigma. Movement endpoints also wait
+    ``latency_per_1000_movements_ms`` for every thousand movements returned.
+    A zero ``rate_limit_per_second`` or ``max_concurrency`` disables that limit.
+    """
+
+    def __init__(
+        self,
+        accounts=5,
+        movements_per_day=200,
+        credit_ratio=0.75,
+        seed=7,
+        latency_ms=0.0,
+        latency_distribution="lognormal",
+        latency_jitter=0.5,
+        latency_per_1000_movements_ms=0.0,
+        rate_limit_per_second=0.0,
+        rate_limit_burst=None,
+        max_concurrency=0,
+        retry_after_seconds=1,
+        error_rate=0.0,
+        error_statuses=(500, 502, 503, 504),
+        hang_rate=0.0,
+        hang_seconds=120.0,
+        truncate_rate=0.0,
+        token_ttl_seconds=3600,
+        client_id=None,
+        client_secret=None,
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {latency_distribution!r}")
+        self.accounts = accounts
+        self.movements_per_day = movements_per_day
+        self.credit_ratio = credit_ratio
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_jitter = latency_jitter
+        self.latency_per_1000_movements_ms = latency_per_1000_movements_ms
+        self.rate_limit_per_second = rate_limit_per_second
+        self.rate_limit_burst = rate_limit_burst or max(1.0, rate_limit_per_second)
+        self.max_concurrency = max_concurrency
+        self.retry_after_seconds = retry_after_seconds
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.truncate_rate = truncate_rate
+        self.token_ttl_seconds = token_ttl_seconds
+        self.client_id = client_id
+        self.client_secret = client_secret
+
+
+def build_accounts(settings):
+    accounts = []
+    for index in range(settings.accounts):
+        bank_number = BANK_NUMBERS[index % len(BANK_NUMBERS)]
+        accounts.append(
+            {
+                "account_number": f"{index + 1:010d}",
+                "bank_number": bank_number,
+                "account_type": "CC",
+                "currency": "ARS",
+                "account_cbu": f"{bank_number}0{index + 1:018d}",
+                "account_label": f"Fake account {index + 1}",
+            }
+        )
+    return accounts
+
+
+def build_balances(settings, accounts, today):
+    balances = []
+    for acc in accounts:
+        rng = random.Random(f"{settings.seed}:balance:{acc['account_number']}:{today}")
+        countable_balance = round(rng.uniform(100_000, 50_000_000), 2)
+        balances.append(
+            {
+                **acc,
+                "balances": {
+                    "countable_balance": countable_balance,
+                    "operating_balance": countable_balance,
+                },
+                "historical_balances": [],
+            }
+        )
+    return balances
+
+
+def build_day_movements(settings, acc, day):
+    """Return the movements of one account and day; weekends have none."""
+    if day.weekday() >= 5 or settings.movements_per_day <= 0:
+        return []
+    rng = random.Random(f"{settings.seed}:{acc['bank_number']}:{acc['account_number']}:{day}")
+    mean = settings.movements_per_day
+    count = max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    seconds = sorted(rng.randrange(8 * 3600, 20 * 3600) for _ in range(count))
+
+    movements = []
+    for correlative, second in enumerate(seconds, start=1):
+        credit = rng.random() < settings.credit_ratio
+        cents = int(rng.lognormvariate(math.log(5_000_000), 1.2)) + 1
+        moment = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(
+            seconds=second
+        )
+        movements.append(
+            {
+                "movement_date": moment.isoformat(),
+                "amount": f"{cents / 100:.2f}",
+                "debit_credit_type": "C" if credit else "D",
+                "description": rng.choice(CREDIT_OPERATIONS if credit else DEBIT_OPERATIONS),
+                "correlative_number": str(correlative),
+                "voucher_number": str(rng.randrange(10**8)),
+                "operation_code_bank": str(rng.randrange(100, 999)),
+                "operation_code_ib": str(rng.randrange(10, 99)),
+                "branch_office_activity": "0000",
+                "customer_cuit": f"30{rng.randrange(10**9):09d}",
+                "account_cbu": f"{rng.randrange(10**22):022d}",
+            }
+        )
+    return movements
+
+
+def encode_token(payload):
+    def segment(value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+    return f"{segment({'alg': 'none', 'typ': 'JWT'})}.{segment(payload)}.fake"
+
+
+def parse_day(value, default):
+    if not value:
+        return default
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def endpoint_name(path):
+    if path.endswith("/movements/ZUGHUS"):
+        return "historical"
+    if path.endswith("/movements/anteriores"):
+        return "movements"
+    return path.strip("/").split("/")[0] or "root"
+
+
+class FakeInterbanking:
+    """Server state: token bucket, in-flight requests and served counters."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.accounts = build_accounts(settings)
+        self.accounts_by_number = {acc["account_number"]: acc for acc in self.accounts}
+        self.rng = random.Random(settings.seed)
+        self.counters = Counter()
+        self.active = 0
+        self.tokens = float(settings.rate_limit_burst)
+        self.refilled_at = time.monotonic()
+
+    def sample_latency_seconds(self):
+        settings = self.settings
+        if settings.latency_ms <= 0:
+            return 0.0
+        if settings.latency_distribution == "fixed":
+            latency_ms = settings.latency_ms
+        elif settings.latency_distribution == "uniform":
+            latency_ms = settings.latency_ms * self.rng.uniform(
+                1 - settings.latency_jitter, 1 + settings.latency_jitter
+            )
+        elif settings.latency_distribution == "exponential":
+            latency_ms = self.rng.expovariate(1 / settings.latency_ms)
+        else:
+            latency_ms = self.rng.lognormvariate(
+                math.log(settings.latency_ms), settings.latency_jitter
+            )
+        return max(0.0, latency_ms) / 1000
+
+    def movements_latency_seconds(self, movements_count):
+        return self.settings.latency_per_1000_movements_ms * movements_count / 1_000_000
+
+    def take_token(self):
+        rate = self.settings.rate_limit_per_second
+        if rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.settings.rate_limit_burst),
+            self.tokens + (now - self.refilled_at) * rate,
+        )
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def throttled_response(self, reason):
+        self.counters[f"throttled_{reason}"] += 1
+        return JSONResponse(
+            {"error": "too_many_requests", "reason": reason},
+            status_code=429,
+            headers={"Retry-After": str(self.settings.retry_after_seconds)},
+        )
+
+    def is_authorized(self, request):
+        authorization = request.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            return False
+        exp = get_token_exp(authorization[len("Bearer ") :])
+        return exp is not None and exp > time.time()
+
+    def movements_between(self, acc, date_since, date_until):
+        day = date_since
+        while day <= date_until:
+            yield from build_day_movements(self.settings, acc, day)
+            day += datetime.timedelta(days=1)
+
+    def stats(self):
+        return {
+            "active_requests": self.active,
+            "available_tokens": round(self.tokens, 2),
+            "counters": dict(self.counters),
+        }
+
+
+def create_app(settings=None):
+    """Build the fake Interbanking FastAPI app."""
+    fake = FakeInterbanking(settings or FakeInterbankingSettings())
+    app = FastAPI(title="Fake Interbanking")
+    app.state.fake = fake
+
+    @app.middleware("http")
+    async def simulate_bank(request: Request, call_next):
+        if request.url.path.startswith("/_fake"):
+            return await call_next(request)
+
+        endpoint = endpoint_name(request.url.path)
+        fake.counters[f"requests_{endpoint}"] += 1
+        settings = fake.settings
+        if settings.max_concurrency and fake.active >= settings.max_concurrency:
+            return fake.throttled_response("concurrency")
+        if not fake.take_token():
+            return fake.throttled_response("rate")
+
+        fake.active += 1
+        try:
+            if fake.rng.random() < settings.hang_rate:
+                fake.counters["injected_hangs"] += 1
+                await asyncio.sleep(settings.hang_seconds)
+            await asyncio.sleep(fake.sample_latency_seconds())
+            if settings.error_statuses and fake.rng.random() < settings.error_rate:
+                status_code = fake.rng.choice(settings.error_statuses)
+                fake.counters[f"injected_{status_code}"] += 1
+                return JSONResponse(
+                    {"error": "injected", "status_code": status_code},
+                    status_code=status_code,
+                )
+            return await call_next(request)
+        finally:
+            fake.active -= 1
+
+    @app.post("/oauth/token")
+    async def token(request: Request):
+        form = {
+            key: values[0]
+            for key, values in parse_qs((await request.body()).decode()).items()
+        }
+        settings = fake.settings
+        if (settings.client_id and form.get("client_id") != settings.client_id) or (
+            settings.client_secret and form.get("client_secret") != settings.client_secret
+        ):
+            fake.counters["rejected_credentials"] += 1
+            return JSONResponse({"error": "invalid_client"}, status_code=401)
+
+        fake.counters["tokens_issued"] += 1
+        expires_at = int(time.time()) + settings.token_ttl_seconds
+        return {
+            "access_token": encode_token(
+                {
+                    "sub": form.get("client_id") or "fake",
+                    "exp": expires_at,
+                    "jti": uuid.uuid4().hex,
+                }
+            ),
+            "token_type": "Bearer",
+            "expires_in": settings.token_ttl_seconds,
+        }
+
+    def unauthorized():
+        fake.counters["unauthorized"] += 1
+        return JSONResponse({"error": "invalid_token"}, status_code=401)
+
+    @app.get("/accounts")
+    async def accounts(request: Request):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        return {"accounts": fake.accounts}
+
+    @app.get("/balances")
+    async def balances(request: Request):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        return {"accounts": build_balances(fake.settings, fake.accounts, datetime.date.today())}
+
+    def resolve_range(request, account_number):
+        """Return (account, date_since, date_until), or an error response."""
+        if not fake.is_authorized(request):
+            return unauthorized()
+        acc = fake.accounts_by_number.get(account_number)
+        if acc is None or request.query_params.get("bank-number") != acc["bank_number"]:
+            return JSONResponse({"error": "account_not_found"}, status_code=404)
+        date_until = parse_day(
+            request.query_params.get("date-until"),
+            datetime.date.today() - datetime.timedelta(days=1),
+        )
+        date_since = parse_day(
+            request.query_params.get("date-since"),
+            date_until - datetime.timedelta(days=6),
+        )
+        return acc, date_since, date_until
+
+    @app.get("/accounts/{account_number}/movements/anteriores")
+    async def movements(account_number: str, request: Request):
+        resolved = resolve_range(request, account_number)
+        if isinstance(resolved, JSONResponse):
+            return resolved
+        movements_detail = list(fake.movements_between(*resolved))
+        fake.counters["movements_served"] += len(movements_detail)
+        await asyncio.sleep(fake.movements_latency_seconds(len(movements_detail)))
+        return {
+            "account_number": account_number,
+            "bank_number": resolved[0]["bank_number"],
+            "movements_detail": movements_detail,
+        }
+
+    @app.get("/accounts/{account_number}/movements/ZUGHUS")
+    async def historical_movements(account_number: str, request: Request):
+        resolved = resolve_range(request, account_number)
+        if isinstance(resolved, JSONResponse):
+            return resolved
+        acc, date_since, date_until = resolved
+        truncate = fake.rng.random() < fake.settings.truncate_rate
+        if truncate:
+            fake.counters["injected_truncations"] += 1
+
+        async def body():
+            # Written day by day so large ranges never sit in memory whole.
+            yield '{"account_number": %s, "movements_detail": [' % json.dumps(account_number)
+            served = 0
+            day = date_since
+            while day <= date_until:
+                day_movements = build_day_movements(fake.settings, acc, day)
+                if day_movements:
+                    await asyncio.sleep(fake.movements_latency_seconds(len(day_movements)))
+                    separator = "," if served else ""
+                    yield separator + ",".join(json.dumps(movement) for movement in day_movements)
+                    served += len(day_movements)
+                    fake.counters["movements_served"] += len(day_movements)
+                    if truncate:
+                        # The connection ends mid-document, as a dropped download would.
+                        return
+                day += datetime.timedelta(days=1)
+            yield '], "total": %d}' % served
+
+        return StreamingResponse(body(), media_type="application/json")
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return fake.stats()
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--movements-per-day", type=int, default=200)
+    parser.add_argument("--credit-ratio", type=float, default=0.75)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal"
+    )
+    parser.add_argument("--latency-jitter", type=float, default=0.5)
+    parser.add_argument("--latency-per-1000-movements-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second")
+    parser.add_argument("--rate-limit-burst", type=float)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--retry-after-seconds", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", default="500,502,503,504")
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl-seconds", type=int, default=3600)
+    parser.add_argument("--client-id")
+    parser.add_argument("--client-secret")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = FakeInterbankingSettings(
+        accounts=args.accounts,
+        movements_per_day=args.movements_per_day,
+        credit_ratio=args.credit_ratio,
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_jitter=args.latency_jitter,
+        latency_per_1000_movements_ms=args.latency_per_1000_movements_ms,
+        rate_limit_per_second=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+        max_concurrency=args.max_concurrency,
+        retry_after_seconds=args.retry_after_seconds,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",") if status],
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        truncate_rate=args.truncate_rate,
+        token_ttl_seconds=args.token_ttl_seconds,
+        client_id=args.client_id,
+        client_secret=args.client_secret,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()